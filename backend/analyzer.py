@@ -0,0 +1,65 @@
+# referensi: https://github.com/ariaghora/mpstemmer/tree/master/mpstemmer ,
+# https://docs.python.org/3/library/functools.html#functools.lru_cache
+
+import re
+from functools import lru_cache
+
+from mpstemmer import MPStemmer
+from Sastrawi.StopWordRemover.StopWordRemoverFactory import StopWordRemoverFactory
+
+
+class Analyzer:
+    """
+    Melakukan preprocessing pada text, yakni stemming, removing stopwords, dan
+    tokenization. Stemmer dan daftar stopwords cukup dibuat sekali per proses
+    (lihat get_analyzer), bukan setiap kali text diproses.
+
+    Attributes
+    ----------
+    stemmer(MPStemmer): Stemmer yang method stem-nya di-memoize per kata,
+                    karena kosakata di koleksi sangat berulang
+    stopwords(frozenset): Himpunan stopwords dari PySastrawi
+    """
+
+    tokenizer_pattern = re.compile(r'\w+')
+
+    def __init__(self, stem_cache_size=2 ** 18):
+        """
+        Parameters
+        ----------
+        stem_cache_size (int): Banyaknya kata maksimum yang hasil stemming-nya
+                        disimpan di cache (LRU)
+        """
+        self.stemmer = MPStemmer()
+        # stem_kalimat memanggil stem untuk setiap kata, sehingga cukup method
+        # stem milik instance ini yang di-memoize
+        self.stemmer.stem = lru_cache(maxsize=stem_cache_size)(self.stemmer.stem)
+        self.stopwords = frozenset(StopWordRemoverFactory().get_stop_words())
+
+    def analyze(self, content):
+        """
+        Mengembalikan list of tokens hasil stemming dan removing stopwords
+        dari content
+        """
+        stemmed = self.stemmer.stem_kalimat(content.lower())
+        words = [word for word in stemmed.split(' ') if word not in self.stopwords]
+        return self.tokenizer_pattern.findall(' '.join(words))
+
+    def stem(self, word):
+        """Hasil stemming satu kata (dengan cache yang sama dengan analyze)"""
+        return self.stemmer.stem(word.lower())
+
+    def cache_info(self):
+        """Statistik cache stemming (hits, misses, maxsize, currsize)"""
+        return self.stemmer.stem.cache_info()
+
+
+_analyzer = None
+
+
+def get_analyzer():
+    """Mengembalikan instance Analyzer yang dipakai bersama dalam satu proses"""
+    global _analyzer
+    if _analyzer is None:
+        _analyzer = Analyzer()
+    return _analyzer
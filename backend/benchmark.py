@@ -0,0 +1,127 @@
+# Micro-benchmark untuk komponen index.
+#
+# Menjalankan: python benchmark.py [vbe|codecs] [nama_index ...]
+# Postings dibaca dari index lokal di direktori index/ yang di-encode dengan
+# VBEPostings (default-nya gabungan semua intermediate index, yaitu seluruh
+# koleksi).
+
+import glob
+import os
+import sys
+import time
+
+from compression import StandardPostings, VBEPostings, PForDeltaPostings
+from index import InvertedIndexReader
+from store import LocalStore
+
+
+def load_postings(index_names=("intermediate_index_0",), directory="index"):
+    """
+    Membaca semua (postings_list, tf_list) dari index lokal. Jika ada
+    beberapa index (misal semua intermediate index), postings list dari term
+    yang sama disambung sesuai urutan index_names, seperti hasil merge_index.
+    """
+    store = LocalStore(os.path.dirname(os.path.realpath(__file__)))
+    postings = {}
+    for index_name in index_names:
+        with InvertedIndexReader(index_name, VBEPostings, directory=directory, store=store) as index:
+            for (term, postings_list, tf_list) in index:
+                entry = postings.setdefault(term, ([], []))
+                entry[0].extend(postings_list)
+                entry[1].extend(tf_list)
+    return list(postings.values())
+
+
+def intermediate_index_names(directory="index"):
+    """Nama semua intermediate index lokal (satu per block koleksi)"""
+    root = os.path.join(os.path.dirname(os.path.realpath(__file__)), directory)
+    paths = sorted(glob.glob(os.path.join(root, "intermediate_index_*.index")))
+    return [os.path.splitext(os.path.basename(path))[0] for path in paths]
+
+
+def timeit(function, repeat=3):
+    """Waktu eksekusi terbaik (detik) dari beberapa kali percobaan"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def scalar_vbe_encode(postings_list):
+    """Encode VBEPostings dengan implementasi per angka (vb_encode)"""
+    gap_list = [postings_list[0]] + [postings_list[i] - postings_list[i - 1]
+                                     for i in range(1, len(postings_list))]
+    return VBEPostings.vb_encode(gap_list)
+
+
+def scalar_vbe_decode(encoded_postings_list):
+    """Decode VBEPostings dengan implementasi per angka (vb_decode)"""
+    postings_list = VBEPostings.vb_decode(encoded_postings_list)
+    for i in range(1, len(postings_list)):
+        postings_list[i] += postings_list[i - 1]
+    return postings_list
+
+
+def bench_vbe(postings):
+    """
+    Membandingkan VBEPostings per angka (vb_encode/vb_decode) dengan
+    VBEPostings.encode/decode, yang memakai versi vectorized untuk postings
+    list dengan panjang minimal VBEPostings.VECTORIZE_MIN_LENGTH
+    """
+    lists = [postings_list for (postings_list, _) in postings]
+    encoded = [VBEPostings.encode(postings_list) for postings_list in lists]
+    assert encoded == [scalar_vbe_encode(postings_list) for postings_list in lists], "format berbeda"
+
+    long_lists = [p for p in lists if len(p) >= VBEPostings.VECTORIZE_MIN_LENGTH]
+    long_encoded = [VBEPostings.encode(p) for p in long_lists]
+
+    for title, lists_, encoded_ in [("semua postings list", lists, encoded),
+                                    (f"postings list >= {VBEPostings.VECTORIZE_MIN_LENGTH}", long_lists, long_encoded)]:
+        total = sum(len(postings_list) for postings_list in lists_)
+        print(f"VBEPostings, {title}: {len(lists_)} postings lists, {total} postings")
+        results = [
+            ("encode per angka", timeit(lambda: [scalar_vbe_encode(p) for p in lists_])),
+            ("encode", timeit(lambda: [VBEPostings.encode(p) for p in lists_])),
+            ("decode per angka", timeit(lambda: [scalar_vbe_decode(e) for e in encoded_])),
+            ("decode (list)", timeit(lambda: [VBEPostings.decode(e) for e in encoded_])),
+            ("decode_array", timeit(lambda: [VBEPostings.decode_array(e) for e in encoded_])),
+        ]
+        for name, seconds in results:
+            print(f"  {name:<20}{seconds * 1000:10.1f} ms{total / seconds / 1e6:10.1f} M postings/s")
+
+
+def bench_codecs(postings, codecs=(StandardPostings, VBEPostings, PForDeltaPostings)):
+    """
+    Membandingkan ukuran index (postings dan TF) dengan kecepatan decode_array
+    dan decode_tf_array dari setiap encoding
+    """
+    total = sum(len(postings_list) for (postings_list, _) in postings)
+    print(f"{len(postings)} postings lists, {total} postings")
+    print(f"  {'encoding':<20}{'postings':>12}{'TF':>12}{'bytes/posting':>15}{'decode':>12}{'M postings/s':>14}")
+    for codec in codecs:
+        encoded = [(codec.encode(postings_list), codec.encode_tf(tf_list))
+                   for (postings_list, tf_list) in postings]
+        for (postings_list, tf_list), (encoded_postings, encoded_tf) in zip(postings, encoded):
+            assert codec.decode_array(encoded_postings).tolist() == postings_list, codec.__name__
+            assert codec.decode_tf_array(encoded_tf).tolist() == tf_list, codec.__name__
+
+        postings_size = sum(len(encoded_postings) for (encoded_postings, _) in encoded)
+        tf_size = sum(len(encoded_tf) for (_, encoded_tf) in encoded)
+        seconds = timeit(lambda: [(codec.decode_array(p), codec.decode_tf_array(t)) for (p, t) in encoded])
+        print(f"  {codec.__name__:<20}{postings_size:>12}{tf_size:>12}{(postings_size + tf_size) / total:>15.2f}"
+              f"{seconds * 1000:>9.1f} ms{total / seconds / 1e6:>14.1f}")
+
+
+if __name__ == "__main__":
+
+    benchmark = sys.argv[1] if len(sys.argv) > 1 else "all"
+    index_names = sys.argv[2:] or intermediate_index_names()
+    postings = load_postings(index_names)
+    if benchmark in ("vbe", "all"):
+        bench_vbe(postings)
+    if benchmark in ("codecs", "all"):
+        for min_length in [1, PForDeltaPostings.BLOCK_SIZE, 32 * PForDeltaPostings.BLOCK_SIZE]:
+            print(f"postings list >= {min_length}:")
+            bench_codecs([entry for entry in postings if len(entry[0]) >= min_length])
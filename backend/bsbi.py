@@ -3,23 +3,103 @@
 
 import os
 import pickle
+import array
 import contextlib
 import heapq
-import math
+import itertools
+import threading
+from concurrent.futures import ProcessPoolExecutor
 
+import numpy as np
+
+from analyzer import get_analyzer
 from index import InvertedIndexReader, InvertedIndexWriter
-from util import IdMap, merge_and_sort_posts_and_tfs
-from compression import VBEPostings
+from util import IdMap, concat_ranges, intersect_postings_arrays, merge_positions_lists, merge_postings_arrays
+from compression import VBEPositions, VBEPostings
+from docstore import DocumentStoreReader, DocumentStoreWriter, ForwardIndexReader, ForwardIndexWriter
+from scoring import (BlockPostingsCursor, ImpactQuantizer, PostingsCursor, ScoreAccumulator,
+                     bm25_weights, phrase_frequencies, proximity_frequencies, tfidf_weights, top_k,
+                     wand_top_k)
+from searcher import SearcherState, acquire_state, publish_state
+from store import LocalStore, default_store
+from termdict import DocLengths, TermDictionary, read_matrix, write_matrix
 from tqdm import tqdm
-import re
 
-from mpstemmer import MPStemmer
-from Sastrawi.StopWordRemover.StopWordRemoverFactory import StopWordRemoverFactory
 
-from google.cloud import storage
+def parse_block(data_dir, block_path, positional=False):
+    """
+    Parsing dan inversion sebuah block di worker process (lihat do_indexing
+    dengan workers > 1). Term dan dokumen diberi ID lokal untuk block ini
+    sesuai urutan kemunculan pertamanya, sama seperti urutan pemanggilan
+    term_id_map dan doc_id_map pada parsing_block, sehingga parent process
+    bisa memetakannya ke ID global dengan hasil yang sama.
+
+    Parameters
+    ----------
+    data_dir: str
+        Path ke data
+    block_path: str
+        Relative path ke directory block
+    positional: bool
+        Jika True, posisi setiap token juga dikembalikan
+
+    Returns
+    -------
+    Tuple[List[str], List[str], numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray]
+        terms (term ID lokal -> term), doc_names (doc ID lokal -> nama dokumen),
+        lalu term ID lokal, doc ID lokal, dan TF untuk setiap pasangan (term,
+        dokumen) yang terurut berdasarkan term lalu dokumen, serta posisi
+        setiap pasangan yang disambung (None jika tidak positional)
+    """
+    analyzer = get_analyzer()
+    term_map = IdMap()
+    doc_names = []
+    token_terms, token_docs, token_positions = array.array('q'), array.array('q'), array.array('q')
+    for file_name in next(os.walk(os.path.join(data_dir, block_path)))[2]:
+        doc_names.append(f'./{os.path.join(block_path, file_name)}')
+        with open(os.path.join(data_dir, block_path, file_name), encoding="utf-8") as f:
+            words = analyzer.analyze(f.read())
+        token_terms.extend(term_map[word] for word in words)
+        token_docs.extend([len(doc_names) - 1] * len(words))
+        if positional:
+            token_positions.extend(range(len(words)))
+
+    return (term_map.id_to_str, doc_names) + invert_tokens(token_terms, token_docs,
+                                                          token_positions if positional else None)
+
+
+def invert_tokens(term_ids, doc_ids, positions=None):
+    """
+    Inversion sekumpulan token menjadi postings dalam bentuk array.
+
+    Token harus terurut berdasarkan dokumen lalu posisi (urutan token ketika
+    dokumen dibaca satu per satu), sehingga sort yang stabil berdasarkan term
+    menghasilkan urutan (term, dokumen, posisi).
+
+    Parameters
+    ----------
+    term_ids, doc_ids, positions: array.array atau numpy.ndarray
+        Term ID, doc ID, dan posisi setiap token (positions boleh None)
+
+    Returns
+    -------
+    Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray]
+        Term ID, doc ID, dan TF untuk setiap pasangan (term, dokumen) yang
+        terurut berdasarkan term lalu dokumen, serta posisi setiap pasangan
+        yang disambung (None jika positions None)
+    """
+    term_ids = np.asarray(term_ids, dtype=np.int64)
+    doc_ids = np.asarray(doc_ids, dtype=np.int64)
+    order = np.argsort(term_ids, kind='stable')
+    term_ids, doc_ids = term_ids[order], doc_ids[order]
+
+    # satu group untuk setiap pasangan (term, dokumen)
+    starts = np.flatnonzero(np.concatenate(([True], (term_ids[1:] != term_ids[:-1]) | (doc_ids[1:] != doc_ids[:-1]))))
+    tf_list = np.diff(np.append(starts, len(term_ids)))
+    if positions is not None:
+        positions = np.asarray(positions, dtype=np.int64)[order]
+    return term_ids[starts], doc_ids[starts], tf_list, positions
 
-client_storage = storage.Client()
-bucket = client_storage.bucket("diagnosee-collections")
 
 class BSBIIndex:
     """
@@ -33,53 +113,287 @@ class BSBIIndex:
     postings_encoding: Lihat di compression.py, kandidatnya adalah StandardPostings,
                     VBEPostings, dsb.
     index_name(str): Nama dari file yang berisi inverted index
+    doc_compression(str): Compression per dokumen pada document store yang
+                    ditulis saat indexing ('none', 'zlib', atau 'zstd')
+    impact_scoring(str): Jika "bm25" atau "tfidf", merged index juga menyimpan
+                    impact score (score per posting yang dikuantisasi menjadi
+                    8-bit) dengan parameter impact_k1 dan impact_b untuk BM25
+    positional(bool): Jika True, index juga menyimpan posisi setiap term di
+                    setiap dokumen (urutan token setelah preprocessing), yang
+                    dibutuhkan oleh retrieve_phrase dan retrieve_proximity
+    store: Storage layer tempat output_dir berada (lihat store.py), default-nya
+                    bucket GCS
+    merged_index(InvertedIndexReader): Reader merged index yang tetap terbuka
+                    selama proses hidup (diisi oleh load), sehingga query hanya
+                    perlu membaca bytes postings
+    index_version(int): Versi metadata merged index di store saat terakhir
+                    kali dimuat
+    documents(DocumentStoreReader): Document store berisi isi semua dokumen
+                    (diisi oleh load jika document store tersedia)
+    doc_vectors(dict): Versi artifacts Letor -> matrix vektor LSI dokumen
+                    yang sudah dibuka (lihat get_doc_vectors)
+    forward(ForwardIndexReader): Forward index berisi hash token setiap
+                    dokumen untuk fitur reranking (diisi oleh load jika tersedia)
     """
 
-    def __init__(self, output_dir, postings_encoding, index_name="main_index"):
+    # nama file document store (lihat docstore.py)
+    DOCUMENT_STORE_NAME = "documents"
+    # prefix nama file matrix vektor LSI dokumen (lihat write_doc_vectors)
+    DOC_VECTORS_NAME = "doc_vectors"
+    # nama file forward index (lihat docstore.py)
+    FORWARD_INDEX_NAME = "forward"
+    # ukuran maksimum (bytes) buffer token spimi_invert sebelum ditulis ke run baru
+    MEMORY_BUDGET = 256 * 1024 * 1024
+
+    def __init__(self, output_dir, postings_encoding, index_name="main_index", data_dir="collections",
+                 store=None, doc_compression="zlib", impact_scoring=None, impact_k1=1.2, impact_b=0.75,
+                 positional=False):
         self.term_id_map = IdMap()
         self.doc_id_map = IdMap()
+        self.data_dir = data_dir
         self.output_dir = output_dir
+        self.store = store if store is not None else default_store
         self.index_name = index_name
         self.postings_encoding = postings_encoding
-        self.doc_length = {}
-        self.avg_doc_length = 0
+        self.doc_compression = doc_compression
+        self.impact_scoring = impact_scoring
+        self.impact_k1 = impact_k1
+        self.impact_b = impact_b
+        self.positional = positional
+        self.analyzer = get_analyzer()
 
         # Untuk menyimpan nama-nama file dari semua intermediate inverted index
         self.intermediate_indices = []
 
+        # state searcher (lihat load dan searcher) yang dimuat sekali per
+        # proses; load() membuat state baru lalu menggantinya sekaligus
+        self.state = None
+        # writer document store dan forward index yang terbuka selama do_indexing
+        self.document_writer = None
+        self.forward_writer = None
+        # lock hanya dipegang untuk mengganti state atau mengambil referensinya;
+        # query tidak memegang lock selama membaca postings
+        self.lock = threading.Lock()
+
     def save(self):
-        """Menyimpan doc_id_map and term_id_map ke output directory via pickle"""
+        """
+        Menyimpan doc_id_map and term_id_map ke output directory via pickle.
+        term_id_map juga disimpan sebagai term dictionary read-only
+        (terms.lex, lihat termdict.py) yang dipakai searcher, sedangkan
+        terms.dict tetap dibutuhkan untuk menambah term baru (segments.py).
+        """
 
-        with open(os.path.join(os.path.dirname(os.path.realpath(__file__)), self.output_dir, 'terms.dict'), 'wb') as f:
+        with self.store.open(os.path.join(self.output_dir, 'terms.dict'), 'wb') as f:
             pickle.dump(self.term_id_map, f)
-        with open(os.path.join(os.path.dirname(os.path.realpath(__file__)), self.output_dir, 'docs.dict'), 'wb') as f:
+        with self.store.open(os.path.join(self.output_dir, 'terms.lex'), 'wb') as f:
+            TermDictionary.write(f, self.term_id_map.str_to_id.items())
+        with self.store.open(os.path.join(self.output_dir, 'docs.dict'), 'wb') as f:
             pickle.dump(self.doc_id_map, f)
 
+    def index_files(self):
+        """
+        Mengembalikan path semua file yang dibutuhkan untuk melayani query,
+        misalnya untuk disalin dari bucket ke disk lokal (LocalStore.sync_from).
+        """
+        return [os.path.join(self.output_dir, name) for name in
+                ['terms.lex', 'docs.dict', self.index_name + '.index', self.index_name + '.dict',
+                 self.index_name + '.ptab', self.index_name + '.lengths', self.index_name + '.pos',
+                 self.FORWARD_INDEX_NAME + '.fwd', self.FORWARD_INDEX_NAME + '.dict', self.DOCUMENT_STORE_NAME + '.store', self.DOCUMENT_STORE_NAME + '.dict']]
+
     def load(self):
-        """Memuat doc_id_map and term_id_map dari output directory"""
-
-        with bucket.blob(os.path.join(self.output_dir, 'terms.dict')).open('rb') as f:
-            self.term_id_map = pickle.load(f)
-        with bucket.blob(os.path.join(self.output_dir, 'docs.dict')).open('rb') as f:
-            self.doc_id_map = pickle.load(f)
-        with InvertedIndexReader(self.index_name, self.postings_encoding, directory=self.output_dir) as merged_index:
-            self.doc_length = merged_index.doc_length
-            self.avg_doc_length = sum(self.doc_length.values()) / len(self.doc_length)
-        
+        """
+        Memuat doc_id_map, term_id_map, dan metadata merged index (postings_dict
+        dan doc_length) dari output directory sebagai state searcher baru
+        (lihat SearcherState). Jika ada, term_id_map adalah TermDictionary
+        read-only yang dibaca dari terms.lex tanpa unpickling.
+
+        State baru dibuat tanpa memegang lock lalu menggantikan state lama
+        sekaligus. Query yang sedang berjalan tetap memakai state lama, dan
+        reader-nya ditutup setelah query terakhir tersebut selesai. Reader
+        dibiarkan terbuka sampai close() atau load() berikutnya, sehingga
+        cukup dipanggil sekali per proses.
+        """
+        state = SearcherState(version=self.current_version(), doc_vectors={})
+        try:
+            self.load_id_maps(state)
+            state.merged_index = state.open(InvertedIndexReader(
+                self.index_name, self.postings_encoding, directory=self.output_dir, store=self.store))
+            state.doc_length = state.merged_index.doc_length
+            # doc_length dalam bentuk array (index = doc ID) untuk scoring vectorized
+            state.doc_length_array = np.zeros(len(state.doc_id_map))
+            if isinstance(state.doc_length, DocLengths):
+                state.doc_length_array[:len(state.doc_length.array)] = state.doc_length.array
+            else:
+                state.doc_length_array[list(state.doc_length.keys())] = list(state.doc_length.values())
+            state.avg_doc_length = state.doc_length_array.sum() / len(state.doc_length)
+            state.min_doc_length = state.doc_length_array[state.doc_length_array > 0].min()
+
+            # document store bersifat opsional (index lama tidak memilikinya)
+            state.documents = None
+            if self.store.exists(os.path.join(self.output_dir, self.DOCUMENT_STORE_NAME + '.dict')):
+                state.documents = state.open(DocumentStoreReader(
+                    self.DOCUMENT_STORE_NAME, directory=self.output_dir, store=self.store))
+            state.forward = None
+            if self.store.exists(os.path.join(self.output_dir, self.FORWARD_INDEX_NAME + '.dict')):
+                state.forward = state.open(ForwardIndexReader(
+                    self.FORWARD_INDEX_NAME, directory=self.output_dir, store=self.store))
+        except BaseException:
+            state.retire()
+            raise
+
+        publish_state(self, state)
+        self.term_id_map, self.doc_id_map = state.term_id_map, state.doc_id_map
+
+    def load_id_maps(self, state):
+        """
+        Memuat term_id_map dan doc_id_map ke state. term_id_map dibaca dari
+        terms.lex (TermDictionary yang ditutup bersama state) jika ada, jika
+        tidak dari terms.dict.
+        """
+        lexicon_path = os.path.join(self.output_dir, 'terms.lex')
+        if self.store.exists(lexicon_path):
+            state.term_id_map = TermDictionary(self.store.open_reader(lexicon_path))
+            state.add_resource(state.term_id_map, state.term_id_map.close)
+        else:
+            with self.store.open(os.path.join(self.output_dir, 'terms.dict'), 'rb') as f:
+                state.term_id_map = pickle.load(f)
+        with self.store.open(os.path.join(self.output_dir, 'docs.dict'), 'rb') as f:
+            state.doc_id_map = pickle.load(f)
+
+    def close(self):
+        """Melepas state searcher; reader-nya ditutup setelah query terakhir yang memakainya selesai"""
+        publish_state(self, None)
+
+    def searcher(self, state=None):
+        """
+        Context manager yang menghasilkan state searcher saat ini (memuat
+        index jika belum dimuat). Semua yang dibaca sebuah query berasal dari
+        state tersebut meskipun load() dipanggil selama query berjalan.
+        Pemanggil yang memakai beberapa method untuk satu request (misal
+        retrieve_tfidf lalu fetch_documents, lihat main.py) meneruskan state
+        yang sama melalui parameter state pada setiap method.
+
+        Parameters
+        ----------
+        state: SearcherState
+            Jika diberikan, state ini yang dipakai
+        """
+        return acquire_state(self, self.load, state)
+
+    def get_token_hashes(self, doc_ids, executor=None, state=None):
+        """
+        Hash token unik setiap dokumen pada doc_ids dari forward index (lihat
+        ForwardIndexReader.get_many), atau None jika forward index tidak ada
+        atau belum memuat semua dokumen tersebut (misal dokumen dari segment
+        baru).
+        """
+        with self.searcher(state) as state:
+            if state.forward is None or max(doc_ids, default=-1) >= len(state.forward):
+                return None
+            return state.forward.get_many(doc_ids, executor=executor)
+
+    def doc_vectors_path(self, version):
+        """Path matrix vektor LSI dokumen untuk artifacts Letor versi version"""
+        return os.path.join(self.output_dir, f'{self.DOC_VECTORS_NAME}_{version}.matrix')
+
+    def write_doc_vectors(self, letor, batch_size=1000):
+        """
+        Menghitung vektor LSI (lihat Letor.project) semua dokumen di collection
+        dan menyimpannya sebagai matrix float32 (baris = doc ID, lihat
+        write_matrix) untuk versi artifacts letor, sehingga reranking tidak
+        perlu memproyeksikan isi dokumen saat query. Dokumen dibaca dan
+        diproyeksikan per batch_size dokumen. Harus dijalankan ulang setiap
+        kali Letor dilatih ulang atau doc ID berubah.
+        """
+        vectors = np.zeros((len(self.doc_id_map), letor.NUM_LATENT_TOPICS), dtype=np.float32)
+
+        def project(batch):
+            doc_ids, texts = zip(*batch)
+            vectors[list(doc_ids)] = letor.project(*letor.bag_of_words(texts))
+
+        batch = []
+        for doc_name, content in self.iter_documents():
+            batch.append((self.doc_id_map[doc_name], content.split()))
+            if len(batch) == batch_size:
+                project(batch)
+                batch = []
+        if batch:
+            project(batch)
+
+        with self.store.open(self.doc_vectors_path(letor.version), 'wb') as f:
+            write_matrix(f, vectors)
+
+    def get_doc_vectors(self, version, state=None):
+        """
+        Matrix vektor LSI dokumen (numpy.ndarray float32, baris = doc ID) untuk
+        artifacts Letor versi version, atau None jika belum ditulis. Matrix
+        dibuka sekali per state (mmap pada LocalStore) sampai load() berikutnya.
+        """
+        with self.searcher(state) as state:
+            if version not in state.doc_vectors:
+                path = self.doc_vectors_path(version)
+                vectors = None
+                if self.store.exists(path):
+                    reader = self.store.open_reader(path)
+                    state.add_resource(reader, reader.close)
+                    vectors = read_matrix(reader)
+                state.doc_vectors.setdefault(version, vectors)
+            return state.doc_vectors[version]
+
+    def fetch_documents(self, doc_names, executor=None, state=None):
+        """
+        Mengambil isi dokumen dari document store.
+
+        Parameters
+        ----------
+        doc_names: List[str]
+            Nama-nama dokumen sesuai doc_id_map (misal hasil retrieve_tfidf)
+        executor: Executor
+            Jika diberikan, ranged read ke document store dijalankan paralel
+        state: SearcherState
+            State searcher yang dipakai (lihat searcher)
+
+        Returns
+        -------
+        List[Tuple[str, str]]
+            List of (doc_name, content), urutannya sama dengan doc_names
+        """
+        with self.searcher(state) as state:
+            doc_ids = [state.doc_id_map[doc_name] for doc_name in doc_names]
+            return list(zip(doc_names, state.documents.get_many(doc_ids, executor=executor)))
+
+    def current_version(self):
+        """
+        Mengembalikan versi file metadata merged index di store (generation
+        pada GCS, mtime pada file lokal). Versi ini berubah setiap kali index
+        ditulis ulang.
+        """
+        return self.store.version(os.path.join(self.output_dir, self.index_name + '.dict'))
+
+    def reload_if_changed(self):
+        """
+        Memuat ulang index jika belum dimuat atau versi metadata di store sudah
+        berbeda dengan versi yang sedang dipakai.
+
+        Returns
+        -------
+        bool
+            True jika index dimuat ulang
+        """
+        state = self.state
+        if state is not None and self.current_version() == state.version:
+            return False
+        self.load()
+        return True
 
     def pre_processing_text(self, content):
         """
-        Melakukan preprocessing pada text, yakni stemming dan removing stopwords
+        Melakukan preprocessing pada text, yakni stemming dan removing stopwords.
+        Stemmer dan stopwords disimpan di Analyzer yang dibuat sekali per proses
+        (lihat analyzer.py).
         """
         # https://github.com/ariaghora/mpstemmer/tree/master/mpstemmer
-
-        stemmer = MPStemmer()
-        stemmed = stemmer.stem_kalimat(content.lower())
-        remover = StopWordRemoverFactory().create_stop_word_remover()
-        stemmed = remover.remove(stemmed)
-        tokenizer_pattern: str = r'\w+'
-        stemmed = re.findall(tokenizer_pattern, stemmed)
-        return stemmed
+        return self.analyzer.analyze(content)
 
     def parsing_block(self, block_path):
         """
@@ -113,7 +427,8 @@ class BSBIIndex:
         List[Tuple[Int, Int]]
             Returns all the td_pairs extracted from the block
             Mengembalikan semua pasangan <termID, docID> dari sebuah block (dalam hal
-            ini sebuah sub-direktori di dalam folder collection)
+            ini sebuah sub-direktori di dalam folder collection). Jika
+            positional, setiap elemen berupa <termID, docID, posisi>.
 
         Harus menggunakan self.term_id_map dan self.doc_id_map untuk mendapatkan
         termIDs dan docIDs. Dua variable ini harus 'persist' untuk semua pemanggilan
@@ -129,13 +444,19 @@ class BSBIIndex:
             doc_id = self.doc_id_map[f'./{os.path.join(block_path, file_name)}']
             
             # membaca text file
-            with open(os.path.join(self.data_dir, block_path, file_name), encoding="utf-8") as content:
+            with open(os.path.join(self.data_dir, block_path, file_name), encoding="utf-8") as f:
+                content = f.read()
+                # menyimpan isi dokumen ke document store saat do_indexing
+                self.add_document(doc_id, content)
                 # melakukan preprocessing isi text file
-                clean_words = self.pre_processing_text(content.read())
+                clean_words = self.pre_processing_text(content)
                 # menyimpan hasil preprocessing dan mappingnya ke list
-                for word in clean_words:
+                for position, word in enumerate(clean_words):
                     term_id = self.term_id_map[word]
-                    td_pairs.append((term_id, doc_id))
+                    if self.positional:
+                        td_pairs.append((term_id, doc_id, position))
+                    else:
+                        td_pairs.append((term_id, doc_id))
         return td_pairs
 
     def write_to_index(self, td_pairs, index):
@@ -147,7 +468,8 @@ class BSBIIndex:
         yaitu penggunaan struktur data hashtable (dalam Python bisa
         berupa Dictionary)
 
-        ASUMSI: td_pairs CUKUP di memori
+        ASUMSI: td_pairs CUKUP di memori. Untuk koleksi besar, gunakan
+        spimi_invert yang memori-nya dibatasi.
 
         Di Tugas Pemrograman 1, kita hanya menambahkan term dan
         juga list of sorted Doc IDs. Sekarang di Tugas Pemrograman 2,
@@ -161,21 +483,139 @@ class BSBIIndex:
             Inverted index pada disk (file) yang terkait dengan suatu "block"
         """
         # TODO
-        
-        # inisialisasi
-        term_dict = {}
-        # akses setiap term
-        for term_id, doc_id in td_pairs:
-            # cek apakah ada di dict, tambahkan jika tidak ada
-            term_dict.setdefault(term_id, {})
-            term_dict[term_id].setdefault(doc_id, 0)
-            term_dict[term_id][doc_id] += 1
-            
-        # sort, mapping, dan tambahkan ke index
-        for term_id in sorted(term_dict.keys()):
-            doc_pairs = sorted(term_dict[term_id].items())
-            unzip = list(zip(*doc_pairs))
-            index.append(term_id, list(unzip[0]), list(unzip[1]))
+
+        # td_pairs dari parsing_block terurut berdasarkan dokumen lalu posisi,
+        # sehingga bisa langsung di-invert dalam bentuk array (lihat invert_tokens)
+        if not td_pairs:
+            return
+        columns = np.array(td_pairs, dtype=np.int64).T
+        positions = columns[2] if self.positional else None
+        self.write_postings_arrays(index, *invert_tokens(columns[0], columns[1], positions))
+
+    def write_postings_arrays(self, index, term_ids, doc_ids, tf_list, positions=None):
+        """
+        Menulis postings yang sudah terinversi dalam bentuk array ke index.
+
+        Parameters
+        ----------
+        index: InvertedIndexWriter
+        term_ids, doc_ids, tf_list: numpy.ndarray
+            Satu elemen untuk setiap pasangan (term, dokumen), terurut
+            berdasarkan term ID lalu doc ID
+        positions: numpy.ndarray
+            Posisi term untuk setiap pasangan yang disambung (banyaknya sesuai
+            TF), atau None jika tidak positional
+        """
+        if len(term_ids) == 0:
+            return
+        starts = np.flatnonzero(np.concatenate(([True], term_ids[1:] != term_ids[:-1]))).tolist()
+        ends = starts[1:] + [len(term_ids)]
+        doc_ids, tf_list = doc_ids.tolist(), tf_list.tolist()
+        if positions is not None:
+            offsets = np.concatenate(([0], np.cumsum(tf_list))).tolist()
+            positions = positions.tolist()
+        for start, end in zip(starts, ends):
+            term_positions = None
+            if positions is not None:
+                term_positions = [positions[offsets[i]:offsets[i + 1]] for i in range(start, end)]
+            index.append(int(term_ids[start]), doc_ids[start:end], tf_list[start:end], positions=term_positions)
+
+    def index_parsed_block(self, block_path, parsed, index):
+        """
+        Memetakan hasil parse_block (dengan ID lokal) ke term_id_map dan
+        doc_id_map, menulis isi dokumen ke document store, dan menulis
+        postings block tersebut ke index.
+
+        Term dan dokumen dipetakan sesuai urutan ID lokalnya, yaitu urutan
+        kemunculan pertama, sehingga jika block diproses sesuai urutan, ID
+        global yang dihasilkan sama dengan parsing_block.
+        """
+        terms, doc_names, term_ids, doc_ids, tf_list, positions = parsed
+        doc_id_map = np.array([self.doc_id_map[doc_name] for doc_name in doc_names], dtype=np.int64)
+        term_id_map = np.array([self.term_id_map[term] for term in terms], dtype=np.int64)
+
+        if self.document_writer is not None:
+            for doc_id, doc_name in zip(doc_id_map.tolist(), doc_names):
+                with open(os.path.join(self.data_dir, doc_name), encoding="utf-8") as f:
+                    self.add_document(doc_id, f.read())
+
+        if len(term_ids) == 0:
+            return
+        term_ids, doc_ids = term_id_map[term_ids], doc_id_map[doc_ids]
+        # doc ID lokal dan global sama-sama urut kemunculan, sehingga cukup
+        # sort yang stabil berdasarkan term ID global
+        order = np.argsort(term_ids, kind='stable')
+        if positions is not None:
+            offsets = np.cumsum(tf_list) - tf_list
+            selected, _ = concat_ranges(offsets[order], tf_list[order])
+            positions = positions[selected]
+        self.write_postings_arrays(index, term_ids[order], doc_ids[order], tf_list[order], positions=positions)
+
+    def add_document(self, doc_id, content):
+        """
+        Menyimpan isi dokumen ke document store dan hash token-nya ke forward
+        index jika keduanya sedang ditulis (selama do_indexing)
+        """
+        if self.document_writer is not None:
+            self.document_writer.add(doc_id, content)
+        if self.forward_writer is not None:
+            self.forward_writer.add(doc_id, content.split())
+
+    def iter_documents(self):
+        """
+        Generator (nama dokumen, isi dokumen) untuk semua dokumen di
+        collection, dengan urutan yang sama seperti parsing_block dipanggil
+        untuk setiap block secara terurut.
+        """
+        for block_path in tqdm(sorted(next(os.walk(self.data_dir))[1])):
+            for file_name in next(os.walk(os.path.join(self.data_dir, block_path)))[2]:
+                with open(os.path.join(self.data_dir, block_path, file_name), encoding="utf-8") as f:
+                    yield f'./{os.path.join(block_path, file_name)}', f.read()
+
+    def spimi_invert(self, documents, memory_budget=None):
+        """
+        Inversion dengan skema SPIMI yang memori-nya dibatasi.
+
+        Token setiap dokumen ditambahkan ke buffer array yang ringkas (term ID,
+        doc ID, dan posisi jika positional), bukan list of tuples. Ketika ukuran
+        buffer mencapai memory_budget bytes, buffer di-invert dan ditulis
+        sebagai satu run (intermediate index) baru, lalu dikosongkan. Run hanya
+        dipotong di batas dokumen, sehingga doc ID di setiap run lebih besar
+        dari doc ID di run sebelumnya.
+
+        Parameters
+        ----------
+        documents: Iterable[Tuple[str, str]]
+            (nama dokumen, isi dokumen), misalnya dari iter_documents
+        memory_budget: int
+            Ukuran maksimum buffer token dalam bytes (default MEMORY_BUDGET)
+        """
+        if memory_budget is None:
+            memory_budget = self.MEMORY_BUDGET
+        token_terms, token_docs, token_positions = array.array('q'), array.array('q'), array.array('q')
+
+        def flush():
+            index_id = f'intermediate_index_{len(self.intermediate_indices)}'
+            self.intermediate_indices.append(index_id)
+            with InvertedIndexWriter(index_id, self.postings_encoding, directory=self.output_dir, store=self.store) as index:
+                self.write_postings_arrays(index, *invert_tokens(token_terms, token_docs,
+                                                                 token_positions if self.positional else None))
+            for buffer in (token_terms, token_docs, token_positions):
+                del buffer[:]
+
+        for doc_name, content in documents:
+            doc_id = self.doc_id_map[doc_name]
+            self.add_document(doc_id, content)
+            clean_words = self.pre_processing_text(content)
+            token_terms.extend(self.term_id_map[word] for word in clean_words)
+            token_docs.extend([doc_id] * len(clean_words))
+            if self.positional:
+                token_positions.extend(range(len(clean_words)))
+            buffer_size = (len(token_terms) + len(token_docs) + len(token_positions)) * token_terms.itemsize
+            if buffer_size >= memory_budget:
+                flush()
+        if token_terms or not self.intermediate_indices:
+            flush()
 
     def merge_index(self, indices, merged_index):
         """
@@ -184,7 +624,8 @@ class BSBIIndex:
 
         Ini adalah bagian yang melakukan EXTERNAL MERGE SORT
 
-        Gunakan fungsi merge_and_sort_posts_and_tfs(..) di modul util
+        Term semua index di-merge dengan heapq.merge, lalu postings list setiap
+        term digabung dalam bentuk bytes atau array oleh merge_term
 
         Parameters
         ----------
@@ -197,43 +638,214 @@ class BSBIIndex:
             Instance InvertedIndexWriter object yang merupakan hasil merging dari
             semua intermediate InvertedIndexWriter objects.
         """
-        # kode berikut mengasumsikan minimal ada 1 term
-        merged_iter = heapq.merge(*indices, key=lambda x: x[0])
-        curr, postings, tf_list = next(merged_iter)  # first item
-        for t, postings_, tf_list_ in merged_iter:  # from the second item
-            if t == curr:
-                zip_p_tf = merge_and_sort_posts_and_tfs(list(zip(postings, tf_list)),
-                                                        list(zip(postings_, tf_list_)))
-                postings = [doc_id for (doc_id, _) in zip_p_tf]
-                tf_list = [tf for (_, tf) in zip_p_tf]
+        # impact score hanya dihitung jika diminta (lihat impact_quantizer)
+        quantizer = self.impact_quantizer(indices) if self.impact_scoring else None
+        if quantizer is not None:
+            merged_index.impact_info = quantizer.info()
+
+        # postings tidak di-decode seluruhnya (lihat merge_term), sehingga
+        # doc_length merged index diambil dari doc_length intermediate index
+        # (terurut berdasarkan doc ID, apapun pembagian run-nya)
+        doc_length = {}
+        for index in indices:
+            for doc_id, length in index.doc_length.items():
+                doc_length[doc_id] = doc_length.get(doc_id, 0) + length
+        merged_index.doc_length = dict(sorted(doc_length.items()))
+
+        # term setiap intermediate index terurut, sehingga cukup heapq.merge
+        # terhadap term ID; index dengan term yang sama dikelompokkan sesuai
+        # urutan indices
+        merged_terms = heapq.merge(*[[(term, i) for term in index.terms] for i, index in enumerate(indices)])
+        for term, group in itertools.groupby(merged_terms, key=lambda x: x[0]):
+            self.merge_term(term, [indices[i] for _, i in group], merged_index, quantizer)
+
+    def merge_term(self, term, indices, merged_index, quantizer=None):
+        """
+        Menggabungkan postings list sebuah term dari beberapa intermediate
+        index dan menulisnya ke merged_index.
+
+        indices diurutkan sesuai urutan block/run, sehingga doc ID di setiap
+        index lebih besar dari doc ID di index sebelumnya (lihat spimi_invert).
+        Karena itu postings list cukup disambung:
+            - term yang hanya ada di satu index di-copy apa adanya, termasuk
+              skip table-nya, tanpa decode sama sekali;
+            - postings list gabungan yang tidak lebih panjang dari
+              SKIP_BLOCK_SIZE disambung dalam bentuk bytes jika encoding
+              mempunyai rebase_block; hanya doc ID pertama setiap list yang
+              di-encode ulang, dan tf list serta posisi di-copy apa adanya;
+            - postings list yang lebih panjang di-decode sebagai array,
+              disambung, lalu di-encode per blok (encode_blocks).
+        Jika doc ID ternyata tidak monoton, postings di-merge dengan
+        merge_postings_arrays (lihat merge_term_unordered).
+
+        Parameters
+        ----------
+        term: int
+            Term ID
+        indices: List[InvertedIndexReader]
+            Intermediate index yang mengandung term, sesuai urutannya
+        merged_index: InvertedIndexWriter
+        quantizer: ImpactQuantizer
+            Untuk menghitung impact score (opsional); membutuhkan postings
+            yang sudah di-decode
+        """
+        encoding = self.postings_encoding
+        encoded = [index.get_encoded(term) for index in indices]
+        encoded_positions = None
+        if self.positional:
+            encoded_positions = b"".join(index.get_encoded_positions(term) for index in indices)
+        number_of_postings = sum(index.postings_dict[term][1] for index in indices)
+        long_list = number_of_postings > merged_index.SKIP_BLOCK_SIZE
+        # index lama mungkin belum menyimpan max_tf dan skip table
+        has_max_tf = all(term in index.max_tf for index in indices)
+
+        if (len(indices) == 1 and quantizer is None and has_max_tf
+                and (not long_list or indices[0].get_skip_table(term) is not None)):
+            encoded_postings, encoded_tf = encoded[0]
+            merged_index.append_encoded(term, number_of_postings, encoded_postings, encoded_tf,
+                                        indices[0].max_tf[term], skips=indices[0].get_skip_table(term),
+                                        encoded_positions=encoded_positions)
+            return
+
+        # decode (bukan decode_array) karena kebanyakan list pendek, sehingga
+        # loop Python lebih cepat dari overhead pemanggilan numpy
+        postings = [encoding.decode(encoded_postings) for encoded_postings, _ in encoded]
+        if any(postings[i][0] <= postings[i - 1][-1] for i in range(1, len(postings))):
+            self.merge_term_unordered(term, indices, merged_index, quantizer)
+            return
+
+        # bytes encoding berbasis blok (PForDeltaPostings) tidak bisa disambung
+        concatenate_bytes = not long_list and hasattr(encoding, 'rebase_block')
+        tf_list = None
+        if quantizer is not None or not concatenate_bytes or not has_max_tf:
+            tf_list = [tf for _, encoded_tf in encoded for tf in encoding.decode_tf(encoded_tf)]
+        max_tf = max(index.max_tf[term] for index in indices) if has_max_tf else max(tf_list)
+
+        skips = None
+        if concatenate_bytes:
+            encoded_postings = b"".join([encoded[0][0]] + [
+                encoding.rebase_block(encoded_postings, previous[-1])
+                for (encoded_postings, _), previous in zip(encoded[1:], postings)])
+            encoded_tf = b"".join(encoded_tf for _, encoded_tf in encoded)
+        else:
+            postings = [doc_id for postings_list in postings for doc_id in postings_list]
+            if long_list:
+                encoded_postings, encoded_tf, skips = merged_index.encode_blocks(postings, tf_list)
             else:
-                merged_index.append(curr, postings, tf_list)
-                curr, postings, tf_list = t, postings_, tf_list_
-        merged_index.append(curr, postings, tf_list)
+                encoded_postings = encoding.encode(postings)
+                encoded_tf = encoding.encode_tf(tf_list)
 
-    def retrieve(self, query):
-        self.load()
-        # melakukan preprocessing untuk query
-        clean_query = self.pre_processing_text(query)
+        impacts = None
+        if quantizer is not None:
+            if concatenate_bytes:
+                postings = [doc_id for postings_list in postings for doc_id in postings_list]
+            impacts = quantizer.impacts(postings, tf_list)
+        merged_index.append_encoded(term, number_of_postings, encoded_postings, encoded_tf, max_tf, skips=skips,
+                                    impacts=impacts, encoded_positions=encoded_positions)
 
-        # inisialisasi
-        query_postings = []
-        
-        # membaca file index
-        with InvertedIndexReader(self.index_name, self.postings_encoding, directory=self.output_dir) as merged_index:
+    def merge_term_unordered(self, term, indices, merged_index, quantizer=None):
+        """
+        Sama dengan merge_term untuk index yang doc ID-nya saling tumpang
+        tindih: postings di-decode sebagai array dan di-merge dengan
+        merge_postings_arrays (dan merge_positions_lists).
+        """
+        postings, tf_list = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        positions = [] if self.positional else None
+        for index in indices:
+            postings_, tf_list_ = index.get_postings_arrays(term)
+            if self.positional:
+                flat, offsets = index.get_positions(term, tf_list_)
+                flat, offsets = flat.tolist(), offsets.tolist()
+                positions_ = [flat[offsets[i]:offsets[i + 1]] for i in range(len(postings_))]
+                positions = merge_positions_lists(postings.tolist(), positions, postings_.tolist(), positions_)
+            postings, tf_list = merge_postings_arrays(postings, tf_list, postings_, tf_list_)
+        postings, tf_list = postings.tolist(), tf_list.tolist()
+
+        skips = None
+        if len(postings) > merged_index.SKIP_BLOCK_SIZE:
+            encoded_postings, encoded_tf, skips = merged_index.encode_blocks(postings, tf_list)
+        else:
+            encoded_postings = self.postings_encoding.encode(postings)
+            encoded_tf = self.postings_encoding.encode_tf(tf_list)
+        impacts = quantizer.impacts(postings, tf_list) if quantizer is not None else None
+        merged_index.append_encoded(term, len(postings), encoded_postings, encoded_tf, max(tf_list), skips=skips,
+                                    impacts=impacts,
+                                    encoded_positions=VBEPositions.encode(positions) if positions is not None else None)
+
+    def impact_quantizer(self, indices):
+        """
+        Membuat ImpactQuantizer untuk merged index dari statistik semua
+        intermediate index: N dan panjang dokumen dari doc_length, serta df dan
+        max_tf setiap term dari postings_dict dan max_tf. Score terbesar yang
+        mungkin di koleksi dipakai untuk menentukan scale kuantisasi.
 
+        Parameters
+        ----------
+        indices: List[InvertedIndexReader]
+            Intermediate index yang akan di-merge
+        """
+        doc_length = {}
+        for index in indices:
+            doc_length.update(index.doc_length)
+        doc_length_array = np.zeros(max(doc_length) + 1)
+        doc_length_array[list(doc_length.keys())] = list(doc_length.values())
+
+        quantizer = ImpactQuantizer(self.impact_scoring, len(doc_length),
+                                    sum(doc_length.values()) / len(doc_length), doc_length_array,
+                                    k1=self.impact_k1, b=self.impact_b)
+
+        # df dan max_tf setiap term pada merged index
+        df, max_tf = {}, {}
+        for index in indices:
+            for term, (_, number_of_postings, _, _) in index.postings_dict.items():
+                df[term] = df.get(term, 0) + number_of_postings
+                max_tf[term] = max(max_tf.get(term, 0), index.max_tf[term])
+
+        min_doc_length = min(doc_length.values())
+        quantizer.set_max_score(max(quantizer.upper_bound(df[term], max_tf[term], min_doc_length)
+                                    for term in df))
+        return quantizer
+
+    def query_term_ids(self, query, state=None):
+        """
+        Melakukan preprocessing untuk query dan mengembalikan term ID dari
+        setiap term query yang ada di collection (term yang tidak ditemukan
+        dilewati).
+        """
+        with self.searcher(state) as state:
+            return [term_id for term_id in self.indexed_term_ids(state, self.pre_processing_text(query))
+                    if term_id is not None]
+
+    def indexed_term_ids(self, state, words):
+        """
+        Term ID setiap kata yang mempunyai postings di merged index, atau None
+        untuk kata lainnya. term_id_map juga bisa memuat term dari segment
+        baru (lihat segments.py) yang belum ada di merged index.
+        """
+        term_ids = []
+        for word in words:
+            term_id = state.term_id_map[word] if word in state.term_id_map else None
+            term_ids.append(term_id if term_id is not None and term_id in state.merged_index.postings_dict else None)
+        return term_ids
+
+    def retrieve(self, query, state=None):
+        with self.searcher(state) as state:
+            # mendapatkan term ID untuk setiap term di query
+            term_ids = self.query_term_ids(query, state=state)
+
+            # inisialisasi
+            query_postings = []
+
+            # membaca postings dari merged index yang sudah terbuka
             # mendapatkan postings list untuk setiap term di query
-            for word in clean_query:
-                # jika term tidak ditemukan, lanjut ke iterasi selanjutnya 
-                if word not in self.term_id_map:
-                    continue
-                query_postings.append(merged_index.get_postings_list(self.term_id_map[word]))
+            for term_id in term_ids:
+                query_postings.append(state.merged_index.get_postings_arrays(term_id))
 
-        query_postings.sort(key=len)
+            query_postings.sort(key=len)
         
-        return query_postings
+            return query_postings
 
-    def retrieve_tfidf(self, query, k=10):
+    def retrieve_tfidf(self, query, k=10, state=None):
         """
         Melakukan Ranked Retrieval dengan skema TaaT (Term-at-a-Time).
         Method akan mengembalikan top-K retrieval results.
@@ -258,6 +870,8 @@ class BSBIIndex:
 
             contoh: Query "universitas indonesia depok" artinya ada
             tiga terms: universitas, indonesia, dan depok
+        state: SearcherState
+            State searcher yang dipakai (lihat searcher)
 
         Result
         ------
@@ -269,42 +883,24 @@ class BSBIIndex:
         JANGAN LEMPAR ERROR/EXCEPTION untuk terms yang TIDAK ADA di collection.
 
         """
-        # TODO
-        
-        # mendapatkan posting list untuk masing-masing term
-        query_postings = self.retrieve(query=query)
-
-        n = len(self.doc_length)
-
-        result = []
-        # akses setiap term untuk dihitung scorenya
-        for item in query_postings:
-            df = len(item[0])
-            idf = math.log10(n / df)
-            tuples = []    
-            for j in range(df):
-                tf = 0
-                if (item[1][j] > 0):
-                    tf = (1 + math.log10(item[1][j]))
-                score = tf * idf
-                # simpan doc id dan score dalam tuple bentuk di list
-                tuples.append((item[0][j], score))
-            # merge hasilnya
-            result = merge_and_sort_posts_and_tfs(result, tuples)
+        with self.searcher(state) as state:
+            # TODO
         
-        # sort berdasarkan score
-        result = sorted(result, key=lambda x: x[1], reverse=True)
-                
-        # mengambil top k tuples
-        docs_count = len(result)
-        if k < len(result):
-            docs_count = k
-        top_k = []
-        for i in range(docs_count):
-            top_k.append((result[i][1], self.doc_id_map[result[i][0]]))  
-        return top_k
-    
-    def retrieve_bm25(self, query, k=10, k1=1.2, b=0.75):
+            # mendapatkan posting list untuk masing-masing term
+            query_postings = self.retrieve(query=query, state=state)
+
+            n = len(state.doc_length)
+
+            # akumulasi score di dense array, satu operasi vectorized per term
+            accumulator = ScoreAccumulator(len(state.doc_id_map))
+            for postings_list, tf_list in query_postings:
+                weights = tfidf_weights(tf_list, len(postings_list), n)
+                accumulator.add(postings_list, weights)
+
+            # mengambil top k tanpa mengurutkan semua kandidat
+            return self.top_k_results(accumulator, k, state.doc_id_map)
+
+    def retrieve_bm25(self, query, k=10, k1=1.2, b=0.75, state=None):
         """
         Melakukan Ranked Retrieval dengan skema scoring BM25 dan framework TaaT (Term-at-a-Time).
         Method akan mengembalikan top-K retrieval results.
@@ -316,6 +912,8 @@ class BSBIIndex:
 
             contoh: Query "universitas indonesia depok" artinya ada
             tiga terms: universitas, indonesia, dan depok
+        state: SearcherState
+            State searcher yang dipakai (lihat searcher)
 
         Result
         ------
@@ -325,68 +923,392 @@ class BSBIIndex:
             Daftar Top-K dokumen terurut mengecil BERDASARKAN SKOR.
 
         """
-        # TODO
-        
-        # mendapatkan posting list untuk masing-masing term
-        queries = self.retrieve(query=query)
-        
-        n = len(self.doc_length)
-        result = []
-            
-        # akses setiap term untuk dihitung scorenya
-        for item in queries:
-            df = len(item[0])
-            idf = math.log10(n / df)
-            tuples = []
-            for j in range(df):
-                tf = item[1][j]
-                numer = (k1 + 1) * tf
-                denom = (k1 * ((1 - b) + b * self.doc_length[item[0][j]] / self.avg_doc_length)) + tf
-                score = (numer / denom) * idf
-
-                # simpan doc id dan score dalam tuple bentuk di list
-                tuples.append((item[0][j], score))
-                
-            # merge hasilnya
-            result = merge_and_sort_posts_and_tfs(result, tuples)
-    
-        # sort berdasarkan score
-        result = sorted(result, key=lambda x: x[1], reverse=True)
-        
-        # mengambil top k tuples
-        docs_count = len(result)
-        if k < len(result):
-            docs_count = k
-        top_k = []
-        for i in range(docs_count):
-            top_k.append((result[i][1], self.doc_id_map[result[i][0]]))  
-        return top_k
+        with self.searcher(state) as state:
+            # TODO
         
+            # mendapatkan posting list untuk masing-masing term
+            query_postings = self.retrieve(query=query, state=state)
+
+            n = len(state.doc_length)
+
+            # akumulasi score di dense array, satu operasi vectorized per term
+            accumulator = ScoreAccumulator(len(state.doc_id_map))
+            for postings_list, tf_list in query_postings:
+                weights = bm25_weights(tf_list, state.doc_length_array[postings_list], len(postings_list),
+                                       n, state.avg_doc_length, k1=k1, b=b)
+                accumulator.add(postings_list, weights)
+
+            # mengambil top k tanpa mengurutkan semua kandidat
+            return self.top_k_results(accumulator, k, state.doc_id_map)
+
+    def retrieve_wand(self, query, k=10, scoring="bm25", k1=1.2, b=0.75, state=None):
+        """
+        Melakukan Ranked Retrieval dengan skema DaaT (Document-at-a-Time) dan
+        dynamic pruning Block-Max WAND. Dokumen yang score-nya dipastikan tidak
+        dapat masuk top-K (berdasarkan upper bound score setiap term, dan setiap
+        blok pada skip table) dilewati tanpa dihitung score-nya.
+
+        Upper bound sebuah term dihitung dari TF terbesar di postings list-nya
+        (max_tf yang disimpan oleh InvertedIndexWriter) atau di setiap bloknya
+        (skip table) dan, untuk BM25, panjang dokumen terpendek di koleksi.
+        Postings list yang mempunyai skip table dibaca per blok, hanya untuk
+        blok yang tidak dilompati.
+
+        Hasilnya sama dengan retrieve_tfidf (scoring="tfidf") atau
+        retrieve_bm25 (scoring="bm25").
+
+        Parameters
+        ----------
+        query: str
+            Query tokens yang dipisahkan oleh spasi
+        scoring: str
+            "tfidf" atau "bm25"
+        state: SearcherState
+            State searcher yang dipakai (lihat searcher)
+
+        Result
+        ------
+        List[(int, str)]
+            List of tuple: elemen pertama adalah score similarity, dan yang
+            kedua adalah nama dokumen.
+            Daftar Top-K dokumen terurut mengecil BERDASARKAN SKOR.
+        """
+        with self.searcher(state) as state:
+            term_ids = self.query_term_ids(query, state=state)
+
+            n = len(state.doc_length)
+            min_doc_length = state.min_doc_length
+
+            def weights(postings_list, tf_list, df):
+                if scoring == "tfidf":
+                    return tfidf_weights(tf_list, df, n)
+                return bm25_weights(tf_list, state.doc_length_array[postings_list], df,
+                                    n, state.avg_doc_length, k1=k1, b=b)
+
+            def upper_bounds(max_tf, df):
+                # toleransi untuk pembulatan floating point
+                if scoring == "tfidf":
+                    return tfidf_weights(max_tf, df, n) * (1 + 1e-9)
+                return bm25_weights(max_tf, np.full(len(max_tf), min_doc_length), df,
+                                    n, state.avg_doc_length, k1=k1, b=b) * (1 + 1e-9)
+
+            def read_block(term_id, df):
+                def read(block):
+                    postings_list, tf_list = state.merged_index.get_block_arrays(term_id, block)
+                    return postings_list, weights(postings_list, tf_list, df)
+                return read
+
+            # blok postings dibaca selama traversal, sehingga seluruh traversal
+            # dilakukan selama merged index dipegang
+            cursors = []
+            for term_id in term_ids:
+                df = state.merged_index.postings_dict[term_id][1]
+                skips = state.merged_index.get_skip_table(term_id)
+                if skips is not None:
+                    cursors.append(BlockPostingsCursor(skips[:, InvertedIndexReader.SKIP_LAST_DOC],
+                                                       upper_bounds(skips[:, InvertedIndexReader.SKIP_MAX_TF], df),
+                                                       read_block(term_id, df)))
+                    continue
+                postings_list, tf_list = state.merged_index.get_postings_arrays(term_id)
+                # index lama belum menyimpan max_tf
+                max_tf = state.merged_index.max_tf.get(term_id) or int(tf_list.max())
+                cursors.append(PostingsCursor(postings_list, weights(postings_list, tf_list, df),
+                                              upper_bounds([max_tf], df)[0]))
+
+            doc_ids, scores = wand_top_k(cursors, k)
+            return [(float(score), state.doc_id_map[int(doc_id)]) for doc_id, score in zip(doc_ids, scores)]
+
+    def retrieve_impact(self, query, k=10, state=None):
+        """
+        Melakukan Ranked Retrieval dengan skema TaaT menggunakan impact score
+        yang sudah dihitung saat indexing (lihat impact_scoring). Score sebuah
+        dokumen adalah jumlah impact (integer) dari setiap term di query,
+        sehingga tidak ada perhitungan TF-IDF/BM25 saat query.
+
+        Score yang dikembalikan adalah jumlah impact dibagi scale, yakni
+        pendekatan dari score TF-IDF/BM25 dengan parameter yang tercatat di
+        metadata index (merged_index.impact_info).
+
+        Result
+        ------
+        List[(int, str)]
+            List of tuple: elemen pertama adalah score similarity, dan yang
+            kedua adalah nama dokumen.
+            Daftar Top-K dokumen terurut mengecil BERDASARKAN SKOR.
+        """
+        with self.searcher(state) as state:
+            term_ids = self.query_term_ids(query, state=state)
+            impact_info = state.merged_index.impact_info
+            if not impact_info:
+                raise ValueError("index tidak menyimpan impact score (lihat impact_scoring)")
+
+            accumulator = ScoreAccumulator(len(state.doc_id_map), dtype=np.int64)
+            for term_id in term_ids:
+                postings_list, _ = state.merged_index.get_postings_arrays(term_id)
+                accumulator.add(postings_list, state.merged_index.get_impacts(term_id))
+
+            doc_ids, scores = accumulator.top_k(k)
+            return [(int(score) / impact_info["scale"], state.doc_id_map[int(doc_id)])
+                    for doc_id, score in zip(doc_ids, scores)]
+
+    def retrieve_and(self, query, k=10, scoring="bm25", k1=1.2, b=0.75, state=None):
+        """
+        Melakukan Boolean retrieval dengan semantik AND (conjunctive): hanya
+        dokumen yang mengandung semua term di query yang dikembalikan.
 
-    def do_indexing(self):
+        Postings list diiris mulai dari term dengan df terkecil, dan doc ID
+        kandidat dicari pada postings list berikutnya dengan galloping search
+        (lihat intersect_postings_arrays), sehingga kandidat tidak pernah lebih
+        banyak dari postings list terpendek. Untuk postings list yang
+        mempunyai skip table, hanya blok yang mungkin memuat kandidat yang
+        dibaca dan di-decode.
+
+        Jika scoring adalah "bm25" atau "tfidf", hasilnya diurutkan dengan
+        score yang sama dengan retrieve_bm25 atau retrieve_tfidf. Jika scoring
+        None, semua dokumen hasil irisan dikembalikan terurut berdasarkan doc ID
+        dengan score 0.
+
+        Parameters
+        ----------
+        query: str
+            Query tokens yang dipisahkan oleh spasi
+        k: int
+            Banyaknya dokumen yang dikembalikan (None untuk semua dokumen)
+        scoring: str
+            "bm25", "tfidf", atau None
+        state: SearcherState
+            State searcher yang dipakai (lihat searcher)
+
+        Result
+        ------
+        List[(int, str)]
+            List of tuple: elemen pertama adalah score similarity, dan yang
+            kedua adalah nama dokumen.
+        """
+        with self.searcher(state) as state:
+            words = self.pre_processing_text(query)
+            # term yang tidak ada di collection membuat irisan kosong
+            term_ids = self.indexed_term_ids(state, words)
+            if not term_ids or None in term_ids:
+                return []
+
+            doc_ids, tf_lists = self.intersect_terms(state, term_ids)
+
+            if scoring is None:
+                doc_ids = doc_ids[:k] if k is not None else doc_ids
+                return [(0.0, state.doc_id_map[int(doc_id)]) for doc_id in doc_ids]
+
+            # score dijumlahkan mengikuti urutan term di query, sama seperti
+            # akumulasi pada retrieve_tfidf dan retrieve_bm25
+            n = len(state.doc_length)
+            scores = np.zeros(len(doc_ids))
+            for term_id in term_ids:
+                df = state.merged_index.postings_dict[term_id][1]
+                if scoring == "tfidf":
+                    scores += tfidf_weights(tf_lists[term_id], df, n)
+                else:
+                    scores += bm25_weights(tf_lists[term_id], state.doc_length_array[doc_ids], df,
+                                           n, state.avg_doc_length, k1=k1, b=b)
+
+            doc_ids, scores = top_k(doc_ids, scores, k if k is not None else len(doc_ids))
+            return [(float(score), state.doc_id_map[int(doc_id)]) for doc_id, score in zip(doc_ids, scores)]
+
+    def intersect_terms(self, state, term_ids):
+        """
+        Mengiris postings list dari term_ids, mulai dari term dengan df
+        terkecil (lihat retrieve_and).
+
+        Returns
+        -------
+        Tuple[numpy.ndarray, Dict[int, numpy.ndarray]]
+            Doc ID yang mengandung semua term, dan TF setiap term untuk doc ID
+            tersebut
+        """
+        term_ids = sorted(set(term_ids), key=lambda term_id: state.merged_index.postings_dict[term_id][1])
+        doc_ids, tf_list = state.merged_index.get_postings_arrays(term_ids[0])
+        tf_lists = {term_ids[0]: tf_list}
+        for term_id in term_ids[1:]:
+            postings_list, tf_list = self.candidate_postings(state, term_id, doc_ids)
+            indices, other_indices = intersect_postings_arrays(doc_ids, postings_list)
+            doc_ids = doc_ids[indices]
+            tf_lists = {other: tfs[indices] for other, tfs in tf_lists.items()}
+            tf_lists[term_id] = tf_list[other_indices]
+        return doc_ids, tf_lists
+
+    def candidate_postings(self, state, term_id, doc_ids):
+        """
+        Mengembalikan (postings_list, tf_list) dari term_id yang cukup untuk
+        diiris dengan doc_ids: jika term mempunyai skip table, hanya blok yang
+        mungkin memuat salah satu doc_ids yang di-decode.
+        """
+        skips = state.merged_index.get_skip_table(term_id)
+        if skips is None:
+            return state.merged_index.get_postings_arrays(term_id)
+
+        last_doc_ids = skips[:, InvertedIndexReader.SKIP_LAST_DOC]
+        blocks = np.unique(np.searchsorted(last_doc_ids, doc_ids, side='left'))
+        blocks = blocks[blocks < len(last_doc_ids)]
+        if len(blocks) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        decoded = [state.merged_index.get_block_arrays(term_id, int(block)) for block in blocks]
+        return (np.concatenate([postings_list for (postings_list, _) in decoded]),
+                np.concatenate([tf_list for (_, tf_list) in decoded]))
+
+    def retrieve_phrase(self, query, k=10, k1=1.2, b=0.75, state=None):
+        """
+        Mengembalikan dokumen yang memuat query sebagai frase, yaitu semua
+        term query muncul berurutan (bersebelahan setelah preprocessing).
+        Membutuhkan positional index (lihat positional).
+
+        Kandidat adalah irisan postings list semua term (lihat intersect_terms),
+        lalu posisi term hanya dibaca untuk kandidat tersebut. Dokumen diurutkan
+        dengan BM25 yang memperlakukan frase sebagai satu term: TF adalah
+        banyaknya kemunculan frase dan DF adalah banyaknya dokumen yang memuat
+        frase.
+
+        Result
+        ------
+        List[(int, str)]
+            List of tuple: elemen pertama adalah score similarity, dan yang
+            kedua adalah nama dokumen.
+            Daftar Top-K dokumen terurut mengecil BERDASARKAN SKOR.
+        """
+        with self.searcher(state) as state:
+            term_ids = self.query_phrase_term_ids(state, query)
+            if not term_ids:
+                return []
+            doc_ids, _ = self.intersect_terms(state, term_ids)
+            positions = {term_id: self.candidate_positions(state, term_id, doc_ids) for term_id in set(term_ids)}
+            if len(doc_ids) == 0:
+                return []
+            frequencies = phrase_frequencies([positions[term_id] for term_id in term_ids])
+            return self.rank_matches(state, doc_ids, frequencies, k, k1=k1, b=b)
+
+    def retrieve_proximity(self, query, window=8, k=10, k1=1.2, b=0.75, state=None):
+        """
+        Sama dengan retrieve_phrase, tetapi term query boleh muncul dengan
+        urutan bebas asalkan semuanya berada dalam window token berurutan
+        (lihat proximity_frequencies).
+
+        Parameters
+        ----------
+        query: str
+            Query tokens yang dipisahkan oleh spasi
+        window: int
+            Panjang window (banyaknya token setelah preprocessing)
+        state: SearcherState
+            State searcher yang dipakai (lihat searcher)
+        """
+        with self.searcher(state) as state:
+            term_ids = self.query_phrase_term_ids(state, query)
+            if not term_ids:
+                return []
+            term_ids = list(dict.fromkeys(term_ids))
+            doc_ids, _ = self.intersect_terms(state, term_ids)
+            positions = [self.candidate_positions(state, term_id, doc_ids) for term_id in term_ids]
+            if len(doc_ids) == 0:
+                return []
+            frequencies = proximity_frequencies(positions, window)
+            return self.rank_matches(state, doc_ids, frequencies, k, k1=k1, b=b)
+
+    def query_phrase_term_ids(self, state, query):
+        """
+        Term ID setiap kata query (sesuai urutan, termasuk kata yang berulang),
+        atau list kosong jika ada kata yang tidak ada di collection.
+        """
+        if not state.merged_index.positions_dict:
+            raise ValueError("index tidak menyimpan posisi (lihat positional)")
+        term_ids = self.indexed_term_ids(state, self.pre_processing_text(query))
+        return [] if None in term_ids else term_ids
+
+    def candidate_positions(self, state, term_id, doc_ids):
+        """
+        Posisi term_id di setiap dokumen pada doc_ids (yang semuanya memuat
+        term_id), dalam bentuk (positions, offsets) seperti get_positions.
+        """
+        postings_list, tf_list = state.merged_index.get_postings_arrays(term_id)
+        positions, offsets = state.merged_index.get_positions(term_id, tf_list)
+        indices = np.searchsorted(postings_list, doc_ids)
+        counts = tf_list[indices]
+        selected, _ = concat_ranges(offsets[indices], counts)
+        return positions[selected], np.concatenate(([0], np.cumsum(counts)))
+
+    def rank_matches(self, state, doc_ids, frequencies, k, k1=1.2, b=0.75):
+        """
+        Mengurutkan dokumen yang frequencies-nya positif dengan BM25, dengan
+        frequencies sebagai TF (lihat retrieve_phrase)
+        """
+        matched = frequencies > 0
+        doc_ids, frequencies = doc_ids[matched], frequencies[matched]
+        if len(doc_ids) == 0:
+            return []
+        scores = bm25_weights(frequencies, state.doc_length_array[doc_ids], len(doc_ids),
+                              len(state.doc_length), state.avg_doc_length, k1=k1, b=b)
+        doc_ids, scores = top_k(doc_ids, scores, k)
+        return [(float(score), state.doc_id_map[int(doc_id)]) for doc_id, score in zip(doc_ids, scores)]
+
+    def top_k_results(self, accumulator, k, doc_id_map):
+        """
+        Mengubah top-k dari ScoreAccumulator menjadi list of (score, nama dokumen)
+        yang terurut mengecil berdasarkan score
+        """
+        doc_ids, scores = accumulator.top_k(k)
+        return [(float(score), doc_id_map[int(doc_id)]) for doc_id, score in zip(doc_ids, scores)]
+
+    def do_indexing(self, workers=1, memory_budget=None):
         """
         Base indexing code
         BAGIAN UTAMA untuk melakukan Indexing dengan skema BSBI (blocked-sort
         based indexing)
 
-        Method ini scan terhadap semua data di collection, memanggil parsing_block
-        untuk parsing dokumen dan memanggil write_to_index yang melakukan inversion
-        di setiap block dan menyimpannya ke index yang baru.
+        Method ini scan terhadap semua data di collection dan melakukan
+        inversion dengan spimi_invert, yang menulis intermediate index baru
+        setiap kali buffer token mencapai memory_budget bytes (bukan setiap
+        directory), lalu semua intermediate index di-merge.
+
+        Jika workers > 1, parsing dan inversion setiap block dijalankan paralel
+        oleh process pool (lihat parse_block), lalu hasilnya dipetakan ke ID
+        global sesuai urutan block (lihat index_parsed_block), dengan satu
+        intermediate index per block. Merged index yang dihasilkan sama
+        dengan indexing sekuensial.
+
+        Parameters
+        ----------
+        workers: int
+            Banyaknya worker process untuk parsing block
+        memory_budget: int
+            Ukuran maksimum buffer token (bytes) untuk indexing sekuensial
         """
-        # loop untuk setiap sub-directory di dalam folder collection (setiap block)
-        for block_dir_relative in tqdm(sorted(next(os.walk(self.data_dir))[1])):
-            td_pairs = self.parsing_block(block_dir_relative)
-            index_id = 'intermediate_index_'+block_dir_relative
-            self.intermediate_indices.append(index_id)
-            with InvertedIndexWriter(index_id, self.postings_encoding, directory=os.path.join(os.path.dirname(os.path.realpath(__file__)), self.output_dir)) as index:
-                self.write_to_index(td_pairs, index)
-                td_pairs = None
+        # isi dokumen juga ditulis ke document store, dan hash token-nya ke
+        # forward index, selama parsing
+        with contextlib.ExitStack() as stack:
+            self.document_writer = stack.enter_context(
+                DocumentStoreWriter(self.DOCUMENT_STORE_NAME, directory=self.output_dir, store=self.store,
+                                    compression=self.doc_compression))
+            self.forward_writer = stack.enter_context(
+                ForwardIndexWriter(self.FORWARD_INDEX_NAME, directory=self.output_dir, store=self.store))
+            if workers > 1:
+                block_dirs = sorted(next(os.walk(self.data_dir))[1])
+                executor = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+                # hasil map keluar sesuai urutan block
+                parsed_blocks = executor.map(parse_block, [self.data_dir] * len(block_dirs), block_dirs,
+                                             [self.positional] * len(block_dirs))
+                # loop untuk setiap sub-directory di dalam folder collection (setiap block)
+                for block_dir_relative, parsed in zip(tqdm(block_dirs), parsed_blocks):
+                    index_id = 'intermediate_index_'+block_dir_relative
+                    self.intermediate_indices.append(index_id)
+                    with InvertedIndexWriter(index_id, self.postings_encoding, directory=self.output_dir, store=self.store) as index:
+                        self.index_parsed_block(block_dir_relative, parsed, index)
+            else:
+                self.spimi_invert(self.iter_documents(), memory_budget)
+        self.document_writer = None
+        self.forward_writer = None
 
         self.save()
 
-        with InvertedIndexWriter(self.index_name, self.postings_encoding, directory=os.path.join(os.path.dirname(os.path.realpath(__file__)), self.output_dir)) as merged_index:
+        with InvertedIndexWriter(self.index_name, self.postings_encoding, directory=self.output_dir, store=self.store) as merged_index:
             with contextlib.ExitStack() as stack:
-                indices = [stack.enter_context(InvertedIndexReader(index_id, self.postings_encoding, directory=os.path.join(os.path.dirname(os.path.realpath(__file__)), self.output_dir)))
+                indices = [stack.enter_context(InvertedIndexReader(index_id, self.postings_encoding, directory=self.output_dir, store=self.store))
                            for index_id in self.intermediate_indices]
                 self.merge_index(indices, merged_index)
 
@@ -395,5 +1317,11 @@ if __name__ == "__main__":
 
     BSBI_instance = BSBIIndex(data_dir='collections',
                               postings_encoding=VBEPostings,
-                              output_dir='index')
-    BSBI_instance.do_indexing()  # memulai indexing!
+                              output_dir='index',
+                              store=LocalStore(os.path.dirname(os.path.realpath(__file__))))
+    BSBI_instance.do_indexing(workers=os.cpu_count())  # memulai indexing!
+
+    # vektor LSI dokumen untuk reranking, jika artifacts Letor sudah dilatih
+    from letor import Letor
+    if BSBI_instance.store.exists(os.path.join('letor', Letor.LATEST_FILE)):
+        BSBI_instance.write_doc_vectors(Letor.load(BSBI_instance.store))
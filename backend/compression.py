@@ -2,6 +2,10 @@
 
 import array
 
+import numpy as np
+
+from util import concat_ranges
+
 
 class StandardPostings:
     """ 
@@ -91,6 +95,47 @@ class StandardPostings:
         """
         return StandardPostings.decode(encoded_tf_list)
 
+    # dtype numpy yang sama dengan array('L') di platform ini
+    dtype = np.dtype(f"u{array.array('L').itemsize}")
+
+    @staticmethod
+    def decode_array(encoded_postings_list):
+        """
+        Sama dengan decode, tetapi mengembalikan numpy.ndarray (int64) tanpa
+        membuat list of int Python
+        """
+        return np.frombuffer(encoded_postings_list, dtype=StandardPostings.dtype).astype(np.int64)
+
+    @staticmethod
+    def decode_tf_array(encoded_tf_list):
+        """Sama dengan decode_tf, tetapi mengembalikan numpy.ndarray (int64)"""
+        return StandardPostings.decode_array(encoded_tf_list)
+
+    @staticmethod
+    def encode_block(postings_list, previous_doc_id=0):
+        """
+        Encode sebuah blok dari postings list (lihat skip table pada index.py).
+        previous_doc_id adalah doc ID terakhir di blok sebelumnya; hasil encode
+        semua blok yang disambung sama dengan encode seluruh postings list.
+        """
+        return StandardPostings.encode(postings_list)
+
+    @staticmethod
+    def decode_block(encoded_postings_list, previous_doc_id=0):
+        """Kebalikan dari encode_block; mengembalikan numpy.ndarray (int64)"""
+        return StandardPostings.decode_array(encoded_postings_list)
+
+    @staticmethod
+    def rebase_block(encoded_postings_list, previous_doc_id):
+        """
+        Mengubah hasil encode sebuah postings list menjadi hasil encode_block
+        dengan previous_doc_id, sehingga bisa disambung setelah postings list
+        lain yang doc ID terakhirnya previous_doc_id tanpa decode-encode ulang
+        seluruh list (lihat merge_index di bsbi.py). Doc ID disimpan apa
+        adanya, sehingga bytes tidak berubah.
+        """
+        return encoded_postings_list
+
 
 class VBEPostings:
     """ 
@@ -109,8 +154,17 @@ class VBEPostings:
 
     ASUMSI: postings_list untuk sebuah term MUAT di memori!
 
+    Method vb_encode_number, vb_encode, dan vb_decode adalah implementasi
+    per angka (lihat buku teks). encode dan decode menggunakan versi
+    vectorized (vb_encode_array dan vb_decode_array) yang menghasilkan format
+    bytestream yang sama, namun memproses seluruh list sekaligus dengan numpy.
+
     """
 
+    # postings list yang lebih pendek dari ini lebih cepat diproses per angka,
+    # karena overhead pemanggilan numpy lebih besar dari loop Python-nya
+    VECTORIZE_MIN_LENGTH = 128
+
     @staticmethod
     def vb_encode_number(number):
         """
@@ -118,14 +172,16 @@ class VBEPostings:
         Lihat buku teks kita!
         """
         # TODO
-        bytes = []
+        # digit basis 128 dikumpulkan dari belakang lalu dibalik
+        digits = []
         while True:
-            bytes.insert(0, number % 128)
+            digits.append(number % 128)
             if number < 128:
                 break
             number = number // 128
-        bytes[len(bytes)-1] += 128
-        return array.array('B', bytes).tobytes()
+        digits.reverse()
+        digits[-1] += 128
+        return bytes(digits)
 
     @staticmethod
     def vb_encode(list_of_numbers):
@@ -134,11 +190,7 @@ class VBEPostings:
         list of numbers, dengan Variable-Byte Encoding
         """
         # TODO
-        bytestream = []
-        for number in list_of_numbers:
-            byte = VBEPostings.vb_encode_number(number)
-            bytestream.append(byte)
-        return b"".join(bytestream)
+        return b"".join([VBEPostings.vb_encode_number(number) for number in list_of_numbers])
 
     @staticmethod
     def encode(postings_list):
@@ -158,15 +210,24 @@ class VBEPostings:
             bytearray yang merepresentasikan urutan integer di postings_list
         """
         # TODO
-        if len(postings_list) == 0: 
-            return []
-        
+        # gap pertama adalah posting pertama itu sendiri
+        return VBEPostings.encode_block(postings_list, 0)
+
+    @staticmethod
+    def encode_block(postings_list, previous_doc_id=0):
+        """
+        Encode sebuah blok dari postings list (lihat skip table pada index.py).
+        Gap pertama dihitung terhadap previous_doc_id, yaitu doc ID terakhir
+        di blok sebelumnya, sehingga hasil encode semua blok yang disambung
+        sama dengan encode seluruh postings list.
+        """
         # mengubah posting list menjadi gap based list
-        gap_list = [postings_list[0]]
-        for i in range(1, len(postings_list)):
-            gap_list.append(postings_list[i]-postings_list[i-1])
-            
-        return VBEPostings.vb_encode(gap_list)
+        if len(postings_list) < VBEPostings.VECTORIZE_MIN_LENGTH:
+            gap_list = [postings_list[i] - (postings_list[i - 1] if i > 0 else previous_doc_id)
+                        for i in range(len(postings_list))]
+            return VBEPostings.vb_encode(gap_list)
+        gap_list = np.diff(np.asarray(postings_list, dtype=np.int64), prepend=previous_doc_id)
+        return VBEPostings.vb_encode_array(gap_list)
 
     @staticmethod
     def encode_tf(tf_list):
@@ -184,7 +245,89 @@ class VBEPostings:
             bytearray yang merepresentasikan nilai raw TF kemunculan term di setiap
             dokumen pada list of postings
         """
-        return VBEPostings.vb_encode(tf_list)
+        if len(tf_list) < VBEPostings.VECTORIZE_MIN_LENGTH:
+            return VBEPostings.vb_encode(tf_list)
+        return VBEPostings.vb_encode_array(tf_list)
+
+    @staticmethod
+    def vb_encode_array(list_of_numbers):
+        """
+        Versi vectorized dari vb_encode: seluruh list di-encode sekaligus.
+
+        Setiap angka membutuhkan nbytes = banyaknya digit basis 128. Byte ke-j
+        (dari kiri) sebuah angka berisi digit (angka >> 7 * (nbytes - 1 - j)) & 127,
+        dan byte terakhir setiap angka ditandai dengan bit ke-8 (+128).
+        """
+        numbers = np.asarray(list_of_numbers, dtype=np.int64)
+        if len(numbers) == 0:
+            return b""
+
+        nbytes = VBEPostings.vb_lengths(numbers)
+
+        # posisi byte terakhir setiap angka di bytestream
+        ends = np.cumsum(nbytes) - 1
+        number_index = np.repeat(np.arange(len(numbers)), nbytes)
+        shift = 7 * (ends[number_index] - np.arange(ends[-1] + 1))
+
+        bytestream = ((numbers[number_index] >> shift) & 127).astype(np.uint8)
+        bytestream[ends] |= 128
+        return bytestream.tobytes()
+
+    @staticmethod
+    def vb_lengths(numbers):
+        """
+        Banyaknya byte hasil Variable-Byte Encoding untuk setiap angka di
+        numbers (numpy.ndarray int64 non-negatif, muat di 9 byte)
+        """
+        nbytes = np.ones(len(numbers), dtype=np.int64)
+        for i in range(1, 9):
+            nbytes += numbers >= (1 << (7 * i))
+        return nbytes
+
+    @staticmethod
+    def encode_blocks(postings_list, tf_list, block_size):
+        """
+        Encode postings_list dan tf_list per blok berisi block_size posting
+        (lihat InvertedIndexWriter.encode_blocks) sekaligus dengan numpy.
+        Hasil encode blok-blok yang disambung sama dengan encode seluruh list,
+        sehingga cukup satu kali encode, lalu posisi awal setiap blok dihitung
+        dari banyaknya byte setiap angka.
+
+        Returns
+        -------
+        Tuple[bytes, bytes, numpy.ndarray, numpy.ndarray]
+            Encoded postings list, encoded tf list, serta posisi awal (bytes)
+            setiap blok di keduanya
+        """
+        gap_list = np.diff(np.asarray(postings_list, dtype=np.int64), prepend=0)
+        tf_list = np.asarray(tf_list, dtype=np.int64)
+        starts = np.arange(0, len(gap_list), block_size)
+        postings_offsets = np.concatenate(([0], np.cumsum(VBEPostings.vb_lengths(gap_list))))[starts]
+        tf_offsets = np.concatenate(([0], np.cumsum(VBEPostings.vb_lengths(tf_list))))[starts]
+        return (VBEPostings.vb_encode_array(gap_list), VBEPostings.vb_encode_array(tf_list),
+                postings_offsets, tf_offsets)
+
+    @staticmethod
+    def vb_decode_array(encoded_bytestream):
+        """
+        Versi vectorized dari vb_decode: mengembalikan numpy.ndarray (int64).
+
+        Byte dengan bit ke-8 menandai akhir sebuah angka. Setiap byte digeser
+        sebanyak 7 * (banyaknya byte setelahnya pada angka yang sama), lalu
+        digit-digit setiap angka dijumlahkan dengan np.add.reduceat.
+        """
+        bytestream = np.frombuffer(encoded_bytestream, dtype=np.uint8)
+        ends = np.flatnonzero(bytestream >= 128)
+        if len(ends) == 0:
+            return np.zeros(0, dtype=np.int64)
+        bytestream = bytestream[:ends[-1] + 1]
+
+        starts = np.concatenate(([0], ends[:-1] + 1))
+        number_index = np.repeat(np.arange(len(ends)), ends - starts + 1)
+        shift = 7 * (ends[number_index] - np.arange(len(bytestream)))
+
+        digits = (bytestream & 127).astype(np.int64) << shift
+        return np.add.reduceat(digits, starts)
 
     @staticmethod
     def vb_decode(encoded_bytestream):
@@ -222,11 +365,292 @@ class VBEPostings:
             list of docIDs yang merupakan hasil decoding dari encoded_postings_list
         """
         # TODO
-        postings_list = VBEPostings.vb_decode(encoded_postings_list)
-        
-        for i in range(1, len(postings_list)):
-            postings_list[i] += postings_list[i-1]
-        return postings_list
+        if len(encoded_postings_list) < VBEPostings.VECTORIZE_MIN_LENGTH:
+            postings_list = VBEPostings.vb_decode(encoded_postings_list)
+            for i in range(1, len(postings_list)):
+                postings_list[i] += postings_list[i-1]
+            return postings_list
+        return VBEPostings.decode_array(encoded_postings_list).tolist()
+
+    @staticmethod
+    def decode_tf(encoded_tf_list):
+        """
+        Decodes list of term frequencies dari sebuah stream of bytes
+
+        Parameters
+        ----------
+        encoded_tf_list: bytes
+            bytearray merepresentasikan encoded term frequencies list sebagai keluaran
+            dari static method encode_tf di atas.
+
+        Returns
+        -------
+        List[int]
+            List of term frequencies yang merupakan hasil decoding dari encoded_tf_list
+        """
+        if len(encoded_tf_list) < VBEPostings.VECTORIZE_MIN_LENGTH:
+            return VBEPostings.vb_decode(encoded_tf_list)
+        return VBEPostings.decode_tf_array(encoded_tf_list).tolist()
+
+    @staticmethod
+    def decode_array(encoded_postings_list):
+        """
+        Sama dengan decode, tetapi mengembalikan numpy.ndarray (int64).
+        Gap-based list dikembalikan menjadi docIDs dengan cumsum.
+        """
+        if len(encoded_postings_list) < VBEPostings.VECTORIZE_MIN_LENGTH:
+            return np.cumsum(np.array(VBEPostings.vb_decode(encoded_postings_list), dtype=np.int64))
+        return np.cumsum(VBEPostings.vb_decode_array(encoded_postings_list))
+
+    @staticmethod
+    def decode_tf_array(encoded_tf_list):
+        """Sama dengan decode_tf, tetapi mengembalikan numpy.ndarray (int64)"""
+        if len(encoded_tf_list) < VBEPostings.VECTORIZE_MIN_LENGTH:
+            return np.array(VBEPostings.vb_decode(encoded_tf_list), dtype=np.int64)
+        return VBEPostings.vb_decode_array(encoded_tf_list)
+
+    @staticmethod
+    def decode_block(encoded_postings_list, previous_doc_id=0):
+        """Kebalikan dari encode_block; mengembalikan numpy.ndarray (int64)"""
+        return VBEPostings.decode_array(encoded_postings_list) + previous_doc_id
+
+    @staticmethod
+    def rebase_block(encoded_postings_list, previous_doc_id):
+        """
+        Sama dengan StandardPostings.rebase_block. Hanya gap pertama (doc ID
+        pertama itu sendiri) yang perlu diganti dengan selisihnya terhadap
+        previous_doc_id; gap-gap setelahnya di-copy apa adanya.
+        """
+        encoded_postings_list = bytes(encoded_postings_list)
+        for end, byte in enumerate(encoded_postings_list):
+            if byte >= 128:
+                break
+        else:
+            return encoded_postings_list
+        first_doc_id = VBEPostings.vb_decode(encoded_postings_list[:end + 1])[0]
+        return VBEPostings.vb_encode_number(first_doc_id - previous_doc_id) + encoded_postings_list[end + 1:]
+
+
+class PForDeltaPostings:
+    """
+    Encoding berbasis blok: gap-based list (sama seperti VBEPostings) dibagi
+    menjadi blok berisi BLOCK_SIZE integer, lalu setiap blok di-bit-packing
+    dengan lebar bit b yang sama untuk semua integer di blok tersebut
+    (PForDelta, lihat Zukowski et al., 2006).
+
+    b dipilih agar ukuran blok sekecil mungkin. Integer yang tidak muat di
+    b bit disebut exception: b bit terbawahnya tetap di-bit-packing, sedangkan
+    sisanya (integer >> b) disimpan terpisah dengan Variable-Byte Encoding.
+    Dengan begitu, satu gap yang besar tidak membuat seluruh blok memakai
+    lebar bit yang besar.
+
+    Format satu blok:
+        byte 0          : n, banyaknya integer di blok (1 sampai BLOCK_SIZE)
+        byte 1          : b, lebar bit
+        byte 2          : e, banyaknya exception
+        byte 3-4        : panjang (bytes) bagian high exception, little-endian
+        ceil(n * b / 8) : b bit terbawah setiap integer (integer ke-j berada
+                          di bit j * b sampai j * b + b - 1, little-endian)
+        e bytes         : posisi exception di dalam blok
+        sisanya         : (integer >> b) setiap exception, dengan VByte
+
+    Setiap blok menyimpan panjangnya sendiri, sehingga hasil encode beberapa
+    list yang disambung tetap bisa di-decode sebagai satu list. Namun blok
+    terakhir sebuah list bisa tidak penuh, sehingga hasilnya tidak sama
+    dengan encode gabungan list-nya; karena itu PForDeltaPostings tidak
+    mempunyai rebase_block (lihat merge_term di bsbi.py).
+
+    decode_array membaca header setiap blok, lalu meng-unpack semua integer
+    dari semua blok sekaligus dengan numpy: integer ke-j sebuah blok diambil
+    dari 8 byte (int64 little-endian) yang dimulai pada byte ke-(j * b // 8)
+    dari bloknya, lalu digeser dan di-mask.
+
+    ASUMSI: postings_list untuk sebuah term MUAT di memori!
+    """
+
+    BLOCK_SIZE = 128
+    MAX_BITS = 32
+    HEADER_SIZE = 5
+
+    # bytestream yang lebih pendek dari ini (kira-kira 4 blok) di-decode
+    # dengan loop Python (lihat VBEPostings.VECTORIZE_MIN_LENGTH)
+    VECTORIZE_MIN_LENGTH = 512
+
+    # EXCEPTION_COST[b, l]: ukuran (bytes) posisi dan bagian high sebuah
+    # integer dengan bit length l jika lebar bit blok adalah b
+    EXCEPTION_COST = np.maximum(np.arange(65)[None, :] - np.arange(MAX_BITS + 1)[:, None], 0)
+    EXCEPTION_COST = np.where(EXCEPTION_COST > 0, 1 + (EXCEPTION_COST + 6) // 7, 0)
+
+    @staticmethod
+    def choose_bits(block):
+        """
+        Memilih lebar bit b (0 sampai MAX_BITS) yang menghasilkan blok
+        terkecil, dihitung dari histogram bit length integer di blok
+        """
+        # np.frexp(x)[1] adalah bit length untuk integer x >= 0
+        bit_lengths = np.frexp(block.astype(np.float64))[1]
+        histogram = np.bincount(bit_lengths, minlength=65)
+        bits = np.arange(PForDeltaPostings.MAX_BITS + 1)
+        sizes = (len(block) * bits + 7) // 8 + PForDeltaPostings.EXCEPTION_COST @ histogram
+        return int(np.argmin(sizes))
+
+    @staticmethod
+    def encode_values(list_of_numbers):
+        """Encode list of integers (non-negatif) menjadi bytestream blok-blok PForDelta"""
+        numbers = np.asarray(list_of_numbers, dtype=np.int64)
+        blocks = []
+        for start in range(0, len(numbers), PForDeltaPostings.BLOCK_SIZE):
+            block = numbers[start:start + PForDeltaPostings.BLOCK_SIZE]
+            b = PForDeltaPostings.choose_bits(block)
+            low = block & ((1 << b) - 1)
+            exceptions = np.flatnonzero(block >> b)
+            high = VBEPostings.vb_encode_array(block[exceptions] >> b)
+
+            bits = ((low[:, None] >> np.arange(b)) & 1).astype(np.uint8)
+            packed = np.packbits(bits.ravel(), bitorder='little').tobytes()
+            header = bytes((len(block), b, len(exceptions))) + len(high).to_bytes(2, 'little')
+            blocks.append(header + packed + exceptions.astype(np.uint8).tobytes() + high)
+        return b"".join(blocks)
+
+    @staticmethod
+    def read_headers(encoded_bytestream):
+        """
+        Membaca header semua blok. Mengembalikan numpy.ndarray berukuran
+        (5, banyaknya blok) berisi posisi bit-packing, n, b, e, dan panjang
+        bagian high exception setiap blok.
+        """
+        headers = []
+        pos = 0
+        while pos < len(encoded_bytestream):
+            n, b, e = encoded_bytestream[pos], encoded_bytestream[pos + 1], encoded_bytestream[pos + 2]
+            high_length = encoded_bytestream[pos + 3] | (encoded_bytestream[pos + 4] << 8)
+            headers.append((pos + PForDeltaPostings.HEADER_SIZE, n, b, e, high_length))
+            pos += PForDeltaPostings.HEADER_SIZE + (n * b + 7) // 8 + e + high_length
+        return np.array(headers, dtype=np.int64).reshape(-1, 5).T.copy()
+
+    @staticmethod
+    def decode_values_array(encoded_bytestream):
+        """Kebalikan dari encode_values; mengembalikan numpy.ndarray (int64)"""
+        packed_start, n, b, e, high_lengths = PForDeltaPostings.read_headers(encoded_bytestream)
+
+        # words[i] adalah 8 byte mulai dari byte ke-i (int64 little-endian).
+        # Data diberi tambahan byte 0 agar setiap blok bisa dibaca sebagai blok
+        # penuh (BLOCK_SIZE integer dengan lebar MAX_BITS)
+        padding = PForDeltaPostings.BLOCK_SIZE * PForDeltaPostings.MAX_BITS // 8 + 8
+        data = np.frombuffer(encoded_bytestream, dtype=np.uint8)
+        data = np.concatenate((data, np.zeros(padding, dtype=np.uint8)))
+        words = np.ndarray(shape=(len(data) - 7,), dtype='<i8', buffer=data, strides=(1,))
+
+        # values[i, j] adalah integer ke-j di blok ke-i
+        bit_offsets = b[:, None] * np.arange(PForDeltaPostings.BLOCK_SIZE)
+        values = words.take(packed_start[:, None] + (bit_offsets >> 3))
+        # b <= MAX_BITS, sehingga bit tanda hasil geser selalu tersingkir oleh mask
+        values >>= bit_offsets & 7
+        values &= ((1 << b) - 1)[:, None]
+        if (n[:-1] == PForDeltaPostings.BLOCK_SIZE).all():
+            # hanya blok terakhir yang mungkin tidak penuh
+            values = values.ravel()[:n.sum()]
+        else:
+            values = values[np.arange(PForDeltaPostings.BLOCK_SIZE) < n[:, None]]
+
+        if e.any():
+            exception_start = packed_start + (n * b + 7) // 8
+            indices, owner = concat_ranges(exception_start, e)
+            high_indices, _ = concat_ranges(exception_start + e, high_lengths)
+            high = VBEPostings.vb_decode_array(data.take(high_indices))
+            values[(np.cumsum(n) - n).take(owner) + data.take(indices)] |= high << b.take(owner)
+        return values
+
+    @staticmethod
+    def decode_values(encoded_bytestream):
+        """Kebalikan dari encode_values, per blok dengan loop Python; mengembalikan List[int]"""
+        numbers = []
+        pos = 0
+        while pos < len(encoded_bytestream):
+            n, b, e = encoded_bytestream[pos], encoded_bytestream[pos + 1], encoded_bytestream[pos + 2]
+            high_length = encoded_bytestream[pos + 3] | (encoded_bytestream[pos + 4] << 8)
+            packed_start = pos + PForDeltaPostings.HEADER_SIZE
+            exception_start = packed_start + (n * b + 7) // 8
+            high_start = exception_start + e
+
+            packed = int.from_bytes(encoded_bytestream[packed_start:exception_start], 'little')
+            mask = (1 << b) - 1
+            block = [(packed >> (j * b)) & mask for j in range(n)]
+            high = VBEPostings.vb_decode(encoded_bytestream[high_start:high_start + high_length])
+            for position, number in zip(encoded_bytestream[exception_start:high_start], high):
+                block[position] |= number << b
+            numbers.extend(block)
+            pos = high_start + high_length
+        return numbers
+
+    @staticmethod
+    def encode(postings_list):
+        """
+        Encode postings_list menjadi stream of bytes: gap-based list dari
+        postings_list di-encode dengan encode_values
+
+        Parameters
+        ----------
+        postings_list: List[int]
+            List of docIDs (postings)
+
+        Returns
+        -------
+        bytes
+            bytearray yang merepresentasikan urutan integer di postings_list
+        """
+        return PForDeltaPostings.encode_block(postings_list, 0)
+
+    @staticmethod
+    def encode_block(postings_list, previous_doc_id=0):
+        """
+        Encode sebuah blok dari postings list (lihat skip table pada index.py).
+        Gap pertama dihitung terhadap previous_doc_id, yaitu doc ID terakhir
+        di blok sebelumnya.
+        """
+        gap_list = np.diff(np.asarray(postings_list, dtype=np.int64), prepend=previous_doc_id)
+        return PForDeltaPostings.encode_values(gap_list)
+
+    @staticmethod
+    def encode_tf(tf_list):
+        """
+        Encode list of term frequencies menjadi stream of bytes
+
+        Parameters
+        ----------
+        tf_list: List[int]
+            List of term frequencies
+
+        Returns
+        -------
+        bytes
+            bytearray yang merepresentasikan nilai raw TF kemunculan term di setiap
+            dokumen pada list of postings
+        """
+        return PForDeltaPostings.encode_values(tf_list)
+
+    @staticmethod
+    def decode(encoded_postings_list):
+        """
+        Decodes postings_list dari sebuah stream of bytes
+
+        Parameters
+        ----------
+        encoded_postings_list: bytes
+            bytearray merepresentasikan encoded postings list sebagai keluaran
+            dari static method encode di atas.
+
+        Returns
+        -------
+        List[int]
+            list of docIDs yang merupakan hasil decoding dari encoded_postings_list
+        """
+        if len(encoded_postings_list) < PForDeltaPostings.VECTORIZE_MIN_LENGTH:
+            postings_list = PForDeltaPostings.decode_values(encoded_postings_list)
+            for i in range(1, len(postings_list)):
+                postings_list[i] += postings_list[i - 1]
+            return postings_list
+        return PForDeltaPostings.decode_array(encoded_postings_list).tolist()
 
     @staticmethod
     def decode_tf(encoded_tf_list):
@@ -244,14 +668,111 @@ class VBEPostings:
         List[int]
             List of term frequencies yang merupakan hasil decoding dari encoded_tf_list
         """
-        return VBEPostings.vb_decode(encoded_tf_list)
+        if len(encoded_tf_list) < PForDeltaPostings.VECTORIZE_MIN_LENGTH:
+            return PForDeltaPostings.decode_values(encoded_tf_list)
+        return PForDeltaPostings.decode_tf_array(encoded_tf_list).tolist()
+
+    @staticmethod
+    def decode_array(encoded_postings_list):
+        """Sama dengan decode, tetapi mengembalikan numpy.ndarray (int64)"""
+        if len(encoded_postings_list) < PForDeltaPostings.VECTORIZE_MIN_LENGTH:
+            return np.cumsum(np.array(PForDeltaPostings.decode_values(encoded_postings_list), dtype=np.int64))
+        return np.cumsum(PForDeltaPostings.decode_values_array(encoded_postings_list))
+
+    @staticmethod
+    def decode_tf_array(encoded_tf_list):
+        """Sama dengan decode_tf, tetapi mengembalikan numpy.ndarray (int64)"""
+        if len(encoded_tf_list) < PForDeltaPostings.VECTORIZE_MIN_LENGTH:
+            return np.array(PForDeltaPostings.decode_values(encoded_tf_list), dtype=np.int64)
+        return PForDeltaPostings.decode_values_array(encoded_tf_list)
+
+    @staticmethod
+    def decode_block(encoded_postings_list, previous_doc_id=0):
+        """Kebalikan dari encode_block; mengembalikan numpy.ndarray (int64)"""
+        return PForDeltaPostings.decode_array(encoded_postings_list) + previous_doc_id
+
+
+class VBEPositions:
+    """
+    Encoding untuk posisi kemunculan term (positional index). Untuk setiap
+    posting, posisi-posisi term di dokumen tersebut (terurut membesar)
+    diubah menjadi gap-based list (gap pertama adalah posisi pertama itu
+    sendiri), lalu gap-gap semua posting disambung dan di-encode dengan
+    Variable-Byte Encoding.
+
+    Banyaknya posisi untuk setiap posting sama dengan TF-nya, sehingga
+    bytestream dipisah kembali per posting menggunakan tf list.
+
+    Contoh:
+    posisi [[3, 10, 11], [0, 7]] (TF [3, 2]) diubah menjadi gap
+    [3, 7, 1, 0, 7] sebelum di-encode.
+    """
+
+    @staticmethod
+    def encode(positions_lists):
+        """
+        Encode posisi untuk setiap posting menjadi stream of bytes
+
+        Parameters
+        ----------
+        positions_lists: List[List[int]]
+            Posisi term (terurut membesar) di setiap dokumen pada postings list
+
+        Returns
+        -------
+        bytes
+        """
+        lengths = np.array([len(positions) for positions in positions_lists], dtype=np.int64)
+        if lengths.sum() == 0:
+            return b""
+        positions = np.concatenate([np.asarray(positions, dtype=np.int64) for positions in positions_lists])
+        gaps = np.diff(positions, prepend=0)
+        starts = (np.cumsum(lengths) - lengths)[lengths > 0]
+        gaps[starts] = positions[starts]
+        return VBEPostings.vb_encode_array(gaps)
+
+    @staticmethod
+    def decode_array(encoded_positions, tf_list):
+        """
+        Decodes posisi dari sebuah stream of bytes.
+
+        Parameters
+        ----------
+        encoded_positions: bytes
+            Keluaran dari static method encode di atas
+        tf_list: array-like of int
+            TF setiap posting
+
+        Returns
+        -------
+        Tuple[numpy.ndarray, numpy.ndarray]
+            positions dan offsets (int64): posisi term pada posting ke-i adalah
+            positions[offsets[i]:offsets[i + 1]]
+        """
+        tf_list = np.asarray(tf_list, dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(tf_list)))
+        gaps = VBEPostings.vb_decode_array(encoded_positions)
+        if len(gaps) == 0:
+            return gaps, offsets
+        # cumsum seluruh gap, lalu dikurangi cumsum sebelum awal setiap posting
+        positions = np.cumsum(gaps)
+        base = (positions - gaps)[offsets[:-1][tf_list > 0]]
+        positions -= np.repeat(base, tf_list[tf_list > 0])
+        return positions, offsets
+
+    @staticmethod
+    def decode(encoded_positions, tf_list):
+        """Sama dengan decode_array, tetapi mengembalikan List[List[int]] (satu list per posting)"""
+        positions, offsets = VBEPositions.decode_array(encoded_positions, tf_list)
+        positions = positions.tolist()
+        return [positions[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
 
 
 if __name__ == '__main__':
 
     postings_list = [34, 67, 89, 454, 2345738]
     tf_list = [12, 10, 3, 4, 1]
-    for Postings in [StandardPostings, VBEPostings]:
+    for Postings in [StandardPostings, VBEPostings, PForDeltaPostings]:
         print(Postings.__name__)
         encoded_postings_list = Postings.encode(postings_list)
         encoded_tf_list = Postings.encode_tf(tf_list)
@@ -267,4 +788,60 @@ if __name__ == '__main__':
         print("hasil decoding (TF list) : ", decoded_tf_list)
         assert decoded_posting_list == postings_list, "hasil decoding tidak sama dengan postings original"
         assert decoded_tf_list == tf_list, "hasil decoding tidak sama dengan postings original"
+        assert Postings.decode_array(encoded_postings_list).tolist() == postings_list, "hasil decoding tidak sama dengan postings original"
+        assert Postings.decode_tf_array(encoded_tf_list).tolist() == tf_list, "hasil decoding tidak sama dengan postings original"
+        assert Postings.decode(Postings.encode([])) == [], "hasil decoding tidak sama dengan postings original"
         print()
+
+    # versi vectorized menghasilkan bytestream yang sama dengan versi per angka
+    numbers = [0, 1, 127, 128, 16383, 16384, 2345738, 2 ** 40]
+    assert VBEPostings.vb_encode_array(numbers) == VBEPostings.vb_encode(numbers), "vb_encode_array salah"
+    assert VBEPostings.vb_decode_array(VBEPostings.vb_encode(numbers)).tolist() == numbers, "vb_decode_array salah"
+    postings_list = list(range(3, 1000 * 131, 131))
+    assert VBEPostings.decode(VBEPostings.encode(postings_list)) == postings_list, "hasil decoding tidak sama dengan postings original"
+    assert VBEPostings.decode_tf(VBEPostings.encode_tf(postings_list)) == postings_list, "hasil decoding tidak sama dengan postings original"
+
+    # PForDeltaPostings: blok penuh, blok dengan exception, dan list yang disambung
+    postings_list = sorted(set(list(range(0, 300 * 7, 7)) + [10 ** 6, 10 ** 6 + 1, 2 ** 33]))
+    tf_list = [1, 2, 3] * 100 + [70000, 5, 1]
+    encoded_postings_list = PForDeltaPostings.encode(postings_list)
+    encoded_tf_list = PForDeltaPostings.encode_tf(tf_list)
+    assert PForDeltaPostings.decode(encoded_postings_list) == postings_list, "hasil decoding tidak sama dengan postings original"
+    assert PForDeltaPostings.decode_tf(encoded_tf_list) == tf_list, "hasil decoding tidak sama dengan postings original"
+    assert PForDeltaPostings.decode_values(encoded_tf_list) == tf_list, "decode_values salah"
+    assert PForDeltaPostings.decode_values_array(encoded_tf_list[:0]).tolist() == [], "decode_values_array salah"
+    encoded = PForDeltaPostings.encode_values(tf_list[:5]) + PForDeltaPostings.encode_values(tf_list[5:])
+    assert PForDeltaPostings.decode_values_array(encoded).tolist() == tf_list, "decode_values_array salah"
+    assert len(encoded_tf_list) < len(VBEPostings.encode_tf(tf_list)), "PForDelta lebih besar dari VBE"
+
+    # hasil encode_block semua blok yang disambung sama dengan hasil encode
+    postings_list = list(range(5, 400 * 3, 3))
+    for Postings in [StandardPostings, VBEPostings, PForDeltaPostings]:
+        blocks = [postings_list[i:i + 128] for i in range(0, len(postings_list), 128)]
+        encoded_blocks = [Postings.encode_block(block, blocks[i - 1][-1] if i > 0 else 0)
+                          for i, block in enumerate(blocks)]
+        assert b"".join(encoded_blocks) == Postings.encode(postings_list), "encode_block salah"
+        assert Postings.decode_block(encoded_blocks[1], blocks[0][-1]).tolist() == blocks[1], "decode_block salah"
+
+    # encode_blocks sama dengan encode_block per blok
+    postings_list = list(range(5, 400 * 3, 3)) + [10 ** 6]
+    tf_list = [1, 200, 3] * 133 + [70000]
+    encoded_postings_list, encoded_tf_list, postings_offsets, tf_offsets = VBEPostings.encode_blocks(postings_list, tf_list, 128)
+    assert encoded_postings_list == VBEPostings.encode(postings_list), "encode_blocks salah"
+    assert encoded_tf_list == VBEPostings.encode_tf(tf_list), "encode_blocks salah"
+    assert postings_offsets.tolist() == [len(VBEPostings.encode(postings_list[:i])) for i in range(0, 401, 128)], "encode_blocks salah"
+    assert tf_offsets.tolist() == [len(VBEPostings.encode_tf(tf_list[:i])) for i in range(0, 401, 128)], "encode_blocks salah"
+
+    # postings list yang disambung dengan rebase_block, dan tf list yang disambung apa adanya
+    postings1, postings2 = [5, 90, 200], list(range(20000, 20000 + 300 * 5, 5))
+    for Postings in [StandardPostings, VBEPostings]:
+        encoded = Postings.encode(postings1) + Postings.rebase_block(Postings.encode(postings2), postings1[-1])
+        assert Postings.decode(encoded) == postings1 + postings2, "rebase_block salah"
+        assert Postings.rebase_block(Postings.encode([]), 7) == Postings.encode_block([], 7), "rebase_block salah"
+        encoded = Postings.encode_tf(tf_list[:3]) + Postings.encode_tf(tf_list[3:])
+        assert Postings.decode_tf_array(encoded).tolist() == tf_list, "tf list yang disambung salah"
+
+    positions_lists = [[3, 10, 11], [0, 7], [200, 100000]]
+    encoded_positions = VBEPositions.encode(positions_lists)
+    assert VBEPositions.decode(encoded_positions, [3, 2, 2]) == positions_lists, "VBEPositions salah"
+    assert VBEPositions.decode(VBEPositions.encode([]), []) == [], "VBEPositions salah"
@@ -0,0 +1,326 @@
+# referensi: https://docs.python.org/3/library/zlib.html ,
+# https://python-zstandard.readthedocs.io/
+
+import array
+import pickle
+import os
+import zlib
+
+import numpy as np
+
+from store import default_store
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def compress_document(data, compression):
+    """Mengompresi bytes isi dokumen dengan skema compression ('none', 'zlib', atau 'zstd')"""
+    if compression == 'none':
+        return data
+    if compression == 'zlib':
+        return zlib.compress(data, 6)
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ValueError("compression 'zstd' membutuhkan package zstandard")
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    raise ValueError(f"compression tidak dikenal: {compression}")
+
+
+def decompress_document(data, compression):
+    """Kebalikan dari compress_document; mengembalikan bytes"""
+    if compression == 'none':
+        return bytes(data)
+    if compression == 'zlib':
+        return zlib.decompress(data)
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ValueError("compression 'zstd' membutuhkan package zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f"compression tidak dikenal: {compression}")
+
+
+def token_hashes(tokens):
+    """Hash crc32 (numpy.ndarray uint32, terurut) dari token-token unik"""
+    return np.unique(np.fromiter((zlib.crc32(token.encode('utf-8')) for token in set(tokens)), dtype=np.uint32))
+
+
+def read_ranges(data_file, ranges, max_gap=64 * 1024, executor=None):
+    """
+    Membaca banyak range (offset, length) dari data_file (lihat
+    store.open_reader).
+
+    Range diurutkan berdasarkan offset, lalu range yang jaraknya di file tidak
+    lebih dari max_gap bytes digabung menjadi satu ranged read. Jika executor
+    (misal ThreadPoolExecutor) diberikan, ranged read dijalankan paralel.
+
+    Returns
+    -------
+    List[bytes]
+        Isi setiap range (bytes atau memoryview), urutannya sama dengan ranges
+    """
+    # daftar (offset, length, index di ranges) yang terurut berdasarkan offset
+    entries = sorted((offset, length, i) for i, (offset, length) in enumerate(ranges))
+
+    # mengelompokkan range yang berdekatan menjadi satu ranged read
+    runs = []
+    for entry in entries:
+        offset, length, _ = entry
+        if runs and offset - runs[-1][1] <= max_gap:
+            runs[-1][1] = max(runs[-1][1], offset + length)
+            runs[-1][2].append(entry)
+        else:
+            runs.append([offset, offset + length, [entry]])
+
+    def read_run(run):
+        start, end, _ = run
+        return data_file.read_at(start, end - start)
+
+    if executor is not None:
+        buffers = list(executor.map(read_run, runs))
+    else:
+        buffers = [read_run(run) for run in runs]
+
+    result = [None] * len(ranges)
+    for (start, _, run_entries), buffer in zip(runs, buffers):
+        for offset, length, i in run_entries:
+            result[i] = buffer[offset - start:offset - start + length]
+    return result
+
+
+class DocumentStore:
+    """
+    Document store yang menyimpan isi semua dokumen di koleksi dalam satu
+    file data, sehingga isi banyak dokumen bisa diambil dengan beberapa ranged
+    read (atau slice mmap) alih-alih membuka satu blob per dokumen.
+
+    Seperti InvertedIndex, document store terdiri dari dua file:
+        1. <name>.store : isi dokumen (setelah dikompresi) yang disambung
+        2. <name>.dict  : metadata (offsets dan compression), disimpan dengan pickle
+
+    Attributes
+    ----------
+    offsets: array('Q')
+        Untuk doc ID d, offsets[2*d] adalah posisi awal (dalam bytes) isi
+        dokumen di file data, dan offsets[2*d+1] adalah panjangnya dalam
+        bytes. Doc ID yang tidak pernah ditambahkan mempunyai panjang 0
+        dan dianggap kosong.
+    compression: str
+        Skema compression per dokumen: 'none', 'zlib', atau 'zstd'
+    """
+
+    def __init__(self, name, directory='', store=None):
+        """
+        Parameters
+        ----------
+        name (str): Nama yang digunakan untuk menyimpan files document store
+        directory (str): directory dimana file document store berada
+        store : storage layer (lihat store.py), default-nya bucket GCS
+        """
+        self.data_file_path = os.path.join(directory, name + '.store')
+        self.metadata_file_path = os.path.join(directory, name + '.dict')
+        self.store = store if store is not None else default_store
+
+        self.offsets = array.array('Q')
+        self.compression = 'none'
+
+    def __len__(self):
+        return len(self.offsets) // 2
+
+
+class DocumentStoreReader(DocumentStore):
+    """
+    Membaca isi dokumen dari document store berdasarkan doc ID.
+    """
+
+    def __enter__(self):
+        self.data_file = self.store.open_reader(self.data_file_path)
+        with self.store.open(self.metadata_file_path, 'rb') as f:
+            self.offsets, self.compression = pickle.load(f)
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.data_file.close()
+
+    def get(self, doc_id):
+        """Mengembalikan isi dokumen (str) dengan doc ID doc_id"""
+        return self.get_many([doc_id])[0]
+
+    def get_many(self, doc_ids, max_gap=64 * 1024, executor=None):
+        """
+        Mengembalikan isi semua dokumen pada doc_ids.
+
+        Dokumen yang jaraknya di file data tidak lebih dari max_gap bytes
+        dibaca dengan satu ranged read (lihat read_ranges). Jika executor
+        (misal ThreadPoolExecutor) diberikan, ranged read dijalankan paralel.
+
+        Parameters
+        ----------
+        doc_ids: List[int]
+            List of doc IDs
+        max_gap: int
+            Jarak maksimum (bytes) antara dua dokumen agar dibaca sekaligus
+
+        Returns
+        -------
+        List[str]
+            Isi dokumen, urutannya sama dengan doc_ids
+        """
+        ranges = [(self.offsets[2 * doc_id], self.offsets[2 * doc_id + 1]) for doc_id in doc_ids]
+        return ['' if length == 0 else decompress_document(data, self.compression).decode('utf-8')
+                for data, (_, length) in zip(read_ranges(self.data_file, ranges, max_gap, executor), ranges)]
+
+
+class DocumentStoreWriter(DocumentStore):
+    """
+    Menulis isi dokumen ke document store. Metadata hanya ditulis ketika
+    keluar context tanpa exception.
+    """
+
+    def __init__(self, name, directory='', store=None, compression='zlib'):
+        super().__init__(name, directory=directory, store=store)
+        # memastikan compression yang dipilih tersedia sebelum indexing dimulai
+        compress_document(b'', compression)
+        self.compression = compression
+
+    def __enter__(self):
+        self.data_file = self.store.open(self.data_file_path, 'wb')
+        self.position = 0
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.data_file.close()
+        if exception_type is not None:
+            return
+        with self.store.open(self.metadata_file_path, 'wb') as f:
+            pickle.dump([self.offsets, self.compression], f)
+
+    def add(self, doc_id, content):
+        """
+        Menambahkan isi dokumen (str) dengan doc ID doc_id ke posisi akhir
+        file data.
+        """
+        encoded = compress_document(content.encode('utf-8'), self.compression)
+        if len(self.offsets) < 2 * (doc_id + 1):
+            self.offsets.extend([0] * (2 * (doc_id + 1) - len(self.offsets)))
+        self.offsets[2 * doc_id] = self.position
+        self.offsets[2 * doc_id + 1] = len(encoded)
+        self.data_file.write(encoded)
+        self.position += len(encoded)
+
+
+class ForwardIndex:
+    """
+    Forward index yang menyimpan himpunan token setiap dokumen (hash crc32
+    dari token unik hasil split, lihat token_hashes), sehingga fitur reranking
+    seperti jaccard bisa dihitung tanpa membaca isi dokumen.
+
+    Seperti DocumentStore, forward index terdiri dari dua file:
+        1. <name>.fwd  : hash (uint32 little-endian) semua dokumen yang disambung
+        2. <name>.dict : offsets (array('Q')), disimpan dengan pickle
+
+    Attributes
+    ----------
+    offsets: array('Q')
+        Untuk doc ID d, offsets[2*d] adalah posisi awal (dalam bytes) hash
+        dokumen di file data, dan offsets[2*d+1] adalah panjangnya dalam
+        bytes. Doc ID yang tidak pernah ditambahkan tidak mempunyai token.
+    """
+
+    def __init__(self, name, directory='', store=None):
+        """
+        Parameters
+        ----------
+        name (str): Nama yang digunakan untuk menyimpan files forward index
+        directory (str): directory dimana file forward index berada
+        store : storage layer (lihat store.py), default-nya bucket GCS
+        """
+        self.data_file_path = os.path.join(directory, name + '.fwd')
+        self.metadata_file_path = os.path.join(directory, name + '.dict')
+        self.store = store if store is not None else default_store
+
+        self.offsets = array.array('Q')
+
+    def __len__(self):
+        return len(self.offsets) // 2
+
+
+class ForwardIndexReader(ForwardIndex):
+    """
+    Membaca hash token dokumen dari forward index berdasarkan doc ID.
+    """
+
+    def __enter__(self):
+        self.data_file = self.store.open_reader(self.data_file_path)
+        with self.store.open(self.metadata_file_path, 'rb') as f:
+            self.offsets = pickle.load(f)
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.data_file.close()
+
+    def get_many(self, doc_ids, max_gap=64 * 1024, executor=None):
+        """
+        Mengembalikan hash token unik (numpy.ndarray uint32, terurut) setiap
+        dokumen pada doc_ids, dengan ranged read seperti
+        DocumentStoreReader.get_many.
+        """
+        ranges = [(self.offsets[2 * doc_id], self.offsets[2 * doc_id + 1]) for doc_id in doc_ids]
+        return [np.frombuffer(data, dtype='<u4') for data in read_ranges(self.data_file, ranges, max_gap, executor)]
+
+
+class ForwardIndexWriter(ForwardIndex):
+    """
+    Menulis hash token dokumen ke forward index. Metadata hanya ditulis
+    ketika keluar context tanpa exception.
+    """
+
+    def __enter__(self):
+        self.data_file = self.store.open(self.data_file_path, 'wb')
+        self.position = 0
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.data_file.close()
+        if exception_type is not None:
+            return
+        with self.store.open(self.metadata_file_path, 'wb') as f:
+            pickle.dump(self.offsets, f)
+
+    def add(self, doc_id, tokens):
+        """Menambahkan hash token unik (lihat token_hashes) dokumen doc_id"""
+        encoded = token_hashes(tokens).astype('<u4').tobytes()
+        if len(self.offsets) < 2 * (doc_id + 1):
+            self.offsets.extend([0] * (2 * (doc_id + 1) - len(self.offsets)))
+        self.offsets[2 * doc_id] = self.position
+        self.offsets[2 * doc_id + 1] = len(encoded)
+        self.data_file.write(encoded)
+        self.position += len(encoded)
+
+
+if __name__ == '__main__':
+
+    import tempfile
+    from store import LocalStore
+
+    local_store = LocalStore(tempfile.mkdtemp())
+    docs = ["sakit kepala dan demam", "", "batuk pilek " * 100, "nyeri perut"]
+    for compression in ['none', 'zlib']:
+        with DocumentStoreWriter('documents', store=local_store, compression=compression) as writer:
+            for doc_id, content in enumerate(docs):
+                writer.add(doc_id, content)
+        with DocumentStoreReader('documents', store=local_store) as reader:
+            assert len(reader) == len(docs), "jumlah dokumen salah"
+            assert reader.get(2) == docs[2], "isi dokumen salah"
+            assert reader.get_many([3, 0, 1]) == [docs[3], docs[0], docs[1]], "isi dokumen salah"
+            assert reader.get_many([3, 0], max_gap=0) == [docs[3], docs[0]], "isi dokumen salah"
+
+    with ForwardIndexWriter('forward', store=local_store) as writer:
+        for doc_id, content in enumerate(docs):
+            writer.add(doc_id, content.split())
+    with ForwardIndexReader('forward', store=local_store) as reader:
+        hashes = reader.get_many([2, 1, 0])
+        assert hashes[0].tolist() == sorted(token_hashes(["batuk", "pilek"]).tolist()), "hash token salah"
+        assert len(hashes[1]) == 0 and len(hashes[2]) == 4, "hash token salah"
@@ -0,0 +1,71 @@
+# referensi: https://docs.python.org/3/library/concurrent.futures.html
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+class DocumentFetcher:
+    """
+    Mengambil isi banyak dokumen sekaligus dari sebuah store (GCSStore atau
+    LocalStore) secara paralel, sehingga waktu untuk mengambil seluruh hasil
+    retrieval mendekati waktu satu round trip, bukan jumlah semua round trip.
+
+    Thread pool dibuat sekali dan dipakai ulang oleh setiap request.
+
+    Attributes
+    ----------
+    store: Storage layer tempat koleksi dokumen berada (lihat store.py)
+    prefix(str): Direktori koleksi di dalam store
+    max_workers(int): Banyaknya request yang berjalan bersamaan. Default-nya
+                    sama dengan ukuran connection pool client GCS (10), agar
+                    koneksi HTTP tetap dipakai ulang
+    timeout(float): Batas waktu (detik) untuk satu kali fetch
+    """
+
+    def __init__(self, store, prefix="collections", max_workers=10, timeout=10.0):
+        self.store = store
+        self.prefix = prefix
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def doc_path(self, doc_name):
+        """
+        Mengubah nama dokumen pada doc_id_map (misal './0\\10007.txt') menjadi
+        path di dalam store (misal 'collections/0/10007.txt')
+        """
+        return self.prefix + "/" + doc_name[2:].replace("\\", "/")
+
+    def fetch(self, doc_names, timeout=None):
+        """
+        Mengambil isi dari semua dokumen pada doc_names.
+
+        Parameters
+        ----------
+        doc_names: List[str]
+            Nama-nama dokumen sesuai doc_id_map
+        timeout: float
+            Batas waktu (detik) untuk request ini; default-nya self.timeout.
+            Dokumen yang belum selesai diambil saat batas waktu habis (atau
+            gagal diambil) dilewati.
+
+        Returns
+        -------
+        List[Tuple[str, str]]
+            List of (doc_name, content), urutannya sama dengan doc_names
+        """
+        deadline = time.time() + (self.timeout if timeout is None else timeout)
+        futures = [self.executor.submit(self.store.read_text, self.doc_path(doc_name))
+                   for doc_name in doc_names]
+        wait(futures, timeout=max(0, deadline - time.time()))
+
+        result = []
+        for doc_name, future in zip(doc_names, futures):
+            if future.done() and future.exception() is None:
+                result.append((doc_name, future.result()))
+            else:
+                future.cancel()
+        return result
+
+    def close(self):
+        self.executor.shutdown(wait=False)
@@ -2,10 +2,12 @@
 
 import pickle
 import os
-from google.cloud import storage
 
-client_storage = storage.Client()
-bucket = client_storage.bucket("diagnosee-collections")
+import numpy as np
+
+from compression import VBEPositions
+from store import default_store
+from termdict import DocLengths, PostingsTable
 
 class InvertedIndex:
     """
@@ -42,9 +44,64 @@ class InvertedIndex:
         List of terms IDs, untuk mengingat urutan terms yang dimasukan ke
         dalam Inverted Index.
 
+    max_tf: Dictionary mapping termID -> TF terbesar di postings list term
+        tersebut. Dipakai untuk menghitung upper bound score sebuah term pada
+        dynamic pruning (WAND).
+
+    impact_info: Dictionary berisi parameter impact score (lihat
+        scoring.ImpactQuantizer.info), misalnya scheme, k1, b, dan scale.
+        Kosong jika index tidak menyimpan impact score. Jika ada, impact
+        (1 byte per posting) disimpan tepat setelah tf list setiap term.
+
+    skip_dict: Dictionary mapping termID -> skip table (numpy.ndarray int64
+        berukuran (banyaknya blok, 4)) untuk term dengan postings list yang
+        lebih panjang dari SKIP_BLOCK_SIZE. Postings list dan tf list term
+        tersebut di-encode per blok berisi SKIP_BLOCK_SIZE posting (lihat
+        encode_block di compression.py), dan setiap baris skip table berisi:
+           1. SKIP_LAST_DOC : doc ID terakhir di blok
+           2. SKIP_POSTINGS_OFFSET : posisi awal blok (bytes) relatif terhadap
+              awal postings list
+           3. SKIP_TF_OFFSET : posisi awal blok (bytes) relatif terhadap awal
+              tf list
+           4. SKIP_MAX_TF : TF terbesar di blok
+        Bytes semua blok yang disambung sama dengan hasil encode seluruh list,
+        sehingga postings list tetap bisa dibaca sekaligus.
+
+    positions_dict: Dictionary mapping termID -> (start_position_in_positions_file,
+        length_in_bytes_of_positions) untuk positional index. Posisi term di
+        setiap dokumen (lihat VBEPositions di compression.py) disimpan di file
+        terpisah (<index_name>.pos), sehingga query yang tidak membutuhkan
+        posisi tidak pernah membacanya. Kosong jika index tidak menyimpan
+        posisi.
+
+    store: GCSStore atau LocalStore
+        Storage layer tempat file index berada (lihat store.py). GCSStore
+        membaca postings dengan ranged request ke bucket, sedangkan LocalStore
+        membaca postings dari file lokal melalui mmap.
+
+    Writer menyimpan postings_dict beserta max_tf di <index_name>.ptab dan
+    doc_length di <index_name>.lengths (lihat termdict.py), sehingga reader
+    bisa memakainya langsung dari mmap tanpa unpickling. Metadata lain tetap
+    disimpan di <index_name>.dict dengan pickle. Reader juga masih bisa
+    membaca index lama yang menyimpan semuanya di <index_name>.dict.
+
     """
 
-    def __init__(self, index_name, postings_encoding, directory=''):
+    # Metadata tambahan (selain postings_dict, terms, dan doc_length) yang
+    # disimpan sebagai elemen keempat file metadata: nama atribut -> factory
+    # nilai default untuk index lama yang belum menyimpannya
+    EXTRA_METADATA = {
+        'max_tf': dict,
+        'impact_info': dict,
+        'skip_dict': dict,
+        'positions_dict': dict,
+    }
+
+    # banyaknya posting per blok, dan kolom-kolom skip table (lihat skip_dict)
+    SKIP_BLOCK_SIZE = 128
+    SKIP_LAST_DOC, SKIP_POSTINGS_OFFSET, SKIP_TF_OFFSET, SKIP_MAX_TF = range(4)
+
+    def __init__(self, index_name, postings_encoding, directory='', store=None):
         """
         Parameters
         ----------
@@ -52,13 +109,19 @@ class InvertedIndex:
         postings_encoding : Lihat di compression.py, kandidatnya adalah StandardPostings,
                         GapBasedPostings, dsb.
         directory (str): directory dimana file index berada
+        store : storage layer (lihat store.py), default-nya bucket GCS
         """
 
         self.index_file_path = os.path.join(directory, index_name+'.index')
         self.metadata_file_path = os.path.join(directory, index_name+'.dict')
+        self.positions_file_path = os.path.join(directory, index_name+'.pos')
+        self.postings_table_path = os.path.join(directory, index_name+'.ptab')
+        self.doc_length_path = os.path.join(directory, index_name+'.lengths')
+        self.positions_file = None
 
         self.postings_encoding = postings_encoding
         self.directory = directory
+        self.store = store if store is not None else default_store
 
         self.postings_dict = {}
         self.terms = []         # Untuk keep track urutan term yang dimasukkan ke index
@@ -66,6 +129,46 @@ class InvertedIndex:
         self.doc_length = {}
         # Ini nantinya akan berguna untuk normalisasi Score terhadap panjang
         # dokumen saat menghitung score dengan TF-IDF atau BM25
+        # key: term ID, value: TF terbesar (untuk upper bound score pada WAND)
+        self.max_tf = {}
+        self.impact_info = {}
+        self.skip_dict = {}
+        self.positions_dict = {}
+
+    def load_metadata(self, f):
+        """Memuat metadata dari file object f (lihat dump_metadata)"""
+        metadata = pickle.load(f)
+        self.postings_dict, self.terms, self.doc_length = metadata[:3]
+        extra = metadata[3] if len(metadata) > 3 else {}
+        for name, default in self.EXTRA_METADATA.items():
+            setattr(self, name, extra.get(name, default()))
+
+    def dump_metadata(self, f):
+        """
+        Menyimpan metadata ke file object f dengan bantuan pickle.
+        postings_dict, terms, doc_length, dan max_tf tidak ikut disimpan
+        karena sudah ada di file postings table dan doc lengths (lihat
+        dump_tables).
+        """
+        extra = {name: getattr(self, name) for name in self.EXTRA_METADATA if name != 'max_tf'}
+        pickle.dump([None, None, None, extra], f)
+
+    def dump_tables(self):
+        """Menulis postings_dict (beserta max_tf) dan doc_length ke file masing-masing"""
+        with self.store.open(self.postings_table_path, 'wb') as f:
+            PostingsTable.write(f, self.postings_dict, self.max_tf)
+        with self.store.open(self.doc_length_path, 'wb') as f:
+            DocLengths.write(f, self.doc_length)
+
+    def load_tables(self):
+        """
+        Membuka postings table dan doc lengths (lihat dump_tables). Urutan
+        terms sama dengan urutan postings di file index.
+        """
+        self.postings_dict = PostingsTable(self.store.open_reader(self.postings_table_path))
+        self.max_tf = self.postings_dict.max_tf
+        self.terms = self.postings_dict.term_ids()
+        self.doc_length = DocLengths(self.store.open_reader(self.doc_length_path))
 
     def __enter__(self):
         """
@@ -87,30 +190,40 @@ class InvertedIndex:
 
         https://docs.python.org/3/reference/datamodel.html#object.__enter__
         """
-        # Membuka index file
-        self.index_file = bucket.blob(self.index_file_path).open('rb')
+        # Membuka index file untuk dibaca secara acak (read_at)
+        self.index_file = self.store.open_reader(self.index_file_path)
 
         # Kita muat postings dict dan terms iterator dari file metadata
-        with bucket.blob(self.metadata_file_path).open('rb') as f:
-            self.postings_dict, self.terms, self.doc_length = pickle.load(f)
-            self.term_iter = self.terms.__iter__()
+        with self.store.open(self.metadata_file_path, 'rb') as f:
+            self.load_metadata(f)
+        # index lama menyimpan postings_dict dan doc_length di file metadata
+        if self.postings_dict is None:
+            self.load_tables()
+        self.term_iter = self.terms.__iter__()
+
+        # file posisi hanya ada pada positional index
+        if self.positions_dict:
+            self.positions_file = self.store.open_reader(self.positions_file_path)
 
         return self
 
     def __exit__(self, exception_type, exception_value, traceback):
-        """Menutup index_file dan menyimpan postings_dict dan terms ketika keluar context"""
-        # Menutup index file
+        """Menutup index_file (dan file posisi jika ada) ketika keluar context"""
         self.index_file.close()
-
-        # Menyimpan metadata (postings dict dan terms) ke file metadata dengan bantuan pickle
-        with bucket.blob(self.metadata_file_path).open('wb') as f:
-            pickle.dump([self.postings_dict, self.terms, self.doc_length], f)
+        if self.positions_file is not None:
+            self.positions_file.close()
+        for table in [self.postings_dict, self.doc_length]:
+            if isinstance(table, (PostingsTable, DocLengths)):
+                table.close()
 
 
 class InvertedIndexReader(InvertedIndex):
     """
     Class yang mengimplementasikan bagaimana caranya scan atau membaca secara
     efisien Inverted Index yang disimpan di sebuah file.
+
+    Reader bersifat read-only: tidak ada yang ditulis kembali ke storage
+    ketika keluar context.
     """
 
     def __iter__(self):
@@ -118,10 +231,10 @@ class InvertedIndexReader(InvertedIndex):
 
     def reset(self):
         """
-        Kembalikan file pointer ke awal, dan kembalikan pointer iterator
-        term ke awal
+        Kembalikan pointer iterator term ke awal. Posisi postings setiap term
+        diambil dari postings_dict, sehingga tidak ada file pointer yang perlu
+        dikembalikan.
         """
-        self.index_file.seek(0)
         self.term_iter = self.terms.__iter__()  # reset term iterator
 
     def __next__(self):
@@ -143,9 +256,9 @@ class InvertedIndexReader(InvertedIndex):
         pos, number_of_postings, len_in_bytes_of_postings, len_in_bytes_of_tf = self.postings_dict[
             curr_term]
         postings_list = self.postings_encoding.decode(
-            self.index_file.read(len_in_bytes_of_postings))
+            self.index_file.read_at(pos, len_in_bytes_of_postings))
         tf_list = self.postings_encoding.decode_tf(
-            self.index_file.read(len_in_bytes_of_tf))
+            self.index_file.read_at(pos + len_in_bytes_of_postings, len_in_bytes_of_tf))
         return (curr_term, postings_list, tf_list)
 
     def get_postings_list(self, term):
@@ -164,19 +277,103 @@ class InvertedIndexReader(InvertedIndex):
         # mengambil informasi term dari dict
         position, num, length_of_postings, length_of_tf = self.postings_dict[term]
         
-        # mencari term di index
-        self.index_file.seek(position)
-        
-        # mendapatkan postings list untuk term
-        postings_list = self.index_file.read(length_of_postings)
-        postings_list = self.postings_encoding.decode(postings_list)
-        
-        # mendapatkan tf list untuk term
-        tf_list = self.index_file.read(length_of_tf)
-        tf_list = self.postings_encoding.decode_tf(tf_list)
+        # mendapatkan postings list dan tf list untuk term sekaligus
+        # (satu kali baca; pada LocalStore berupa memoryview dari mmap)
+        encoded = self.index_file.read_at(position, length_of_postings + length_of_tf)
+        postings_list = self.postings_encoding.decode(encoded[:length_of_postings])
+        tf_list = self.postings_encoding.decode_tf(encoded[length_of_postings:])
         
         return (postings_list, tf_list)
 
+    def get_postings_arrays(self, term):
+        """
+        Sama dengan get_postings_list, tetapi postings list dan tf list
+        dikembalikan sebagai numpy.ndarray (int64) hasil decode_array, tanpa
+        membuat list of int Python.
+        """
+        position, num, length_of_postings, length_of_tf = self.postings_dict[term]
+        encoded = self.index_file.read_at(position, length_of_postings + length_of_tf)
+        postings_list = self.postings_encoding.decode_array(encoded[:length_of_postings])
+        tf_list = self.postings_encoding.decode_tf_array(encoded[length_of_postings:])
+        return (postings_list, tf_list)
+
+    def get_encoded(self, term):
+        """
+        Mengembalikan bytes postings list dan tf list sebuah term apa adanya
+        (tanpa decode), misalnya untuk disalin langsung saat merge.
+
+        Returns
+        -------
+        Tuple[bytes, bytes]
+            Encoded postings list dan encoded tf list (memoryview pada LocalStore)
+        """
+        position, num, length_of_postings, length_of_tf = self.postings_dict[term]
+        encoded = self.index_file.read_at(position, length_of_postings + length_of_tf)
+        return (encoded[:length_of_postings], encoded[length_of_postings:])
+
+    def get_encoded_positions(self, term):
+        """Mengembalikan bytes posisi sebuah term (lihat get_positions) tanpa decode"""
+        position, length = self.positions_dict[term]
+        return self.positions_file.read_at(position, length)
+
+    def get_impacts(self, term):
+        """
+        Mengembalikan impact score (numpy.ndarray of uint8) untuk setiap posting
+        dari sebuah term. Hanya tersedia jika impact_info tidak kosong.
+        """
+        position, num, length_of_postings, length_of_tf = self.postings_dict[term]
+        encoded = self.index_file.read_at(position + length_of_postings + length_of_tf, num)
+        return np.frombuffer(encoded, dtype=np.uint8)
+
+
+    def get_positions(self, term, tf_list):
+        """
+        Mengembalikan posisi term di setiap dokumen pada postings list-nya
+        (lihat VBEPositions.decode_array). tf_list adalah tf list term
+        tersebut, misalnya hasil get_postings_arrays.
+
+        Returns
+        -------
+        Tuple[numpy.ndarray, numpy.ndarray]
+            positions dan offsets: posisi term pada posting ke-i adalah
+            positions[offsets[i]:offsets[i + 1]]
+        """
+        position, length = self.positions_dict[term]
+        return VBEPositions.decode_array(self.positions_file.read_at(position, length), tf_list)
+
+    def get_skip_table(self, term):
+        """
+        Mengembalikan skip table (lihat skip_dict) untuk sebuah term, atau
+        None jika postings list term tersebut tidak dibagi menjadi blok.
+        """
+        return self.skip_dict.get(term)
+
+    def get_block_arrays(self, term, block):
+        """
+        Membaca dan men-decode satu blok dari postings list sebuah term
+        berdasarkan skip table-nya, tanpa membaca blok-blok lainnya.
+
+        Returns
+        -------
+        Tuple[numpy.ndarray, numpy.ndarray]
+            Doc IDs dan TF (int64) di blok tersebut
+        """
+        position, num, length_of_postings, length_of_tf = self.postings_dict[term]
+        skips = self.skip_dict[term]
+        postings_start = skips[block, self.SKIP_POSTINGS_OFFSET]
+        tf_start = skips[block, self.SKIP_TF_OFFSET]
+        if block + 1 < len(skips):
+            postings_end = skips[block + 1, self.SKIP_POSTINGS_OFFSET]
+            tf_end = skips[block + 1, self.SKIP_TF_OFFSET]
+        else:
+            postings_end, tf_end = length_of_postings, length_of_tf
+        previous_doc_id = skips[block - 1, self.SKIP_LAST_DOC] if block > 0 else 0
+
+        encoded_postings = self.index_file.read_at(position + postings_start, postings_end - postings_start)
+        encoded_tf = self.index_file.read_at(position + length_of_postings + tf_start, tf_end - tf_start)
+        return (self.postings_encoding.decode_block(encoded_postings, previous_doc_id),
+                self.postings_encoding.decode_tf_array(encoded_tf))
+
 
 class InvertedIndexWriter(InvertedIndex):
     """
@@ -185,10 +382,34 @@ class InvertedIndexWriter(InvertedIndex):
     """
 
     def __enter__(self):
-        self.index_file = bucket.blob(self.index_file_path).open('wb')
+        self.index_file = self.store.open(self.index_file_path, 'wb')
+        # file posisi dibuka ketika append pertama yang menyertakan posisi
+        self.positions_file = None
         return self
 
-    def append(self, term, postings_list, tf_list):
+    def __exit__(self, exception_type, exception_value, traceback):
+        """
+        Menutup index_file dan menyimpan postings_dict, terms, dan doc_length
+        ke file metadata. Hanya writer yang menulis metadata; reader bersifat
+        read-only.
+
+        Jika context ditutup karena exception, metadata tidak ditulis agar
+        metadata index yang lama tidak tertimpa oleh index yang belum lengkap.
+        """
+        # Menutup index file
+        self.index_file.close()
+        if self.positions_file is not None:
+            self.positions_file.close()
+
+        if exception_type is not None:
+            return
+
+        # Menyimpan postings dict, doc_length, dan metadata lainnya
+        self.dump_tables()
+        with self.store.open(self.metadata_file_path, 'wb') as f:
+            self.dump_metadata(f)
+
+    def append(self, term, postings_list, tf_list, impacts=None, positions=None):
         """
         Menambahkan (append) sebuah term, postings_list, dan juga TF list 
         yang terasosiasi ke posisi akhir index file.
@@ -205,7 +426,10 @@ class InvertedIndexWriter(InvertedIndex):
         4. Menambahkan (append) bystream dari postings_list yang sudah di-encode dan
            tf_list yang sudah di-encode ke posisi akhir index file di harddisk.
 
-        Jangan lupa update self.terms dan self.doc_length juga ya!
+        Jangan lupa update self.terms dan self.doc_length juga ya! Selain itu
+        self.max_tf juga diperbarui untuk keperluan dynamic pruning, dan
+        postings list yang lebih panjang dari SKIP_BLOCK_SIZE di-encode per
+        blok beserta skip table-nya (lihat encode_blocks).
 
         SEARCH ON YOUR FAVORITE SEARCH ENGINE:
         - Anda mungkin mau membaca tentang Python I/O
@@ -223,24 +447,112 @@ class InvertedIndexWriter(InvertedIndex):
             List of docIDs dimana term muncul
         tf_list: List[Int]
             List of term frequencies
+        impacts: numpy.ndarray of uint8
+            Impact score setiap posting (opsional), ditulis setelah tf list
+        positions: List[List[Int]]
+            Posisi term di setiap dokumen pada postings_list (opsional),
+            ditulis ke file posisi dengan VBEPositions
         """
         # TODO
         
-        # encode postings list
-        encoded_postings = self.postings_encoding.encode(postings_list)
-        
-        # encode tf list
-        encoded_tf = self.postings_encoding.encode_tf(tf_list)
-        
-        # menambahkan term ke list dan dict
-        self.terms.append(term)
-        self.postings_dict[term] = (self.index_file.tell(), len(postings_list), len(encoded_postings), len(encoded_tf))
+        skips = None
+        if len(postings_list) > self.SKIP_BLOCK_SIZE:
+            # encode postings list dan tf list per blok beserta skip table
+            encoded_postings, encoded_tf, skips = self.encode_blocks(postings_list, tf_list)
+        else:
+            # encode postings list
+            encoded_postings = self.postings_encoding.encode(postings_list)
+
+            # encode tf list
+            encoded_tf = self.postings_encoding.encode_tf(tf_list)
+
         for i in range(len(postings_list)):
             doc_id = postings_list[i]
             self.doc_length.setdefault(doc_id, 0)
             self.doc_length[doc_id] += tf_list[i]
 
+        self.append_encoded(term, len(postings_list), encoded_postings, encoded_tf, max(tf_list), skips=skips,
+                            impacts=impacts,
+                            encoded_positions=VBEPositions.encode(positions) if positions is not None else None)
+
+    def append_encoded(self, term, number_of_postings, encoded_postings, encoded_tf, max_tf, skips=None,
+                       impacts=None, encoded_positions=None):
+        """
+        Menambahkan sebuah term yang postings list, tf list, dan posisinya
+        sudah di-encode ke posisi akhir index file (dan file posisi), lalu
+        memperbarui terms, postings_dict, max_tf, skip_dict, dan positions_dict.
+
+        Berbeda dengan append, doc_length TIDAK diperbarui karena postings
+        tidak di-decode; pemanggil (misalnya merge_index) bertanggung jawab
+        mengisi doc_length.
+
+        Parameters
+        ----------
+        term:
+            term atau termID
+        number_of_postings: int
+            Banyaknya posting (document frequency)
+        encoded_postings, encoded_tf: bytes
+            Hasil encode postings list dan tf list (per blok jika skips ada)
+        max_tf: int
+            TF terbesar di postings list
+        skips: numpy.ndarray
+            Skip table (lihat skip_dict), atau None
+        impacts: numpy.ndarray of uint8
+            Impact score setiap posting (opsional)
+        encoded_positions: bytes
+            Hasil VBEPositions.encode (opsional)
+        """
+        # menambahkan term ke list dan dict
+        self.terms.append(term)
+        self.postings_dict[term] = (self.index_file.tell(), number_of_postings, len(encoded_postings), len(encoded_tf))
+        self.max_tf[term] = max_tf
+        if skips is not None:
+            self.skip_dict[term] = skips
+
         # menambahkan term ke index
         self.index_file.write(encoded_postings)
         self.index_file.write(encoded_tf)
+        if impacts is not None:
+            self.index_file.write(np.asarray(impacts, dtype=np.uint8).tobytes())
 
+        if encoded_positions is not None:
+            if self.positions_file is None:
+                self.positions_file = self.store.open(self.positions_file_path, 'wb')
+            self.positions_dict[term] = (self.positions_file.tell(), len(encoded_positions))
+            self.positions_file.write(encoded_positions)
+
+    def encode_blocks(self, postings_list, tf_list):
+        """
+        Encode postings_list dan tf_list per blok berisi SKIP_BLOCK_SIZE
+        posting, sekaligus membuat skip table-nya (lihat skip_dict).
+
+        Returns
+        -------
+        Tuple[bytes, bytes, numpy.ndarray]
+            Encoded postings list, encoded tf list, dan skip table
+        """
+        if hasattr(self.postings_encoding, 'encode_blocks'):
+            # encoding yang bisa meng-encode semua blok sekaligus (VBEPostings)
+            encoded_postings, encoded_tf, postings_offsets, tf_offsets = self.postings_encoding.encode_blocks(
+                postings_list, tf_list, self.SKIP_BLOCK_SIZE)
+            postings_list, tf_list = np.asarray(postings_list, dtype=np.int64), np.asarray(tf_list, dtype=np.int64)
+            starts = np.arange(0, len(postings_list), self.SKIP_BLOCK_SIZE)
+            last_doc_ids = postings_list[np.minimum(starts + self.SKIP_BLOCK_SIZE, len(postings_list)) - 1]
+            skips = np.stack([last_doc_ids, postings_offsets, tf_offsets, np.maximum.reduceat(tf_list, starts)], axis=1)
+            return encoded_postings, encoded_tf, skips
+
+        encoded_postings, encoded_tf, skips = [], [], []
+        postings_offset, tf_offset = 0, 0
+        previous_doc_id = 0
+        for start in range(0, len(postings_list), self.SKIP_BLOCK_SIZE):
+            postings_block = postings_list[start:start + self.SKIP_BLOCK_SIZE]
+            tf_block = tf_list[start:start + self.SKIP_BLOCK_SIZE]
+            skips.append((postings_block[-1], postings_offset, tf_offset, max(tf_block)))
+
+            encoded_postings.append(self.postings_encoding.encode_block(postings_block, previous_doc_id))
+            encoded_tf.append(self.postings_encoding.encode_tf(tf_block))
+            postings_offset += len(encoded_postings[-1])
+            tf_offset += len(encoded_tf[-1])
+            previous_doc_id = postings_block[-1]
+        return b"".join(encoded_postings), b"".join(encoded_tf), np.array(skips, dtype=np.int64)
@@ -1,20 +1,24 @@
-# referensi: Tutorial Learning-to-Rank dengan LambdaMART
+# referensi: Tutorial Learning-to-Rank dengan LambdaMART ,
+# https://lightgbm.readthedocs.io/en/latest/pythonapi/lightgbm.Booster.html
 
-from gensim.models import LsiModel
-from gensim.corpora import Dictionary
-from scipy.spatial.distance import cosine
+import itertools
+import os
+import random
+import time
+
+from scipy.sparse import csr_matrix
 import lightgbm as lgb
 import numpy as np
-import random
-from google.cloud import storage
 
-client_storage = storage.Client()
-bucket = client_storage.bucket("diagnosee-collections")
+from docstore import token_hashes
+from store import default_store
+from termdict import TermDictionary, read_matrix, write_matrix
+
 
 # process dataset yang digunakan untuk training
-def get_dataset():
+def get_dataset(store):
     documents = {}
-    with bucket.blob("qrels-folder/train_docs.txt").open("r") as file:
+    with store.open("qrels-folder/train_docs.txt", "r") as file:
         for line in file:
             idx = line.find(" ")
             doc_id = line[:idx]
@@ -22,15 +26,17 @@ def get_dataset():
             documents[doc_id] = content.split()
     return documents
 
+
 # class untuk mendapatkan query dan qrels dari masing-masing tipe data
 class Data:
-    
+
     # inisialisasi dan pemanggilan function
-    def __init__(self, documents, type):
+    def __init__(self, documents, type, store):
         # type = train / val
         self.NUM_NEGATIVES = 1
         self.documents = documents
         self.type = type
+        self.store = store
         self.queries = {}
         self.q_docs_rel = {}
         self.group_qid_count = []
@@ -41,23 +47,23 @@ class Data:
 
     # mendapatkan query
     def get_queries(self):
-        with bucket.blob(f"qrels-folder/{self.type}_queries.txt").open("r") as file:
+        with self.store.open(f"qrels-folder/{self.type}_queries.txt", "r") as file:
             for line in file:
                 idx = line.find(" ")
                 q_id = line[:idx]
                 content = line[idx+1:]
                 self.queries[q_id] = content.split()
-    
-    # mendapatkan qrel yang dikelompokkan berdasarkan q_id    
+
+    # mendapatkan qrel yang dikelompokkan berdasarkan q_id
     def get_qrels(self):
-        with bucket.blob(f"qrels-folder/{self.type}_qrels.txt").open("r") as file:
+        with self.store.open(f"qrels-folder/{self.type}_qrels.txt", "r") as file:
             for line in file:
                 q_id, doc_id, rel = line.split()
                 if (q_id in self.queries) and (doc_id in self.documents):
                     if q_id not in self.q_docs_rel:
                         self.q_docs_rel[q_id] = []
                     self.q_docs_rel[q_id].append((doc_id, int(rel)))
-            
+
     # menghitung grup q_id yang ada
     def group_count(self):
         for q_id in self.q_docs_rel:
@@ -70,61 +76,87 @@ class Data:
 
 # main class
 class Letor():
+    """
+    Reranker LambdaMART dengan fitur LSI dan Jaccard.
+
+    Model dilatih offline (train, lalu save) dan disimpan sebagai artifacts
+    dengan versi di <directory>/<version>/:
+        1. vocabulary.lex : token -> baris projection (TermDictionary)
+        2. projection.matrix : projection LSI (banyaknya token x
+           NUM_LATENT_TOPICS, lihat write_matrix)
+        3. ranker.txt : booster LightGBM dalam format teks
+    File <directory>/LATEST berisi versi terbaru dan ditulis paling akhir,
+    sehingga proses serving (load) tidak pernah melihat versi yang belum
+    lengkap. Serving hanya memuat artifacts, tanpa gensim dan tanpa training.
+
+    Attributes
+    ----------
+    vocabulary: Mapping token (str) -> baris projection
+    projection(numpy.ndarray): Matrix projection LSI (float32)
+    booster(lightgbm.Booster): Model LambdaMART
+    version(str): Versi artifacts, None jika belum disimpan. Vektor LSI
+        dokumen yang dihitung saat indexing (lihat BSBIIndex.write_doc_vectors)
+        hanya cocok untuk versi yang sama.
+    """
+
+    NUM_LATENT_TOPICS = 200
+    LATEST_FILE = 'LATEST'
+    VOCABULARY_FILE = 'vocabulary.lex'
+    PROJECTION_FILE = 'projection.matrix'
+    BOOSTER_FILE = 'ranker.txt'
+
+    def __init__(self, vocabulary, projection, booster=None, version=None):
+        self.vocabulary = vocabulary
+        self.projection = projection
+        self.booster = booster
+        self.version = version
+
+    @staticmethod
+    def train(store=None):
+        """
+        Melatih LSI model dan LightGBM LambdaMART dari dataset qrels di store
+        (default-nya bucket GCS). Hanya dijalankan offline (lihat __main__).
+        """
+        # gensim hanya dibutuhkan untuk training
+        from gensim.corpora import Dictionary
+        from gensim.models import LsiModel
+
+        store = store if store is not None else default_store
+        documents = get_dataset(store)
+        train_data = Data(documents, "train", store)
 
-    # inisialisasi, pembuatan LSI model dan LightGBM LambdaMART
-    def __init__(self):
-        self.NUM_LATENT_TOPICS = 200
-        self.documents = get_dataset()
-        self.dictionary = Dictionary()
-        self.train_data = Data(self.documents, "train")
-        self.val_data = Data(self.documents, "val")
-        self.build_lsi()
-        self.ranker()
-        
-    def build_lsi(self):
         # memasukkan konversi content dari docs ke Bag of Words
-        bow_corpus = [self.dictionary.doc2bow(doc, allow_update = True) for doc in self.documents.values()]
-        
-        # membuat model LSI dengan 200 topik laten
-        self.model = LsiModel(bow_corpus, num_topics = self.NUM_LATENT_TOPICS)
-        return self.model
+        dictionary = Dictionary()
+        bow_corpus = [dictionary.doc2bow(doc, allow_update = True) for doc in documents.values()]
 
-    #  menampilkan representasi vektor dari suatu doc maupun query
-    def vector_rep(self, text):
-        rep = [topic_value for (_, topic_value) in self.model[self.dictionary.doc2bow(text)]]
-        return rep if len(rep) == self.NUM_LATENT_TOPICS else [0.] * self.NUM_LATENT_TOPICS
+        # membuat model LSI dengan 200 topik laten; yang disimpan hanya
+        # projection-nya, dengan kolom nol jika topik yang ditemukan kurang dari 200
+        model = LsiModel(bow_corpus, num_topics = Letor.NUM_LATENT_TOPICS)
+        projection = np.zeros((len(dictionary), Letor.NUM_LATENT_TOPICS), dtype=np.float32)
+        num_topics = min(model.projection.u.shape[1], Letor.NUM_LATENT_TOPICS)
+        projection[:, :num_topics] = model.projection.u[:, :num_topics]
 
-    def features(self, query, doc):
-        # mengambil representasi vektor dari query dan doc
-        v_q = self.vector_rep(query)
-        v_d = self.vector_rep(doc)
-        q = set(query)
-        d = set(doc)
-        
-        # menghitung cosine distance antara query dan doc
-        cosine_dist = cosine(v_q, v_d)
-        
-        # menghitung koefisien jaccard similarity antara query dan doc
-        jaccard = len(q & d) / len(q | d)
-        return v_q + v_d + [jaccard] + [cosine_dist]
+        letor = Letor(dict(dictionary.token2id), projection)
+        letor.fit(train_data)
+        return letor
 
-    def ranker(self):
+    def fit(self, train_data):
         # memisahkan feature dengan target
         X = []
         Y = []
-        
+
         # melatih model menggunakan data dari train set
         # karena hasilnya lebih baik daripada validation set
-        for (query, doc, rel) in self.train_data.dataset:
+        for (query, doc, rel) in train_data.dataset:
             X.append(self.features(query, doc))
             Y.append(rel)
 
 
         X = np.array(X)
         Y = np.array(Y)
-        
+
         # membuat model LightGBM LambdaMART
-        self.ranker = lgb.LGBMRanker(
+        ranker = lgb.LGBMRanker(
                         objective="lambdarank",
                         boosting_type = "gbdt",
                         n_estimators = 100,
@@ -136,5 +168,197 @@ class Letor():
 
         # melatih model menggunakan data dari train set
         # karena hasilnya lebih baik daripada validation set
-        self.ranker.fit(X, Y,
-                group = self.train_data.group_qid_count)
\ No newline at end of file
+        ranker.fit(X, Y,
+                group = train_data.group_qid_count)
+        self.booster = ranker.booster_
+
+    def save(self, store, directory='letor', version=None):
+        """
+        Menyimpan artifacts ke <directory>/<version>/ lalu memperbarui
+        <directory>/LATEST. Mengembalikan versi yang ditulis (default-nya
+        waktu saat ini, misal '20240101120000').
+        """
+        version = version if version is not None else time.strftime('%Y%m%d%H%M%S')
+        with store.open(os.path.join(directory, version, self.VOCABULARY_FILE), 'wb') as f:
+            TermDictionary.write(f, self.vocabulary.items())
+        with store.open(os.path.join(directory, version, self.PROJECTION_FILE), 'wb') as f:
+            write_matrix(f, self.projection)
+        with store.open(os.path.join(directory, version, self.BOOSTER_FILE), 'w') as f:
+            f.write(self.booster.model_to_string())
+        with store.open(os.path.join(directory, self.LATEST_FILE), 'w') as f:
+            f.write(version)
+        self.version = version
+        return version
+
+    @staticmethod
+    def latest_version(store, directory='letor'):
+        """Versi artifacts terbaru (isi <directory>/LATEST)"""
+        return store.read_text(os.path.join(directory, Letor.LATEST_FILE)).strip()
+
+    @staticmethod
+    def artifact_files(store, directory='letor', version=None):
+        """
+        Path semua file artifacts versi version (default-nya versi terbaru),
+        misalnya untuk disalin ke disk lokal (LocalStore.sync_from)
+        """
+        if version is None:
+            version = Letor.latest_version(store, directory)
+        return [os.path.join(directory, Letor.LATEST_FILE)] + \
+            [os.path.join(directory, version, name)
+             for name in [Letor.VOCABULARY_FILE, Letor.PROJECTION_FILE, Letor.BOOSTER_FILE]]
+
+    @staticmethod
+    def load(store, directory='letor', version=None):
+        """
+        Memuat artifacts versi version (default-nya versi terbaru) tanpa
+        training. Vocabulary dan projection dibaca melalui open_reader,
+        sehingga dengan LocalStore keduanya dipakai langsung dari mmap.
+        """
+        if version is None:
+            version = Letor.latest_version(store, directory)
+        vocabulary = TermDictionary(store.open_reader(os.path.join(directory, version, Letor.VOCABULARY_FILE)))
+        projection = read_matrix(store.open_reader(os.path.join(directory, version, Letor.PROJECTION_FILE)))
+        booster = lgb.Booster(model_str=store.read_text(os.path.join(directory, version, Letor.BOOSTER_FILE)))
+        return Letor(vocabulary, projection, booster, version)
+
+    @staticmethod
+    def bag_of_words(texts):
+        """
+        Bag of Words beberapa teks sekaligus.
+
+        Returns
+        -------
+        Tuple[scipy.sparse.csr_matrix, List[str]]
+            Matrix TF (banyaknya teks x banyaknya token unik) dan token untuk
+            setiap kolomnya
+        """
+        columns = {token: i for i, token in enumerate(dict.fromkeys(itertools.chain.from_iterable(texts)))}
+        lengths = [len(text) for text in texts]
+        rows = np.repeat(np.arange(len(texts)), lengths)
+        cols = np.fromiter((columns[token] for text in texts for token in text), dtype=np.int64, count=len(rows))
+        # posting yang duplikat (token yang muncul beberapa kali) dijumlahkan
+        tf = csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(texts), len(columns)))
+        return tf, list(columns)
+
+    def project(self, tf, tokens):
+        """
+        Memproyeksikan matrix TF (lihat bag_of_words) ke ruang LSI dengan satu
+        perkalian sparse x dense (sama dengan model[bow] pada gensim LsiModel).
+        Token yang tidak ada di vocabulary diabaikan.
+        """
+        if hasattr(self.vocabulary, 'get_many'):
+            rows = self.vocabulary.get_many(tokens, -1)
+        else:
+            rows = [self.vocabulary.get(token, -1) for token in tokens]
+        rows = np.array(rows, dtype=np.int64)
+        known = np.flatnonzero(rows >= 0)
+        reps = np.asarray(tf[:, known] @ self.projection[rows[known]], dtype=np.float64)
+        # seperti gensim, vektor dengan topik yang bernilai (hampir) nol tidak dianggap ada
+        reps[~np.all(np.abs(reps) > 1e-9, axis=1)] = 0.
+        return reps
+
+    #  menampilkan representasi vektor dari suatu doc maupun query
+    def vector_rep(self, text):
+        return self.project(*self.bag_of_words([text]))[0].tolist()
+
+    def features_batch(self, query, docs, doc_vectors=None):
+        """
+        Fitur semua dokumen terhadap satu query sekaligus. Urutan kolom sama
+        dengan features: vektor LSI query, vektor LSI dokumen, jaccard, dan
+        cosine distance.
+
+        Parameters
+        ----------
+        query: List[str]
+            Token query
+        docs: List[List[str]]
+            Token setiap dokumen
+        doc_vectors: numpy.ndarray
+            Vektor LSI setiap dokumen yang sudah dihitung saat indexing (lihat
+            BSBIIndex.get_doc_vectors). Jika None, vektor dihitung dari docs.
+
+        Returns
+        -------
+        numpy.ndarray
+            Matrix fitur (banyaknya dokumen x (2 * NUM_LATENT_TOPICS + 2))
+        """
+        tf, tokens = self.bag_of_words([query] + list(docs))
+        if doc_vectors is None:
+            # query diproyeksikan sekali bersama semua dokumen
+            reps = self.project(tf, tokens)
+            v_q, v_d = reps[0], reps[1:]
+        else:
+            v_q = self.project(*self.bag_of_words([query]))[0]
+            v_d = np.asarray(doc_vectors, dtype=np.float64)
+
+        # menghitung koefisien jaccard similarity antara query dan doc dari
+        # token unik: |q & d| = banyaknya token query yang ada di dokumen
+        doc_tf = tf[1:]
+        query_tokens = tf[0].indices
+        intersection = np.asarray((doc_tf[:, query_tokens] > 0).sum(axis=1)).ravel()
+        return self.combine_features(v_q, v_d, intersection, len(query_tokens) + np.diff(doc_tf.indptr) - intersection)
+
+    def features_forward(self, query, doc_vectors, doc_hashes):
+        """
+        Sama dengan features_batch, tetapi dokumen hanya diwakili oleh forward
+        data hasil indexing, sehingga isi dokumen tidak dibutuhkan.
+
+        Parameters
+        ----------
+        query: List[str]
+            Token query
+        doc_vectors: numpy.ndarray
+            Vektor LSI setiap dokumen (lihat BSBIIndex.get_doc_vectors)
+        doc_hashes: List[numpy.ndarray]
+            Hash token unik setiap dokumen (lihat BSBIIndex.get_token_hashes).
+            Jaccard dihitung dari hash, sehingga bisa berbeda dari jaccard token
+            hanya jika ada collision crc32.
+        """
+        v_q = self.project(*self.bag_of_words([query]))[0]
+        query_hashes = token_hashes(query)
+        lengths = np.array([len(hashes) for hashes in doc_hashes], dtype=np.int64)
+        doc_index = np.repeat(np.arange(len(doc_hashes)), lengths)
+        matches = np.isin(np.concatenate(doc_hashes), query_hashes)
+        intersection = np.bincount(doc_index[matches], minlength=len(doc_hashes))
+        return self.combine_features(v_q, np.asarray(doc_vectors, dtype=np.float64), intersection,
+                                     len(query_hashes) + lengths - intersection)
+
+    @staticmethod
+    def combine_features(v_q, v_d, intersection, union):
+        """
+        Menyusun matrix fitur dari vektor LSI query (v_q) dan dokumen (v_d)
+        serta banyaknya token unik di irisan dan gabungan query dan dokumen
+        """
+        # menghitung cosine distance antara query dan doc (seperti
+        # scipy.spatial.distance.cosine; NaN jika salah satu vektor nol)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cosine_dist = np.clip(1.0 - (v_d @ v_q) / np.sqrt((v_q @ v_q) * np.einsum('ij,ij->i', v_d, v_d)),
+                                  0.0, 2.0)
+
+        # menghitung koefisien jaccard similarity antara query dan doc
+        jaccard = np.divide(intersection, union, out=np.zeros(len(union)), where=union > 0)
+
+        return np.hstack([np.tile(v_q, (len(v_d), 1)), v_d, jaccard[:, None], cosine_dist[:, None]])
+
+    def features(self, query, doc):
+        return self.features_batch(query, [doc])[0].tolist()
+
+    def predict(self, query, docs=None, doc_vectors=None, doc_hashes=None):
+        """
+        Mengembalikan score LambdaMART (numpy.ndarray) untuk setiap dokumen.
+        Jika doc_hashes diberikan, fitur dihitung dengan features_forward
+        (tanpa docs); jika tidak, dengan features_batch.
+        """
+        if doc_hashes is not None:
+            if len(doc_hashes) == 0:
+                return np.zeros(0)
+            return self.booster.predict(self.features_forward(query, doc_vectors, doc_hashes))
+        if not docs:
+            return np.zeros(0)
+        return self.booster.predict(self.features_batch(query, docs, doc_vectors))
+
+
+if __name__ == '__main__':
+
+    letor = Letor.train(default_store)
+    print("versi artifacts:", letor.save(default_store))
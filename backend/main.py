@@ -1,53 +1,212 @@
+import re
 import time
 
-from google.cloud import storage
 from bsbi import BSBIIndex
 from compression import VBEPostings
+from fetcher import DocumentFetcher
 from letor import Letor
-import numpy as np
+from segments import SegmentedIndex
+from snippet import SnippetGenerator
+from store import GCSStore, LocalStore
 import os
 
-client_storage = storage.Client()
-bucket = client_storage.bucket("diagnosee-collections")
-ranker = Letor()
+# interval (detik) untuk mengecek apakah index di bucket sudah diperbarui
+RELOAD_CHECK_INTERVAL = 60
+
+# batas waktu (detik) untuk mengambil isi dokumen hasil retrieval
+FETCH_TIMEOUT = 10.0
+
+# banyaknya hasil per halaman SERP (default dan maksimum), dan panjang
+# maksimum snippet (karakter)
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+SNIPPET_LENGTH = 300
+
+# jika INDEX_LOCAL_DIR di-set, file index disalin sekali dari bucket ke disk
+# lokal dan postings dibaca melalui mmap; jika tidak, dibaca langsung dari
+# bucket dengan satu ranged request untuk setiap blok readahead yang belum
+# di-cache (lihat BlobRangeReader). INDEX_LOCAL_DIR disarankan untuk serving
+INDEX_LOCAL_DIR = os.environ.get("INDEX_LOCAL_DIR")
+# BUCKET_LOCAL_DIR dapat diarahkan ke direktori lokal yang dipakai sebagai
+# pengganti bucket, misalnya untuk testing tanpa credentials
+BUCKET_LOCAL_DIR = os.environ.get("BUCKET_LOCAL_DIR")
+remote_store = LocalStore(BUCKET_LOCAL_DIR) if BUCKET_LOCAL_DIR else GCSStore("diagnosee-collections")
+index_store = LocalStore(INDEX_LOCAL_DIR) if INDEX_LOCAL_DIR else remote_store
+
+# index dimuat sekali per proses, bukan setiap request; segment baru dan
+# tombstone bitmap yang ditulis oleh SegmentedIndex (add_documents dan
+# delete_documents) ikut dilayani
+index = SegmentedIndex(BSBIIndex(output_dir='index', postings_encoding=VBEPostings, store=index_store),
+                       read_only=True)
+
+# artifacts reranker hasil training offline (python letor.py), disalin ke disk
+# lokal bersama file index jika INDEX_LOCAL_DIR di-set
+LETOR_DIR = 'letor'
+
+# isi dokumen diambil paralel; DOCS_LOCAL_DIR dapat diarahkan ke direktori yang
+# berisi folder collections untuk testing tanpa bucket
+DOCS_LOCAL_DIR = os.environ.get("DOCS_LOCAL_DIR")
+fetcher = DocumentFetcher(LocalStore(DOCS_LOCAL_DIR) if DOCS_LOCAL_DIR else remote_store,
+                          timeout=FETCH_TIMEOUT)
+
+# snippet memakai analyzer yang sama dengan index agar term yang di-highlight
+# sama dengan term yang dicocokkan saat retrieval
+snippets = SnippetGenerator(index.index.analyzer, max_length=SNIPPET_LENGTH)
+
+
+def sync_index():
+    """Menyalin file index yang berubah dari bucket jika index dibaca dari disk lokal"""
+    if index_store is not remote_store:
+        letor_version = Letor.latest_version(remote_store, LETOR_DIR)
+        index_store.sync_from(remote_store, index.index_files(remote_store) +
+                              [index.index.doc_vectors_path(letor_version)] +
+                              Letor.artifact_files(remote_store, LETOR_DIR, letor_version))
+
+
+sync_index()
+index.open()
+ranker = Letor.load(index_store, LETOR_DIR)
+last_version_check = time.time()
+
+
+def refresh_index():
+    """Memuat ulang index jika sudah lewat RELOAD_CHECK_INTERVAL dan versinya berubah"""
+    global last_version_check
+    if time.time() - last_version_check >= RELOAD_CHECK_INTERVAL:
+        last_version_check = time.time()
+        sync_index()
+        index.reload_if_changed()
+
+def fetch_contents(doc_names, state):
+    """
+    Mengambil isi dokumen dari document store segment-segment di state; isi
+    dokumen yang tidak ada di document store (index lama) diambil dari blob
+    per dokumen secara paralel. Mengembalikan dict doc_name -> isi.
+    """
+    if not doc_names:
+        return {}
+    contents = dict(index.fetch_documents(doc_names, executor=fetcher.executor, state=state))
+    missing = [doc for doc in doc_names if doc not in contents]
+    if missing:
+        contents.update(fetcher.fetch(missing))
+    return contents
+
+
+def rerank(query, doc_names, state):
+    """
+    Mengurutkan ulang doc_names dengan Letor. Jika forward data hasil indexing
+    (vektor LSI dan hash token) tersedia untuk semua dokumen, isi dokumen tidak
+    perlu diambil; jika tidak, fitur dihitung dari isi dokumen.
+
+    Returns
+    -------
+    Tuple[List[str], Dict[str, str]]
+        doc_names yang sudah diurutkan ulang (dokumen yang isinya gagal diambil
+        dilewati), dan isi dokumen yang sudah diambil selama reranking
+    """
+    if not doc_names:
+        return [], {}
+    doc_ids = [state.doc_id_map[doc] for doc in doc_names]
+    # dokumen dari segment baru belum mempunyai vektor LSI
+    doc_vectors = index.get_doc_vectors(ranker.version, state=state)
+    if doc_vectors is not None and max(doc_ids) < len(doc_vectors):
+        doc_vectors = doc_vectors[doc_ids]
+    else:
+        doc_vectors = None
+
+    doc_hashes = index.get_token_hashes(doc_ids, executor=fetcher.executor, state=state)
+    if doc_vectors is not None and doc_hashes is not None:
+        contents = {}
+        scores = ranker.predict(query.split(), doc_vectors=doc_vectors, doc_hashes=doc_hashes)
+    else:
+        contents = fetch_contents(doc_names, state)
+        fetched = [i for i, doc in enumerate(doc_names) if doc in contents]
+        doc_names = [doc_names[i] for i in fetched]
+        scores = ranker.predict(query.split(), [contents[doc].split() for doc in doc_names],
+                                doc_vectors[fetched] if doc_vectors is not None else None)
+
+    # melakukan prediksi & re-ranking dari 100 dokumen sebelumnya
+    order = sorted(range(len(doc_names)), key=lambda i: scores[i], reverse=True)
+    return [doc_names[i] for i in order], contents
+
+
+def doc_number(doc):
+    """
+    Nomor dokumen (nama file tanpa .txt) dari nama dokumen, dengan separator
+    '/' maupun '\\' (index yang dibangun di Windows), misal './0\\10007.txt'
+    atau './1/1098.txt' -> 10007 atau 1098
+    """
+    return int(os.path.splitext(re.split(r'[\\/]', doc)[-1])[0])
+
+
+def positive_int_arg(request, name, default):
+    """Argumen request berupa bilangan bulat positif; None jika tidak valid"""
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        return None
+    return value if value > 0 else None
+
 
 def search(request):
+    # Cloud Function yang sama juga melayani isi dokumen (lihat document)
+    if request.path.rstrip("/").endswith("/document"):
+        return document(request)
+
     query = request.args.get("query")
     if query is None:
         return "No q", 400
-    
-    index = BSBIIndex(output_dir='index', postings_encoding=VBEPostings)
-    docs = []
-    
-    start = time.time()
-    retrieve = index.retrieve_tfidf(query, k=100)
-    end = time.time()
-    
-    serp = {}
-
-    for (score, doc) in retrieve:
-        did = os.path.splitext(os.path.basename(doc))[0]
-        did = int(did.split("\\")[1])
-        with bucket.blob("collections/"+doc[2:].replace("\\","/")).open("r") as f:
-            content = f.read()
-            docs.append((did, content))
-            serp[did] = content
-
-    # simpan content dari docs sebagai unseen document untuk testing
-    X_unseen = []
-    for doc_id, doc in docs:
-        X_unseen.append(ranker.features(query.split(), doc.split()))
-    X_unseen = np.array(X_unseen)
-
-    hasil = {}
-    # melakukan prediksi & re-ranking dari 100 dokumen sebelumnya
-    if len(X_unseen) != 0:
-        scores = ranker.ranker.predict(X_unseen)
-        did_scores = [x for x in zip([did for (did, _) in docs], scores)]
-        sorted_did_scores = sorted(did_scores, key = lambda tup: tup[1], reverse = True)
-    
-        for item in sorted_did_scores:
-            hasil[item[0]] = serp[item[0]]
-
-    duration = end - start      
-    return {"duration": duration, "length": len(serp), "serp": hasil}, 200
+    page = positive_int_arg(request, "page", 1)
+    size = positive_int_arg(request, "size", DEFAULT_PAGE_SIZE)
+    if page is None or size is None or size > MAX_PAGE_SIZE:
+        return "Invalid page or size", 400
+
+    refresh_index()
+
+    # doc ID, vektor dokumen, dan isi dokumen dibaca dari state index yang
+    # sama meskipun request lain memuat ulang index (lihat SegmentedIndex.searcher)
+    with index.searcher() as state:
+        start = time.time()
+        retrieve = index.retrieve_tfidf(query, k=100, state=state)
+        end = time.time()
+
+        doc_names, contents = rerank(query, [doc for (_, doc) in retrieve], state)
+        total = len(doc_names)
+
+        # isi dokumen hanya diambil untuk halaman yang ditampilkan, kecuali yang
+        # sudah diambil untuk reranking, dan hanya snippet-nya yang dikirim;
+        # isi lengkap diambil melalui endpoint document
+        doc_names = doc_names[(page - 1) * size:page * size]
+        contents.update(fetch_contents([doc for doc in doc_names if doc not in contents], state))
+
+    terms = snippets.query_terms(query)
+    serp = []
+    for doc in doc_names:
+        if doc not in contents:
+            continue
+        snippet, highlights = snippets.generate(contents[doc], terms)
+        serp.append({"id": doc_number(doc), "name": doc, "snippet": snippet, "highlights": highlights})
+
+    duration = end - start
+    return {"duration": duration, "length": total, "page": page, "size": size, "serp": serp}, 200
+
+
+def document(request):
+    """Isi lengkap satu dokumen berdasarkan nama dokumen (field name pada serp)"""
+    name = request.args.get("name")
+    if name is None:
+        return "No name", 400
+
+    refresh_index()
+    # nama dokumen harus ada di index dan belum dihapus, sehingga tidak bisa
+    # dipakai untuk membaca path lain di bucket
+    with index.searcher() as state:
+        if not index.contains(name, state=state):
+            return "Document not found", 404
+        contents = fetch_contents([name], state)
+    if name not in contents:
+        return "Failed to fetch document", 503
+    return {"id": doc_number(name), "name": name, "content": contents[name]}, 200
@@ -0,0 +1,560 @@
+# referensi: slide perkuliahan untuk perhitungan score,
+# https://numpy.org/doc/stable/reference/generated/numpy.argpartition.html ,
+# Broder et al. (2003), Efficient Query Evaluation using a Two-Level Retrieval Process ,
+# Ding & Suel (2011), Faster Top-k Document Retrieval Using Block-Max Indexes
+
+import heapq
+import math
+
+import numpy as np
+
+
+def tfidf_weights(tf_list, df, n):
+    """
+    Menghitung score TF-IDF untuk semua posting dari sebuah term sekaligus.
+
+    w(t, D) = (1 + log tf(t, D))       jika tf(t, D) > 0
+            = 0                        jika sebaliknya
+    w(t, Q) = IDF = log (N / df(t))
+
+    Parameters
+    ----------
+    tf_list: array-like of int
+        TF dari setiap posting
+    df: int
+        Document frequency dari term
+    n: int
+        Banyaknya dokumen di koleksi
+
+    Returns
+    -------
+    numpy.ndarray
+        w(t, Q) * w(t, D) untuk setiap posting
+    """
+    tf = np.asarray(tf_list, dtype=np.float64)
+    w_td = np.zeros(len(tf))
+    positive = tf > 0
+    w_td[positive] = 1 + np.log10(tf[positive])
+    return w_td * math.log10(n / df)
+
+
+def bm25_weights(tf_list, doc_lengths, df, n, avg_doc_length, k1=1.2, b=0.75):
+    """
+    Menghitung score BM25 untuk semua posting dari sebuah term sekaligus.
+
+    score = IDF * ((k1 + 1) * tf) / (k1 * ((1 - b) + b * dl / avgdl) + tf)
+
+    Parameters
+    ----------
+    tf_list: array-like of int
+        TF dari setiap posting
+    doc_lengths: array-like of int
+        Panjang dokumen dari setiap posting
+    df: int
+        Document frequency dari term
+    n: int
+        Banyaknya dokumen di koleksi
+    avg_doc_length: float
+        Rata-rata panjang dokumen di koleksi
+
+    Returns
+    -------
+    numpy.ndarray
+        Score BM25 untuk setiap posting
+    """
+    tf = np.asarray(tf_list, dtype=np.float64)
+    dl = np.asarray(doc_lengths, dtype=np.float64)
+    numer = (k1 + 1) * tf
+    denom = (k1 * ((1 - b) + b * dl / avg_doc_length)) + tf
+    return (numer / denom) * math.log10(n / df)
+
+
+def top_k(doc_ids, scores, k):
+    """
+    Memilih k dokumen dengan score terbesar tanpa mengurutkan semua kandidat
+    (menggunakan np.partition), lalu mengurutkan k dokumen tersebut.
+
+    Urutan hasil adalah score mengecil; dokumen dengan score sama diurutkan
+    berdasarkan doc ID membesar, termasuk ketika memilih dokumen di batas top-k.
+
+    Parameters
+    ----------
+    doc_ids: numpy.ndarray
+        Doc ID kandidat, terurut membesar
+    scores: numpy.ndarray
+        Score dari setiap kandidat
+    k: int
+
+    Returns
+    -------
+    Tuple[numpy.ndarray, numpy.ndarray]
+        Doc ID dan score dari top-k dokumen
+    """
+    if k < len(scores):
+        # score terbesar ke-k
+        kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+        keep = scores > kth
+        ties = np.flatnonzero(scores == kth)[:k - np.count_nonzero(keep)]
+        keep[ties] = True
+        doc_ids, scores = doc_ids[keep], scores[keep]
+    order = np.lexsort((doc_ids, -scores))
+    return doc_ids[order], scores[order]
+
+
+def phrase_frequencies(term_positions):
+    """
+    Menghitung banyaknya kemunculan sebuah frase di setiap dokumen kandidat.
+
+    Kata ke-i frase di posisi p berarti frase dimulai di posisi p - i, sehingga
+    frase muncul di posisi awal s jika s + i ada di posisi kata ke-i untuk
+    semua i. Pasangan (dokumen, posisi awal) setiap kata diubah menjadi satu
+    integer, lalu diiris untuk semua kata.
+
+    Parameters
+    ----------
+    term_positions: List[Tuple[numpy.ndarray, numpy.ndarray]]
+        Untuk setiap kata frase (sesuai urutan), (positions, offsets) di
+        dokumen-dokumen kandidat: posisi kata di dokumen ke-d adalah
+        positions[offsets[d]:offsets[d + 1]]
+
+    Returns
+    -------
+    numpy.ndarray
+        Banyaknya kemunculan frase (int64) di setiap dokumen kandidat
+    """
+    num_docs = len(term_positions[0][1]) - 1
+    m = len(term_positions)
+    stride = max(int(positions.max()) if len(positions) > 0 else 0 for (positions, _) in term_positions) + m + 1
+
+    matches = None
+    for i, (positions, offsets) in enumerate(term_positions):
+        docs = np.repeat(np.arange(num_docs), np.diff(offsets))
+        # + m agar posisi awal selalu non-negatif
+        keys = docs * stride + (positions - i + m)
+        matches = keys if matches is None else np.intersect1d(matches, keys, assume_unique=True)
+    return np.bincount(matches // stride, minlength=num_docs)
+
+
+def proximity_frequencies(term_positions, window):
+    """
+    Menghitung banyaknya kemunculan semua term (dengan urutan bebas) dalam
+    window token berurutan di setiap dokumen kandidat.
+
+    Posisi semua term di sebuah dokumen di-scan terurut; di setiap posisi p,
+    window terpendek yang berakhir di p dan memuat semua term dimulai dari
+    posisi terakhir term yang paling lama tidak muncul. Kemunculan dihitung
+    jika panjang window tersebut tidak lebih dari window.
+
+    Parameters
+    ----------
+    term_positions: List[Tuple[numpy.ndarray, numpy.ndarray]]
+        Untuk setiap term (unik), (positions, offsets) di dokumen-dokumen
+        kandidat (lihat phrase_frequencies)
+    window: int
+        Panjang window (banyaknya token)
+
+    Returns
+    -------
+    numpy.ndarray
+        Banyaknya kemunculan (int64) di setiap dokumen kandidat
+    """
+    num_docs = len(term_positions[0][1]) - 1
+    frequencies = np.zeros(num_docs, dtype=np.int64)
+    for d in range(num_docs):
+        events = sorted((p, t) for t, (positions, offsets) in enumerate(term_positions)
+                        for p in positions[offsets[d]:offsets[d + 1]].tolist())
+        last = [-math.inf] * len(term_positions)
+        count = 0
+        for p, t in events:
+            last[t] = p
+            if p - min(last) < window:
+                count += 1
+        frequencies[d] = count
+    return frequencies
+
+
+class ScoreAccumulator:
+    """
+    Accumulator untuk ranked retrieval dengan skema TaaT (Term-at-a-Time).
+    Score disimpan di sebuah dense array berukuran banyaknya dokumen, sehingga
+    akumulasi score satu term cukup satu operasi vectorized.
+
+    Attributes
+    ----------
+    scores(numpy.ndarray): Score akumulasi untuk setiap doc ID
+    touched(numpy.ndarray): Penanda dokumen yang muncul di minimal satu postings
+                    list (kandidat hasil retrieval, meskipun score-nya 0)
+    """
+
+    def __init__(self, num_docs, dtype=np.float64):
+        self.scores = np.zeros(num_docs, dtype=dtype)
+        self.touched = np.zeros(num_docs, dtype=bool)
+
+    def add(self, postings_list, weights):
+        """
+        Menambahkan score weights ke dokumen-dokumen pada postings_list.
+        Doc ID di sebuah postings list unik, sehingga fancy indexing aman.
+        """
+        postings_list = np.asarray(postings_list, dtype=np.int64)
+        self.scores[postings_list] += weights
+        self.touched[postings_list] = True
+
+    def top_k(self, k):
+        """Mengembalikan (doc_ids, scores) dari top-k dokumen (lihat top_k)"""
+        doc_ids = np.flatnonzero(self.touched)
+        return top_k(doc_ids, self.scores[doc_ids], k)
+
+
+class ImpactQuantizer:
+    """
+    Menghitung score TF-IDF atau BM25 setiap posting saat indexing dan
+    mengkuantisasinya menjadi integer 8-bit (impact). Saat query, score sebuah
+    dokumen cukup dihitung dengan menjumlahkan impact.
+
+    impact = round(score * scale), dengan scale = 255 / max_score sehingga
+    score terbesar yang mungkin di koleksi menjadi 255.
+
+    Attributes
+    ----------
+    scheme(str): "tfidf" atau "bm25"
+    n(int): Banyaknya dokumen di koleksi
+    avg_doc_length(float): Rata-rata panjang dokumen
+    doc_length_array(numpy.ndarray): Panjang dokumen (index = doc ID)
+    k1, b(float): Parameter BM25
+    scale(float): Faktor pengali score menjadi impact
+    """
+
+    BITS = 8
+
+    def __init__(self, scheme, n, avg_doc_length, doc_length_array, k1=1.2, b=0.75):
+        if scheme not in ("tfidf", "bm25"):
+            raise ValueError(f"impact scoring tidak dikenal: {scheme}")
+        self.scheme = scheme
+        self.n = n
+        self.avg_doc_length = avg_doc_length
+        self.doc_length_array = doc_length_array
+        self.k1 = k1
+        self.b = b
+        self.scale = 1.0
+
+    def weights(self, postings_list, tf_list, df):
+        """Score (float) setiap posting dari sebuah term"""
+        if self.scheme == "tfidf":
+            return tfidf_weights(tf_list, df, self.n)
+        doc_lengths = self.doc_length_array[np.asarray(postings_list, dtype=np.int64)]
+        return bm25_weights(tf_list, doc_lengths, df, self.n, self.avg_doc_length, k1=self.k1, b=self.b)
+
+    def upper_bound(self, df, max_tf, min_doc_length):
+        """Score terbesar yang mungkin untuk sebuah term"""
+        if self.scheme == "tfidf":
+            return tfidf_weights([max_tf], df, self.n)[0]
+        return bm25_weights([max_tf], [min_doc_length], df, self.n, self.avg_doc_length, k1=self.k1, b=self.b)[0]
+
+    def set_max_score(self, max_score):
+        """Menentukan scale berdasarkan score terbesar di koleksi"""
+        max_impact = 2 ** self.BITS - 1
+        self.scale = float(max_impact / max_score) if max_score > 0 else 1.0
+
+    def impacts(self, postings_list, tf_list):
+        """Impact (numpy.ndarray of uint8) setiap posting dari sebuah term"""
+        weights = self.weights(postings_list, tf_list, len(postings_list))
+        return np.minimum(np.rint(weights * self.scale), 2 ** self.BITS - 1).astype(np.uint8)
+
+    def info(self):
+        """Parameter kuantisasi yang disimpan di metadata index"""
+        return {"scheme": self.scheme, "k1": self.k1, "b": self.b, "scale": self.scale, "bits": self.BITS}
+
+
+class PostingsCursor:
+    """
+    Cursor untuk traversal DaaT (Document-at-a-Time) atas postings list
+    sebuah term beserta score setiap posting.
+
+    Attributes
+    ----------
+    doc_ids(numpy.ndarray): Postings list (terurut membesar)
+    weights(numpy.ndarray): Score term untuk setiap posting
+    upper_bound(float): Batas atas score term ini untuk dokumen manapun
+    position(int): Posisi cursor pada postings list
+    """
+
+    def __init__(self, doc_ids, weights, upper_bound):
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        self.weights = weights
+        self.upper_bound = upper_bound
+        self.position = 0
+
+    @property
+    def exhausted(self):
+        return self.position >= len(self.doc_ids)
+
+    @property
+    def doc(self):
+        """Doc ID pada posisi cursor"""
+        return int(self.doc_ids[self.position])
+
+    @property
+    def weight(self):
+        """Score term untuk dokumen pada posisi cursor"""
+        return float(self.weights[self.position])
+
+    def next(self):
+        self.position += 1
+
+    def skip_to(self, doc_id):
+        """Memajukan cursor ke posting pertama dengan doc ID >= doc_id"""
+        self.position += int(np.searchsorted(self.doc_ids[self.position:], doc_id, side='left'))
+
+    def block_max_score(self, doc_id):
+        """
+        Batas atas score term ini untuk dokumen doc_id, berdasarkan blok yang
+        mungkin memuat doc_id. Seluruh postings list dianggap satu blok.
+        """
+        return self.upper_bound if doc_id <= self.doc_ids[-1] else 0
+
+    def block_end(self, doc_id):
+        """Doc ID terakhir di blok yang mungkin memuat doc_id (inf jika tidak ada)"""
+        return int(self.doc_ids[-1]) if doc_id <= self.doc_ids[-1] else math.inf
+
+
+class BlockPostingsCursor(PostingsCursor):
+    """
+    Cursor atas postings list yang disimpan per blok dengan skip table (lihat
+    skip_dict pada index.py). Sebuah blok baru dibaca dan di-decode ketika
+    cursor berada di blok tersebut, sehingga blok yang dilompati oleh skip_to
+    tidak pernah di-decode.
+
+    Attributes
+    ----------
+    last_doc_ids(numpy.ndarray): Doc ID terakhir di setiap blok
+    block_upper_bounds(numpy.ndarray): Batas atas score term ini di setiap blok
+    read_block(Callable[[int], Tuple[numpy.ndarray, numpy.ndarray]]): Fungsi
+                    yang mengembalikan (doc_ids, weights) sebuah blok
+    block(int): Blok tempat cursor berada
+    doc_ids, weights(numpy.ndarray): Isi blok tempat cursor berada
+    """
+
+    def __init__(self, last_doc_ids, block_upper_bounds, read_block):
+        self.last_doc_ids = np.asarray(last_doc_ids, dtype=np.int64)
+        self.block_upper_bounds = np.asarray(block_upper_bounds, dtype=np.float64)
+        self.read_block = read_block
+        self.upper_bound = float(self.block_upper_bounds.max())
+        self.load_block(0)
+
+    def load_block(self, block):
+        self.block = block
+        self.position = 0
+        if not self.exhausted:
+            doc_ids, self.weights = self.read_block(block)
+            self.doc_ids = np.asarray(doc_ids, dtype=np.int64)
+
+    @property
+    def exhausted(self):
+        return self.block >= len(self.last_doc_ids)
+
+    def next(self):
+        self.position += 1
+        if self.position >= len(self.doc_ids):
+            self.load_block(self.block + 1)
+
+    def skip_to(self, doc_id):
+        """Memajukan cursor ke posting pertama dengan doc ID >= doc_id"""
+        if doc_id > self.last_doc_ids[self.block]:
+            # blok-blok yang seluruh doc ID-nya < doc_id dilewati tanpa decode
+            self.load_block(self.block + int(np.searchsorted(self.last_doc_ids[self.block:], doc_id, side='left')))
+            if self.exhausted:
+                return
+        super().skip_to(doc_id)
+
+    def block_max_score(self, doc_id):
+        """Batas atas score term ini di blok yang mungkin memuat doc_id (tanpa decode)"""
+        block = int(np.searchsorted(self.last_doc_ids, doc_id, side='left'))
+        return self.block_upper_bounds[block] if block < len(self.last_doc_ids) else 0
+
+    def block_end(self, doc_id):
+        """Doc ID terakhir di blok yang mungkin memuat doc_id (inf jika tidak ada)"""
+        block = int(np.searchsorted(self.last_doc_ids, doc_id, side='left'))
+        return int(self.last_doc_ids[block]) if block < len(self.last_doc_ids) else math.inf
+
+
+def wand_top_k(cursors, k):
+    """
+    Memilih top-k dokumen dengan algoritma WAND (Broder et al., 2003) yang
+    diperluas menjadi Block-Max WAND (Ding & Suel, 2011).
+
+    Cursor diurutkan berdasarkan doc ID saat ini, lalu dicari pivot: cursor
+    pertama dimana jumlah upper bound dari cursor-cursor sebelumnya (termasuk
+    dirinya) melebihi threshold (score terkecil di top-k saat ini). Dokumen
+    sebelum pivot tidak mungkin masuk top-k, sehingga cursor-cursor tersebut
+    langsung dilompatkan ke dokumen pivot tanpa dihitung score-nya.
+
+    Sebelum score dokumen pivot dihitung, upper bound dari blok yang memuat
+    dokumen pivot (block_max_score) dijumlahkan. Jika jumlahnya tidak melebihi
+    threshold, tidak ada dokumen sampai akhir blok terdekat yang bisa masuk
+    top-k, sehingga cursor-cursor tersebut langsung dilompatkan ke setelah
+    batas blok (blok yang dilewati tidak di-decode).
+
+    Score sebuah dokumen dijumlahkan mengikuti urutan cursors, sama seperti
+    akumulasi pada ScoreAccumulator, dan urutan hasil sama dengan top_k
+    (score mengecil, doc ID membesar untuk score yang sama). Oleh karena itu
+    hasilnya sama dengan scoring exhaustive.
+
+    Parameters
+    ----------
+    cursors: List[PostingsCursor]
+        Satu cursor untuk setiap term di query
+    k: int
+
+    Returns
+    -------
+    Tuple[numpy.ndarray, numpy.ndarray]
+        Doc ID dan score dari top-k dokumen
+    """
+    # min-heap berisi (score, -doc_id); elemen terkecil adalah dokumen yang
+    # pertama kali tersingkir dari top-k
+    heap = []
+    threshold = -math.inf
+    if k <= 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.float64)
+
+    while True:
+        active = sorted((cursor for cursor in cursors if not cursor.exhausted), key=lambda c: c.doc)
+
+        # mencari pivot
+        pivot = None
+        upper_bound = 0
+        for i, cursor in enumerate(active):
+            upper_bound += cursor.upper_bound
+            if upper_bound > threshold:
+                pivot = i
+                break
+        if pivot is None:
+            break
+        pivot_doc = active[pivot].doc
+        # cursor lain yang berada di pivot_doc juga menyumbang score pivot_doc
+        while pivot + 1 < len(active) and active[pivot + 1].doc == pivot_doc:
+            pivot += 1
+
+        # upper bound berdasarkan blok yang memuat pivot_doc
+        block_bound = 0
+        for cursor in active[:pivot + 1]:
+            block_bound += cursor.block_max_score(pivot_doc)
+
+        if block_bound <= threshold:
+            # dokumen sebelum next_doc hanya mungkin ada di cursor sampai pivot,
+            # dan score-nya tidak melebihi block_bound
+            next_doc = min(cursor.block_end(pivot_doc) for cursor in active[:pivot + 1]) + 1
+            if pivot + 1 < len(active):
+                next_doc = min(next_doc, active[pivot + 1].doc)
+            for cursor in active[:pivot + 1]:
+                cursor.skip_to(next_doc)
+        elif active[0].doc == pivot_doc:
+            # semua cursor sebelum pivot berada di pivot_doc: hitung score penuh
+            score = 0
+            for cursor in cursors:
+                if not cursor.exhausted and cursor.doc == pivot_doc:
+                    score += cursor.weight
+                    cursor.next()
+            # dokumen dengan score sama dengan threshold kalah oleh dokumen di
+            # heap karena doc ID-nya lebih besar
+            if len(heap) < k:
+                heapq.heappush(heap, (score, -pivot_doc))
+            elif score > heap[0][0]:
+                heapq.heapreplace(heap, (score, -pivot_doc))
+            if len(heap) == k:
+                threshold = heap[0][0]
+        else:
+            # dokumen sebelum pivot_doc tidak mungkin masuk top-k
+            for cursor in active[:pivot]:
+                if cursor.doc < pivot_doc:
+                    cursor.skip_to(pivot_doc)
+
+    heap.sort(key=lambda item: (-item[0], -item[1]))
+    doc_ids = np.array([-doc for (_, doc) in heap], dtype=np.int64)
+    scores = np.array([score for (score, _) in heap], dtype=np.float64)
+    return doc_ids, scores
+
+
+if __name__ == '__main__':
+
+    rng = np.random.default_rng(0)
+
+    assert np.allclose(tfidf_weights([0, 1, 10], 10, 1000), [0, 2, 4]), "tfidf_weights salah"
+    weights = bm25_weights([1, 2], [10, 10], 10, 1000, 10, k1=1.2, b=0.75)
+    assert np.allclose(weights, [2.2 / 2.2 * 2, 4.4 / 3.2 * 2]), "bm25_weights salah"
+
+    # score sama diurutkan berdasarkan doc ID membesar, termasuk di batas top-k
+    doc_ids = np.array([2, 3, 5, 7, 11, 13])
+    scores = np.array([1.0, 3.0, 3.0, 2.0, 3.0, 1.0])
+    assert top_k(doc_ids, scores, 2)[0].tolist() == [3, 5], "top_k salah"
+    assert top_k(doc_ids, scores, 4)[0].tolist() == [3, 5, 11, 7], "top_k salah"
+    assert top_k(doc_ids, scores, 5)[0].tolist() == [3, 5, 11, 7, 2], "top_k salah"
+    assert top_k(doc_ids, scores, 10)[1].tolist() == [3.0, 3.0, 3.0, 2.0, 1.0, 1.0], "top_k salah"
+
+    # dokumen dengan score 0 tetap menjadi kandidat
+    accumulator = ScoreAccumulator(8)
+    accumulator.add([1, 4, 6], np.array([0.5, 0.0, 1.0]))
+    accumulator.add([4, 6], np.array([0.0, 0.5]))
+    doc_ids, scores = accumulator.top_k(10)
+    assert doc_ids.tolist() == [6, 1, 4] and scores.tolist() == [1.5, 0.5, 0.0], "ScoreAccumulator salah"
+
+    # impact terbesar adalah 255 untuk score terbesar di koleksi
+    doc_length_array = np.array([5.0, 10.0, 20.0])
+    quantizer = ImpactQuantizer("bm25", 30, 35 / 3, doc_length_array)
+    quantizer.set_max_score(quantizer.upper_bound(3, 4, 5.0))
+    impacts = quantizer.impacts([0, 1, 2], [4, 4, 1])
+    assert impacts.dtype == np.uint8 and impacts[0] == 255 and impacts[0] > impacts[1] > impacts[2], "ImpactQuantizer salah"
+
+    # WAND dan Block-Max WAND sama dengan scoring exhaustive, termasuk untuk
+    # score yang sama (weights integer)
+    def block_cursor(postings_list, weights, block_size):
+        last_doc_ids = postings_list[block_size - 1::block_size].tolist()
+        if len(postings_list) % block_size:
+            last_doc_ids.append(int(postings_list[-1]))
+        upper_bounds = [weights[i:i + block_size].max() for i in range(0, len(postings_list), block_size)]
+        return BlockPostingsCursor(last_doc_ids, upper_bounds,
+                                   lambda block: (postings_list[block * block_size:(block + 1) * block_size],
+                                                  weights[block * block_size:(block + 1) * block_size]))
+
+    for trial in range(200):
+        num_docs = int(rng.integers(1, 300))
+        terms = []
+        for _ in range(int(rng.integers(1, 5))):
+            postings_list = np.sort(rng.choice(num_docs, size=int(rng.integers(1, num_docs + 1)), replace=False))
+            if trial % 2 == 0:
+                weights = rng.integers(0, 4, size=len(postings_list)).astype(np.float64)
+            else:
+                weights = rng.random(len(postings_list))
+            terms.append((postings_list, weights))
+
+        accumulator = ScoreAccumulator(num_docs)
+        for postings_list, weights in terms:
+            accumulator.add(postings_list, weights)
+        for k in [1, 3, 10, 1000]:
+            expected_doc_ids, expected_scores = accumulator.top_k(k)
+            for make_cursor in [lambda p, w: PostingsCursor(p, w, w.max()),
+                                lambda p, w: block_cursor(p, w, 4)]:
+                doc_ids, scores = wand_top_k([make_cursor(p, w) for p, w in terms], k)
+                assert doc_ids.tolist() == expected_doc_ids.tolist(), "wand_top_k salah"
+                assert scores.tolist() == expected_scores.tolist(), "wand_top_k salah"
+    assert len(wand_top_k([PostingsCursor([1], np.array([1.0]), 1.0)], 0)[0]) == 0, "wand_top_k salah"
+
+    # phrase_frequencies dan proximity_frequencies sama dengan perhitungan brute force
+    def term_positions(documents, term):
+        positions = [np.flatnonzero(tokens == term) for tokens in documents]
+        return np.concatenate(positions), np.concatenate(([0], np.cumsum([len(p) for p in positions])))
+
+    for trial in range(100):
+        documents = [rng.integers(0, 4, size=int(rng.integers(0, 40))) for _ in range(5)]
+        phrase = rng.integers(0, 4, size=int(rng.integers(1, 4))).tolist()
+        expected = [sum(all(s + i < len(tokens) and tokens[s + i] == term for i, term in enumerate(phrase))
+                        for s in range(len(tokens))) for tokens in documents]
+        frequencies = phrase_frequencies([term_positions(documents, term) for term in phrase])
+        assert frequencies.tolist() == expected, "phrase_frequencies salah"
+
+        query = list(dict.fromkeys(phrase))
+        window = int(rng.integers(1, 10))
+        expected = [sum(tokens[p] in query and all(term in tokens[max(0, p - window + 1):p + 1] for term in query)
+                        for p in range(len(tokens))) for tokens in documents]
+        frequencies = proximity_frequencies([term_positions(documents, term) for term in query], window)
+        assert frequencies.tolist() == expected, "proximity_frequencies salah"
@@ -0,0 +1,154 @@
+import contextlib
+import functools
+import threading
+
+
+class SearcherState:
+    """
+    State searcher yang tidak berubah setelah dibuat (id map, statistik
+    koleksi, dan reader yang terbuka), misalnya hasil BSBIIndex.load.
+
+    Setiap query mengambil referensi ke state saat ini sekali (acquire) dan
+    hanya memakai state tersebut sampai selesai (release), sehingga query
+    tidak perlu memegang lock selama membaca postings atau isi dokumen. Ketika
+    state diganti dengan state baru (retire), reader-nya baru ditutup setelah
+    query terakhir yang memakainya selesai.
+
+    Sebuah reader boleh dipakai bersama oleh beberapa state (misal segment
+    yang tidak ikut di-merge, lihat segments.py); reader tersebut baru
+    ditutup ketika semua state yang memakainya sudah ditutup.
+
+    Attributes
+    ----------
+    users(int): Banyaknya query yang sedang memakai state ini
+    retired(bool): True jika state ini sudah diganti
+    closed(bool): True jika reader-reader state ini sudah dilepas
+    """
+
+    # id(reader) -> [reader, fungsi untuk menutupnya, banyaknya state yang
+    # memakainya], dipakai bersama oleh semua state
+    references = {}
+    references_lock = threading.Lock()
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+        self.resources = []
+        self.users = 0
+        self.retired = False
+        self.closed = False
+        self.lock = threading.Lock()
+
+    def add_resource(self, resource, close=None):
+        """
+        Mendaftarkan resource (misal reader) yang dipakai state ini; close()
+        dipanggil ketika tidak ada lagi state yang memakai resource tersebut.
+        close boleh None jika resource sudah didaftarkan oleh state lain yang
+        belum ditutup. Mengembalikan resource.
+        """
+        with SearcherState.references_lock:
+            entry = SearcherState.references.setdefault(id(resource), [resource, close, 0])
+            entry[2] += 1
+        with self.lock:
+            self.resources.append(resource)
+        return resource
+
+    def open(self, reader):
+        """Membuka reader (context manager) yang ditutup bersama state ini"""
+        reader.__enter__()
+        return self.add_resource(reader, functools.partial(reader.__exit__, None, None, None))
+
+    def shared_resources(self):
+        """Salinan daftar resource state ini, misalnya untuk dipakai bersama state baru"""
+        with self.lock:
+            return list(self.resources)
+
+    def acquire(self):
+        with self.lock:
+            self.users += 1
+        return self
+
+    def release(self):
+        with self.lock:
+            self.users -= 1
+            close = self.retired and self.users == 0 and not self.closed
+            self.closed = self.closed or close
+        if close:
+            self.close_resources()
+
+    def retire(self):
+        """Menandai state sudah diganti; reader dilepas setelah query terakhir selesai"""
+        with self.lock:
+            self.retired = True
+            close = self.users == 0 and not self.closed
+            self.closed = self.closed or close
+        if close:
+            self.close_resources()
+
+    def close_resources(self):
+        to_close = []
+        with SearcherState.references_lock:
+            for resource in self.resources:
+                entry = SearcherState.references[id(resource)]
+                entry[2] -= 1
+                if entry[2] == 0:
+                    del SearcherState.references[id(resource)]
+                    to_close.append(entry[1])
+        self.resources = []
+        for close in to_close:
+            close()
+
+
+@contextlib.contextmanager
+def acquire_state(owner, load, state=None):
+    """
+    Context manager yang menghasilkan state jika diberikan, atau state saat
+    ini dari owner (objek dengan atribut state dan lock, misal BSBIIndex)
+    yang dipakai (acquire) selama blok with. load() dipanggil jika owner
+    belum mempunyai state.
+    """
+    if state is not None:
+        yield state
+        return
+    while True:
+        with owner.lock:
+            state = owner.state.acquire() if owner.state is not None else None
+        if state is not None:
+            break
+        load()
+    try:
+        yield state
+    finally:
+        state.release()
+
+
+def publish_state(owner, state):
+    """
+    Mengganti state owner dengan state (boleh None) sambil memegang lock
+    owner. State lama ditutup setelah query terakhir yang memakainya selesai.
+    """
+    with owner.lock:
+        old_state, owner.state = owner.state, state
+    if old_state is not None:
+        old_state.retire()
+
+
+if __name__ == '__main__':
+
+    closed = []
+    shared, own = object(), object()
+    old = SearcherState(version=1)
+    old.add_resource(shared, lambda: closed.append('shared'))
+    old.add_resource(own, lambda: closed.append('own'))
+    new = SearcherState(version=2)
+    new.add_resource(shared, lambda: closed.append('shared'))
+
+    # reader baru ditutup setelah query terakhir yang memakainya selesai
+    old.acquire()
+    old.retire()
+    assert closed == [], "state yang masih dipakai tidak boleh ditutup"
+    old.release()
+    assert closed == ['own'], "reader yang masih dipakai state lain tidak boleh ditutup"
+    new.retire()
+    assert closed == ['own', 'shared'], "reader tidak ditutup"
+    old.retire()
+    assert closed == ['own', 'shared'], "reader tidak boleh ditutup dua kali"
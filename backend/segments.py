@@ -0,0 +1,741 @@
+# referensi: Cutting & Pedersen (1990), Optimizations for Dynamic Inverted Index Maintenance ,
+# https://lucene.apache.org/core/9_0_0/core/org/apache/lucene/index/TieredMergePolicy.html
+
+import array
+import bisect
+import contextlib
+import functools
+import heapq
+import itertools
+import math
+import os
+import pickle
+import threading
+
+import numpy as np
+
+from bsbi import invert_tokens
+from docstore import DocumentStoreReader, DocumentStoreWriter, ForwardIndexReader
+from index import InvertedIndexReader, InvertedIndexWriter
+from scoring import ScoreAccumulator, bm25_weights, tfidf_weights
+from searcher import SearcherState, acquire_state, publish_state
+
+
+class SegmentedIndex:
+    """
+    Index yang terdiri dari beberapa segment, sehingga dokumen baru bisa
+    ditambahkan tanpa indexing ulang seluruh collection.
+
+    Setiap segment adalah sebuah inverted index biasa (file .index dan .dict
+    dengan format InvertedIndex) untuk sebagian dokumen. Merged index hasil
+    BSBIIndex.do_indexing menjadi segment pertama; add_documents menulis
+    segment kecil yang baru, dan segment-segment kecil digabung secara
+    bertahap oleh merge policy (lihat find_merge) di background thread.
+
+    Merged index tidak pernah di-merge, ditulis ulang, atau dihapus oleh
+    SegmentedIndex, karena BSBIIndex (load dan do_indexing berikutnya)
+    memakai file merged index secara langsung. Postings dokumen yang dihapus
+    dari merged index baru dibuang oleh do_indexing berikutnya.
+
+    term_id_map dan doc_id_map dipakai bersama oleh semua segment, sehingga
+    doc ID unik di seluruh index dan score bisa diakumulasi di satu
+    ScoreAccumulator. Statistik untuk scoring (N, df, dan rata-rata panjang
+    dokumen) dihitung dari semua segment.
+
+    Dokumen yang dihapus hanya ditandai di tombstone bitmap (deleted) dan
+    tidak muncul di hasil retrieval. Postings-nya baru dibuang ketika segment
+    tempatnya berada di-merge. Seperti pada Lucene, df tetap menghitung
+    dokumen yang dihapus sampai postings-nya dibuang.
+
+    Daftar segment disimpan di file manifest (MANIFEST_FILE), yang ditulis
+    setelah semua file segment selesai ditulis, sehingga segment yang belum
+    lengkap tidak pernah terbaca.
+
+    Seperti BSBIIndex, query memakai state searcher (lihat SearcherState dan
+    searcher): add_documents, delete_documents, dan merge membuat state baru
+    yang memakai bersama reader segment yang tidak berubah, lalu
+    menggantikan state lama. File segment yang sudah di-merge baru dihapus
+    setelah reader terakhirnya ditutup. Proses serving (main.py) membuka
+    index dengan read_only=True dan memuat ulang state ketika manifest,
+    tombstone bitmap, atau id map di store berubah (reload_if_changed).
+
+    Attributes
+    ----------
+    index(BSBIIndex): Index utama; menyediakan term_id_map, doc_id_map, store,
+                    postings encoding, analyzer, dan merge_index
+    state(SearcherState): State searcher saat ini, berisi segments (isi
+                    manifest, satu dict untuk setiap segment: name (nama
+                    index), doc_base (doc ID terkecil), doc_count (banyaknya
+                    dokumen dengan panjang > 0), dan documents (list of (nama
+                    document store, doc ID pertama, banyaknya dokumen))),
+                    readers (nama segment -> InvertedIndexReader), deleted
+                    (tombstone bitmap, bool, index = doc ID), doc_length_array
+                    (panjang setiap dokumen di semua segment), n,
+                    avg_doc_length, document_readers, forward (forward index
+                    merged index), dan doc_vectors
+    merge_factor(int): Banyaknya segment di satu tier sebelum di-merge
+    min_segment_docs(int): Segment yang lebih kecil dari ini dianggap
+                    berada di tier terkecil
+    read_only(bool): Jika True, index hanya dipakai untuk query
+    """
+
+    MANIFEST_FILE = 'segments.manifest'
+    TOMBSTONE_FILE = 'deleted.bitmap'
+    SEGMENT_EXTENSIONS = ['.index', '.dict', '.ptab', '.lengths', '.pos']
+
+    # segment yang proporsi dokumen terhapusnya minimal sebesar ini ditulis
+    # ulang (sendirian) untuk membuang postings dokumen tersebut
+    MAX_DELETED_RATIO = 0.3
+
+    def __init__(self, index, merge_factor=10, min_segment_docs=1000, background_merge=True, read_only=False):
+        """
+        Parameters
+        ----------
+        index: BSBIIndex
+            Index utama (boleh belum pernah di-indexing)
+        merge_factor: int
+        min_segment_docs: int
+        background_merge: bool
+            Jika True, merge dijalankan di background thread setelah
+            add_documents; jika False, merge dijalankan sebelum add_documents
+            selesai
+        read_only: bool
+            Jika True, term_id_map dibaca dari terms.lex (lihat
+            BSBIIndex.load_id_maps) dan add_documents serta delete_documents
+            tidak bisa dipakai
+        """
+        self.index = index
+        self.merge_factor = merge_factor
+        self.min_segment_docs = min_segment_docs
+        self.background_merge = background_merge
+        self.read_only = read_only
+
+        self.state = None
+        self.next_segment = 0
+        # segment yang sudah di-merge; file-nya dihapus ketika reader-nya ditutup
+        self.obsolete = set()
+
+        # lock hanya dipegang untuk mengganti state atau mengambil referensinya
+        self.lock = threading.Lock()
+        # lock untuk perubahan manifest dan id map (add, delete, commit merge)
+        self.write_lock = threading.RLock()
+        # hanya satu merge yang berjalan pada satu waktu
+        self.merge_lock = threading.Lock()
+        self.merge_thread = None
+
+    def path(self, name):
+        return os.path.join(self.index.output_dir, name)
+
+    def read_manifest(self, store):
+        """Isi manifest di store ([segments, next_segment]), atau None jika belum ada"""
+        if not store.exists(self.path(self.MANIFEST_FILE)):
+            return None
+        with store.open(self.path(self.MANIFEST_FILE), 'rb') as f:
+            return pickle.load(f)
+
+    def open(self):
+        """
+        Memuat id map, manifest, dan tombstone bitmap, lalu membuka semua
+        segment sebagai state baru. Jika manifest belum ada, merged index
+        hasil do_indexing (jika ada) menjadi satu-satunya segment.
+        """
+        index, store = self.index, self.index.store
+        with self.write_lock:
+            state = SearcherState(version=self.current_version(), segments=[], readers={}, document_readers={},
+                                  forward=None, doc_vectors={})
+            try:
+                if self.read_only:
+                    index.load_id_maps(state)
+                else:
+                    if store.exists(self.path('terms.dict')):
+                        with store.open(self.path('terms.dict'), 'rb') as f:
+                            index.term_id_map = pickle.load(f)
+                        with store.open(self.path('docs.dict'), 'rb') as f:
+                            index.doc_id_map = pickle.load(f)
+                    state.term_id_map, state.doc_id_map = index.term_id_map, index.doc_id_map
+
+                manifest = self.read_manifest(store)
+                if manifest is not None:
+                    state.segments, next_segment = manifest
+                    if not self.read_only:
+                        self.next_segment = next_segment
+                elif store.exists(self.path(index.index_name + '.dict')):
+                    documents = []
+                    if store.exists(self.path(index.DOCUMENT_STORE_NAME + '.dict')):
+                        documents.append((index.DOCUMENT_STORE_NAME, 0, len(state.doc_id_map)))
+                    state.segments = [{'name': index.index_name, 'doc_base': 0, 'doc_count': None,
+                                       'documents': documents}]
+
+                state.deleted = np.zeros(len(state.doc_id_map), dtype=bool)
+                state.doc_length_array = np.zeros(len(state.doc_id_map))
+                if store.exists(self.path(self.TOMBSTONE_FILE)):
+                    with store.open(self.path(self.TOMBSTONE_FILE), 'rb') as f:
+                        packed = np.frombuffer(f.read(), dtype=np.uint8)
+                    tombstones = np.unpackbits(packed).astype(bool)
+                    self.grow(state, len(tombstones))
+                    state.deleted[:len(tombstones)] = tombstones
+
+                for segment in state.segments:
+                    reader = self.open_segment(state, segment['name'])
+                    segment['doc_count'] = len(reader.doc_length)
+                if store.exists(self.path(index.FORWARD_INDEX_NAME + '.dict')):
+                    state.forward = state.open(ForwardIndexReader(index.FORWARD_INDEX_NAME,
+                                                                  directory=index.output_dir, store=store))
+                self.update_stats(state)
+            except BaseException:
+                state.retire()
+                raise
+            publish_state(self, state)
+
+    def close(self):
+        """Melepas state; segment dan document store ditutup setelah query terakhir yang memakainya selesai"""
+        publish_state(self, None)
+
+    def searcher(self, state=None):
+        """Sama dengan BSBIIndex.searcher; open() dipanggil jika index belum dibuka"""
+        return acquire_state(self, self.open, state)
+
+    def current_version(self):
+        """
+        Versi manifest, tombstone bitmap, docs.dict, dan metadata merged index
+        di store. Salah satunya berubah setiap kali dokumen ditambahkan,
+        dihapus, di-merge, atau di-indexing ulang.
+        """
+        return tuple(self.index.store.version(self.path(name)) for name in
+                     [self.MANIFEST_FILE, self.TOMBSTONE_FILE, 'docs.dict', self.index.index_name + '.dict'])
+
+    def reload_if_changed(self):
+        """Sama dengan BSBIIndex.reload_if_changed, untuk semua segment"""
+        state = self.state
+        if state is not None and self.current_version() == state.version:
+            return False
+        self.open()
+        return True
+
+    def index_files(self, store):
+        """
+        Sama dengan BSBIIndex.index_files, ditambah file semua segment dan
+        document store-nya menurut manifest di store (misal bucket). Manifest
+        berada paling akhir, sehingga disalin (LocalStore.sync_from) setelah
+        semua file segment yang dirujuknya.
+        """
+        files = self.index.index_files()
+        manifest = self.read_manifest(store)
+        for segment in manifest[0] if manifest is not None else []:
+            files.extend(self.path(segment['name'] + extension) for extension in self.SEGMENT_EXTENSIONS)
+            for documents_name, _, _ in segment['documents']:
+                files.extend([self.path(documents_name + '.store'), self.path(documents_name + '.dict')])
+        files.extend([self.path(self.TOMBSTONE_FILE), self.path(self.MANIFEST_FILE)])
+        return list(dict.fromkeys(files))
+
+    def open_segment(self, state, name):
+        """Membuka segment name di state dan menambahkan panjang dokumennya ke doc_length_array"""
+        reader = InvertedIndexReader(name, self.index.postings_encoding, directory=self.index.output_dir,
+                                     store=self.index.store).__enter__()
+        state.add_resource(reader, functools.partial(self.close_segment, name, reader))
+        state.readers[name] = reader
+        if reader.doc_length:
+            doc_ids = np.fromiter(reader.doc_length.keys(), dtype=np.int64, count=len(reader.doc_length))
+            self.grow(state, int(doc_ids.max()) + 1)
+            state.doc_length_array[doc_ids] = np.fromiter(reader.doc_length.values(), dtype=np.float64,
+                                                          count=len(reader.doc_length))
+        return reader
+
+    def close_segment(self, name, reader):
+        """Menutup reader segment; file segment yang sudah di-merge dihapus"""
+        reader.__exit__(None, None, None)
+        if name in self.obsolete:
+            self.obsolete.discard(name)
+            for extension in self.SEGMENT_EXTENSIONS:
+                self.index.store.delete(self.path(name + extension))
+
+    def grow(self, state, num_docs):
+        """Memperbesar deleted dan doc_length_array di state agar memuat num_docs dokumen"""
+        if len(state.doc_length_array) < num_docs:
+            state.doc_length_array = np.concatenate(
+                (state.doc_length_array, np.zeros(num_docs - len(state.doc_length_array))))
+        if len(state.deleted) < num_docs:
+            state.deleted = np.concatenate((state.deleted, np.zeros(num_docs - len(state.deleted), dtype=bool)))
+
+    def update_stats(self, state):
+        """Menghitung ulang N dan rata-rata panjang dokumen yang tidak dihapus"""
+        live = (state.doc_length_array > 0) & ~state.deleted[:len(state.doc_length_array)]
+        state.n = int(np.count_nonzero(live))
+        state.avg_doc_length = state.doc_length_array[live].sum() / state.n if state.n > 0 else 0
+
+    @contextlib.contextmanager
+    def update(self, drop=()):
+        """
+        Membuat state baru dari state saat ini untuk diubah di dalam blok
+        with, lalu menggantikan state saat ini dengannya. State baru memakai
+        bersama semua reader state saat ini kecuali drop; list dan array-nya
+        adalah salinan. Harus dipanggil sambil memegang write_lock.
+        """
+        if self.read_only:
+            raise ValueError("index dibuka read-only")
+        if self.state is None:
+            self.open()
+        old_state = self.state
+        state = SearcherState(version=None, term_id_map=old_state.term_id_map, doc_id_map=old_state.doc_id_map,
+                              segments=list(old_state.segments), readers=dict(old_state.readers),
+                              deleted=old_state.deleted.copy(), doc_length_array=old_state.doc_length_array.copy(),
+                              document_readers=dict(old_state.document_readers), forward=old_state.forward,
+                              doc_vectors=dict(old_state.doc_vectors))
+        for resource in old_state.shared_resources():
+            if not any(resource is dropped for dropped in drop):
+                state.add_resource(resource)
+        try:
+            yield state
+            self.update_stats(state)
+            state.version = self.current_version()
+        except BaseException:
+            state.retire()
+            raise
+        publish_state(self, state)
+
+    def write_manifest(self, state):
+        """Menyimpan id map lalu manifest; manifest adalah commit point"""
+        self.index.save()
+        with self.index.store.open(self.path(self.MANIFEST_FILE), 'wb') as f:
+            pickle.dump([state.segments, self.next_segment], f)
+
+    def write_tombstones(self, state):
+        with self.index.store.open(self.path(self.TOMBSTONE_FILE), 'wb') as f:
+            f.write(np.packbits(state.deleted).tobytes())
+
+    def new_segment_name(self):
+        with self.write_lock:
+            name = f'segment_{self.next_segment}'
+            self.next_segment += 1
+            return name
+
+    def add_documents(self, documents):
+        """
+        Menambahkan dokumen-dokumen baru sebagai satu segment baru. Dokumen
+        langsung bisa ditemukan setelah method ini selesai.
+
+        Parameters
+        ----------
+        documents: Iterable[Tuple[str, str]]
+            (nama dokumen, isi dokumen); nama dokumen harus unik dan belum
+            ada di index (jika tidak, ValueError)
+
+        Returns
+        -------
+        str
+            Nama segment baru, atau None jika documents kosong
+        """
+        if self.read_only:
+            raise ValueError("index dibuka read-only")
+        index = self.index
+        documents = list(documents)
+        doc_names = [doc_name for doc_name, _ in documents]
+        if len(set(doc_names)) < len(doc_names) or any(doc_name in index.doc_id_map for doc_name in doc_names):
+            raise ValueError("nama dokumen sudah ada di index")
+        if not documents:
+            return None
+
+        token_terms, token_docs, token_positions = array.array('q'), array.array('q'), array.array('q')
+        with self.write_lock:
+            name = self.new_segment_name()
+            doc_base = len(index.doc_id_map)
+            documents_name = name + '_documents'
+            with DocumentStoreWriter(documents_name, directory=index.output_dir, store=index.store,
+                                     compression=index.doc_compression) as document_writer:
+                for doc_name, content in documents:
+                    doc_id = index.doc_id_map[doc_name]
+                    document_writer.add(doc_id - doc_base, content)
+                    clean_words = index.pre_processing_text(content)
+                    token_terms.extend(index.term_id_map[word] for word in clean_words)
+                    token_docs.extend([doc_id] * len(clean_words))
+                    if index.positional:
+                        token_positions.extend(range(len(clean_words)))
+            doc_end = len(index.doc_id_map)
+            with InvertedIndexWriter(name, index.postings_encoding, directory=index.output_dir,
+                                     store=index.store) as writer:
+                index.write_postings_arrays(writer, *invert_tokens(token_terms, token_docs,
+                                                                   token_positions if index.positional else None))
+            with self.update() as state:
+                reader = self.open_segment(state, name)
+                self.grow(state, doc_end)
+                state.segments.append({'name': name, 'doc_base': doc_base, 'doc_count': len(reader.doc_length),
+                                       'documents': [(documents_name, doc_base, doc_end - doc_base)]})
+                self.write_manifest(state)
+
+        self.maybe_merge()
+        return name
+
+    def delete_documents(self, doc_names):
+        """
+        Menandai dokumen-dokumen di tombstone bitmap sehingga tidak lagi
+        muncul di hasil retrieval. Nama dokumen yang tidak ada dilewati.
+        """
+        with self.write_lock, self.update() as state:
+            self.grow(state, len(self.index.doc_id_map))
+            for doc_name in doc_names:
+                if doc_name in self.index.doc_id_map:
+                    state.deleted[self.index.doc_id_map[doc_name]] = True
+            self.write_tombstones(state)
+        self.maybe_merge()
+
+    def segment_deleted_count(self, state, segment):
+        """Banyaknya dokumen di segment yang sudah dihapus tetapi postings-nya belum dibuang"""
+        doc_length = state.readers[segment['name']].doc_length
+        if not doc_length:
+            return 0
+        doc_ids = np.fromiter(doc_length.keys(), dtype=np.int64, count=len(doc_length))
+        return int(np.count_nonzero(state.deleted[doc_ids]))
+
+    def find_merge(self):
+        """
+        Tiered merge policy: segment dikelompokkan ke tier berdasarkan
+        log_{merge_factor}(doc_count / min_segment_docs). Jika sebuah tier
+        berisi minimal merge_factor segment, merge_factor segment terkecil di
+        tier tersebut di-merge menjadi satu segment di tier berikutnya,
+        sehingga setiap dokumen di-merge ulang O(log N) kali. Segment yang
+        proporsi dokumen terhapusnya minimal MAX_DELETED_RATIO ditulis ulang.
+        Merged index (index.index_name) tidak pernah dipilih.
+
+        Returns
+        -------
+        List[dict]
+            Segment-segment yang harus di-merge, atau None
+        """
+        state = self.state
+        segments = [segment for segment in state.segments if segment['name'] != self.index.index_name]
+        tiers = {}
+        for segment in segments:
+            size = max(segment['doc_count'], self.min_segment_docs)
+            tier = int(math.log(size / self.min_segment_docs, self.merge_factor))
+            tiers.setdefault(tier, []).append(segment)
+        for tier in sorted(tiers):
+            if len(tiers[tier]) >= self.merge_factor:
+                return sorted(tiers[tier], key=lambda segment: segment['doc_count'])[:self.merge_factor]
+        for segment in segments:
+            if segment['doc_count'] > 0 and \
+                    self.segment_deleted_count(state, segment) >= self.MAX_DELETED_RATIO * segment['doc_count']:
+                return [segment]
+        return None
+
+    def maybe_merge(self):
+        """Menjalankan merge sesuai merge policy, di background thread jika background_merge"""
+        if not self.background_merge:
+            self.run_merges()
+            return
+        if self.merge_thread is None or not self.merge_thread.is_alive():
+            self.merge_thread = threading.Thread(target=self.run_merges, daemon=True)
+            self.merge_thread.start()
+
+    def wait_for_merges(self):
+        """Menunggu background merge (jika ada) selesai"""
+        if self.merge_thread is not None:
+            self.merge_thread.join()
+
+    def run_merges(self):
+        """Merge berulang kali sampai find_merge tidak menemukan segment yang perlu di-merge"""
+        with self.merge_lock:
+            while True:
+                with self.write_lock:
+                    segments = self.find_merge()
+                if segments is None:
+                    return
+                self.merge_segments(segments)
+
+    def merge_segments(self, segments):
+        """
+        Menggabungkan segments menjadi satu segment baru, lalu mengganti
+        segment-segment tersebut di manifest.
+
+        Jika tidak ada dokumen terhapus di segments, postings digabung dengan
+        BSBIIndex.merge_index (bytes di-copy tanpa decode jika memungkinkan).
+        Jika ada, postings dokumen yang terhapus dibuang (lihat write_purged).
+        Document store tidak ditulis ulang; segment baru merujuk ke document
+        store segment-segment lama.
+        """
+        index = self.index
+        segments = sorted(segments, key=lambda segment: segment['doc_base'])
+        name = self.new_segment_name()
+        # reader segment lama tetap terbuka selama merge karena state-nya dipakai
+        with self.searcher() as merged_state:
+            readers = [merged_state.readers[segment['name']] for segment in segments]
+            with InvertedIndexWriter(name, index.postings_encoding, directory=index.output_dir,
+                                     store=index.store) as writer:
+                if any(self.segment_deleted_count(merged_state, segment) > 0 for segment in segments):
+                    self.write_purged(readers, writer, merged_state.deleted)
+                else:
+                    index.merge_index(readers, writer)
+
+            merged = {segment['name'] for segment in segments}
+            with self.write_lock, self.update(drop=readers) as state:
+                reader = self.open_segment(state, name)
+                # panjang dokumen yang postings-nya dibuang menjadi 0
+                for old_reader in readers:
+                    purged = [doc_id for doc_id in old_reader.doc_length if doc_id not in reader.doc_length]
+                    state.doc_length_array[purged] = 0
+                state.segments = [segment for segment in state.segments if segment['name'] not in merged]
+                state.segments.append({'name': name, 'doc_base': segments[0]['doc_base'],
+                                       'doc_count': len(reader.doc_length),
+                                       'documents': [documents for segment in segments
+                                                     for documents in segment['documents']]})
+                for old_name in merged:
+                    del state.readers[old_name]
+                self.write_manifest(state)
+                # file segment lama dihapus setelah query terakhir yang memakainya selesai
+                self.obsolete.update(merged)
+
+    def write_purged(self, readers, writer, deleted):
+        """
+        Sama dengan BSBIIndex.merge_index, tetapi postings dokumen yang
+        ditandai di deleted dibuang. Term yang semua postings-nya terbuang
+        tidak ditulis.
+        """
+        positional = self.index.positional
+        merged_terms = heapq.merge(*[[(term, i) for term in reader.terms] for i, reader in enumerate(readers)])
+        for term, group in itertools.groupby(merged_terms, key=lambda x: x[0]):
+            postings_list, tf_list, positions = [], [], []
+            for _, i in group:
+                postings, tfs = readers[i].get_postings_arrays(term)
+                keep = ~deleted[postings]
+                if positional:
+                    flat, offsets = readers[i].get_positions(term, tfs)
+                    flat, offsets = flat.tolist(), offsets.tolist()
+                    positions.extend(flat[offsets[j]:offsets[j + 1]] for j in np.flatnonzero(keep).tolist())
+                postings_list.extend(postings[keep].tolist())
+                tf_list.extend(tfs[keep].tolist())
+            if postings_list:
+                writer.append(term, postings_list, tf_list, positions=positions if positional else None)
+
+    def query_term_ids(self, state, query):
+        """Term ID setiap term query yang ada di collection"""
+        return [state.term_id_map[word] for word in self.index.pre_processing_text(query)
+                if word in state.term_id_map]
+
+    def retrieve_scores(self, state, query, k, weights):
+        """
+        Ranked retrieval TaaT atas semua segment. df setiap term adalah jumlah
+        df di semua segment; weights(postings_list, tf_list, df) menghitung
+        score setiap posting.
+        """
+        accumulator = ScoreAccumulator(len(state.doc_length_array))
+        for term_id in self.query_term_ids(state, query):
+            postings = [reader.get_postings_arrays(term_id) for reader in state.readers.values()
+                        if term_id in reader.postings_dict]
+            df = sum(len(postings_list) for postings_list, _ in postings)
+            for postings_list, tf_list in postings:
+                accumulator.add(postings_list, weights(postings_list, tf_list, df))
+        accumulator.touched &= ~state.deleted[:len(accumulator.touched)]
+        return self.index.top_k_results(accumulator, k, state.doc_id_map)
+
+    def retrieve_tfidf(self, query, k=10, state=None):
+        """Sama dengan BSBIIndex.retrieve_tfidf, atas semua segment"""
+        with self.searcher(state) as state:
+            return self.retrieve_scores(state, query, k, lambda postings_list, tf_list, df: tfidf_weights(
+                tf_list, df, state.n))
+
+    def retrieve_bm25(self, query, k=10, k1=1.2, b=0.75, state=None):
+        """Sama dengan BSBIIndex.retrieve_bm25, atas semua segment"""
+        with self.searcher(state) as state:
+            return self.retrieve_scores(state, query, k, lambda postings_list, tf_list, df: bm25_weights(
+                tf_list, state.doc_length_array[postings_list], df, state.n, state.avg_doc_length, k1=k1, b=b))
+
+    def contains(self, doc_name, state=None):
+        """True jika doc_name ada di salah satu segment dan tidak dihapus"""
+        with self.searcher(state) as state:
+            doc_id = state.doc_id_map[doc_name] if doc_name in state.doc_id_map else None
+            return doc_id is not None and doc_id < len(state.deleted) and not state.deleted[doc_id]
+
+    def fetch_documents(self, doc_names, executor=None, state=None):
+        """
+        Sama dengan BSBIIndex.fetch_documents, tetapi hanya dokumen yang ada
+        di document store sebuah segment yang dikembalikan (merged index dari
+        index lama tidak mempunyai document store). Setiap document store
+        memuat dokumen dengan doc ID berurutan, sehingga document store sebuah
+        dokumen dicari dengan bisect.
+        """
+        with self.searcher(state) as state:
+            stores = sorted((documents for segment in state.segments for documents in segment['documents']),
+                            key=lambda documents: documents[1])
+            bases = [doc_base for _, doc_base, _ in stores]
+            by_store = {}
+            for i, doc_name in enumerate(doc_names):
+                if doc_name not in state.doc_id_map:
+                    continue
+                doc_id = state.doc_id_map[doc_name]
+                position = bisect.bisect_right(bases, doc_id) - 1
+                if position < 0 or doc_id >= stores[position][1] + stores[position][2]:
+                    continue
+                documents_name, doc_base, _ = stores[position]
+                by_store.setdefault((documents_name, doc_base), []).append((i, doc_id - doc_base))
+
+            result = {}
+            for (documents_name, doc_base), entries in by_store.items():
+                reader = state.document_readers.get(documents_name)
+                if reader is None:
+                    reader = state.open(DocumentStoreReader(documents_name, directory=self.index.output_dir,
+                                                            store=self.index.store))
+                    reader = state.document_readers.setdefault(documents_name, reader)
+                contents = reader.get_many([local_id for _, local_id in entries], executor=executor)
+                for (i, _), content in zip(entries, contents):
+                    result[i] = (doc_names[i], content)
+            return [result[i] for i in sorted(result)]
+
+    def get_token_hashes(self, doc_ids, executor=None, state=None):
+        """Sama dengan BSBIIndex.get_token_hashes (forward index merged index)"""
+        with self.searcher(state) as state:
+            return self.index.get_token_hashes(doc_ids, executor=executor, state=state)
+
+    def get_doc_vectors(self, version, state=None):
+        """Sama dengan BSBIIndex.get_doc_vectors (vektor LSI dokumen merged index)"""
+        with self.searcher(state) as state:
+            return self.index.get_doc_vectors(version, state=state)
+
+
+if __name__ == '__main__':
+
+    import random
+    import tempfile
+    from bsbi import BSBIIndex
+    from compression import VBEPostings
+    from store import LocalStore
+
+    random.seed(0)
+    words = ["sakit", "kepala", "demam", "batuk", "pilek", "nyeri", "perut", "mual", "pusing", "darah",
+             "tinggi", "jantung", "paru", "kulit", "gatal", "mata", "merah", "obat", "dokter", "pasien"]
+
+    def make_documents(block, count):
+        return [(f'./{block}/{i}.txt', " ".join(random.choices(words, k=random.randint(3, 30))))
+                for i in range(count)]
+
+    def write_collection(data_dir, documents):
+        for doc_name, content in documents:
+            path = os.path.join(data_dir, doc_name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(content)
+
+    def scores(results):
+        return {doc_name: round(score, 9) for score, doc_name in results}
+
+    base_documents = make_documents(0, 40)
+    new_documents = make_documents(1, 30)
+    data_dir = tempfile.mkdtemp()
+    write_collection(os.path.join(data_dir, 'base'), base_documents)
+    local_store = LocalStore(tempfile.mkdtemp())
+
+    BSBIIndex(data_dir=os.path.join(data_dir, 'base'), postings_encoding=VBEPostings, output_dir='segmented',
+              store=local_store).do_indexing()
+    segmented = SegmentedIndex(BSBIIndex(data_dir=os.path.join(data_dir, 'base'), postings_encoding=VBEPostings,
+                                         output_dir='segmented', store=local_store),
+                               merge_factor=2, min_segment_docs=2, background_merge=False)
+    segmented.open()
+    for i in range(0, len(new_documents), 6):
+        segmented.add_documents(new_documents[i:i + 6])
+    try:
+        segmented.add_documents(new_documents[:1])
+        assert False, "nama dokumen yang sudah ada harus ditolak"
+    except ValueError:
+        pass
+
+    # dokumen baru yang dihapus tidak muncul lagi, dan postings-nya dibuang
+    # oleh merge sehingga hasilnya sama dengan indexing ulang collection
+    deleted = [doc_name for doc_name, _ in new_documents[::2]]
+    segmented.delete_documents(deleted)
+    assert all(segmented.segment_deleted_count(segmented.state, segment) == 0
+               for segment in segmented.state.segments), "merge salah"
+    assert len(segmented.state.segments) < 1 + len(new_documents) / 6, "merge salah"
+    # file segment yang sudah di-merge dihapus setelah reader-nya ditutup
+    segment_files = {name[:-len('.index')] for name in os.listdir(local_store.local_path('segmented'))
+                     if name.startswith('segment_') and name.endswith('.index')}
+    assert segment_files == {segment['name'] for segment in segmented.state.segments
+                             if segment['name'] != 'main_index'}, "file segment lama tidak dihapus"
+
+    live_documents = base_documents + [document for document in new_documents if document[0] not in deleted]
+    write_collection(os.path.join(data_dir, 'live'), live_documents)
+    rebuilt = BSBIIndex(data_dir=os.path.join(data_dir, 'live'), postings_encoding=VBEPostings, output_dir='rebuilt',
+                        store=local_store)
+    rebuilt.do_indexing()
+    rebuilt.load()
+    queries = ["sakit kepala", "demam batuk pilek", "jantung", "dokter dokter pasien", "tidak ada"]
+    for query in queries:
+        assert scores(segmented.retrieve_bm25(query, k=100)) == scores(rebuilt.retrieve_bm25(query, k=100)), query
+        assert scores(segmented.retrieve_tfidf(query, k=100)) == scores(rebuilt.retrieve_tfidf(query, k=100)), query
+    doc_names = [doc_name for doc_name, _ in live_documents[::7]]
+    assert segmented.fetch_documents(doc_names) == rebuilt.fetch_documents(doc_names), "isi dokumen salah"
+
+    # manifest dan tombstone bitmap dibaca ulang dengan hasil yang sama
+    reopened = SegmentedIndex(BSBIIndex(data_dir=os.path.join(data_dir, 'base'), postings_encoding=VBEPostings,
+                                        output_dir='segmented', store=local_store))
+    reopened.open()
+    assert reopened.retrieve_bm25("sakit kepala", k=100) == segmented.retrieve_bm25("sakit kepala", k=100), "manifest salah"
+    reopened.close()
+
+    # dokumen di merged index hanya ditandai; merged index tetap bisa dimuat
+    # oleh BSBIIndex
+    deleted = [doc_name for doc_name, _ in base_documents[:20]]
+    segmented.delete_documents(deleted)
+    assert not set(deleted) & set(scores(segmented.retrieve_bm25("sakit kepala", k=100))), "tombstone salah"
+    assert any(segment['name'] == 'main_index' for segment in segmented.state.segments), "merged index tidak boleh di-merge"
+    segmented.close()
+    searcher = BSBIIndex(data_dir=os.path.join(data_dir, 'base'), postings_encoding=VBEPostings, output_dir='segmented',
+                         store=local_store)
+    searcher.load()
+    assert searcher.retrieve_bm25("sakit kepala", k=5), "merged index salah"
+    searcher.close()
+    rebuilt.close()
+
+    # document store dicari berdasarkan doc ID pertamanya, bukan namanya
+    # (segment_10 terurut sebelum segment_2 berdasarkan nama)
+    many = SegmentedIndex(BSBIIndex(data_dir=os.path.join(data_dir, 'base'), postings_encoding=VBEPostings,
+                                    output_dir='many', store=local_store),
+                          merge_factor=100, min_segment_docs=2, background_merge=False)
+    many.open()
+    many_documents = make_documents(2, 24)
+    for i in range(0, len(many_documents), 2):
+        many.add_documents(many_documents[i:i + 2])
+    assert len(many.state.segments) == 12, "banyaknya segment salah"
+    doc_names = [doc_name for doc_name, _ in many_documents]
+    assert many.fetch_documents(doc_names[::-1]) == many_documents[::-1], "isi dokumen salah"
+    many.close()
+
+    # main.py melayani index lewat SegmentedIndex: dokumen yang ditambahkan
+    # muncul di hasil search, dan dokumen yang dihapus tidak muncul lagi
+    import types
+    import lightgbm as lgb
+    from letor import Letor
+
+    bucket = LocalStore(tempfile.mkdtemp())
+    BSBIIndex(data_dir=os.path.join(data_dir, 'base'), postings_encoding=VBEPostings, output_dir='index',
+              store=bucket).do_indexing()
+    rng = np.random.default_rng(0)
+    features = rng.random((20, 2 * Letor.NUM_LATENT_TOPICS + 2))
+    booster = lgb.train({'objective': 'regression', 'min_data_in_leaf': 1, 'verbose': -1},
+                        lgb.Dataset(features, features[:, -1]), num_boost_round=2)
+    Letor({word: i for i, word in enumerate(words)},
+          rng.random((len(words), Letor.NUM_LATENT_TOPICS)).astype(np.float32), booster).save(bucket)
+    os.environ['BUCKET_LOCAL_DIR'] = bucket.root
+    os.environ['INDEX_LOCAL_DIR'] = tempfile.mkdtemp()
+    import main
+
+    def search(query):
+        response, status = main.search(types.SimpleNamespace(path='/search', args={'query': query, 'size': '100'}))
+        assert status == 200, response
+        return {result['name'] for result in response['serp']}
+
+    def document(doc_name):
+        return main.search(types.SimpleNamespace(path='/search/document', args={'name': doc_name}))
+
+    added_name, added_content = './3/0.txt', 'vaksin demam'
+    deleted_name, deleted_content = base_documents[0]
+    assert deleted_name in search(deleted_content) and added_name not in search(added_content), "index awal salah"
+
+    writer = SegmentedIndex(BSBIIndex(data_dir=os.path.join(data_dir, 'base'), postings_encoding=VBEPostings,
+                                      output_dir='index', store=bucket), background_merge=False)
+    writer.open()
+    writer.add_documents([(added_name, added_content)])
+    writer.delete_documents([deleted_name])
+    writer.close()
+    main.last_version_check = 0
+    assert added_name in search(added_content), "dokumen baru tidak dilayani main.search"
+    assert deleted_name not in search(deleted_content), "dokumen yang dihapus masih dilayani main.search"
+    assert document(added_name)[0]['content'] == added_content, "isi dokumen baru salah"
+    assert document(deleted_name)[1] == 404, "dokumen yang dihapus masih bisa dibaca"
@@ -0,0 +1,105 @@
+# referensi: Manning, Raghavan & Schütze (2008), Introduction to Information
+# Retrieval, bagian 8.7 (results snippets)
+
+import re
+
+
+class SnippetGenerator:
+    """
+    Membuat snippet (potongan isi dokumen dengan panjang terbatas) yang
+    memuat sebanyak mungkin term query, beserta posisi kata yang cocok
+    dengan query untuk di-highlight.
+
+    Kata di dokumen dianggap cocok jika hasil stemming-nya sama dengan salah
+    satu term query hasil preprocessing (lihat Analyzer), sehingga misalnya
+    "sakitnya" tetap di-highlight untuk query "sakit".
+
+    Attributes
+    ----------
+    analyzer(Analyzer): Analyzer yang sama dengan yang dipakai saat indexing
+    max_length(int): Panjang maksimum snippet (karakter, tanpa "...")
+    """
+
+    word_pattern = re.compile(r'\w+')
+    ELLIPSIS = '...'
+
+    def __init__(self, analyzer, max_length=300):
+        self.analyzer = analyzer
+        self.max_length = max_length
+
+    def query_terms(self, query):
+        """Himpunan term query hasil preprocessing (stemming dan removing stopwords)"""
+        return set(self.analyzer.analyze(query))
+
+    def matches(self, text, terms):
+        """List of (start, end) setiap kata di text yang cocok dengan terms"""
+        return [match.span() for match in self.word_pattern.finditer(text)
+                if self.analyzer.stem(match.group()) in terms]
+
+    def generate(self, content, terms):
+        """
+        Membuat snippet dari content untuk term query terms (lihat
+        query_terms).
+
+        Jendela snippet dipilih agar memuat kata cocok terbanyak, lalu
+        digeser ke kiri (tanpa mengeluarkan kata cocok) agar kata cocok
+        pertama tidak berada tepat di awal snippet. Jendela tidak memotong
+        kata, dan whitespace di dalamnya diringkas menjadi satu spasi.
+
+        Returns
+        -------
+        Tuple[str, List[Tuple[int, int]]]
+            Snippet, dan posisi (start, end) kata yang di-highlight di snippet
+        """
+        matches = self.matches(content, terms)
+
+        # jendela [start, start + max_length) dengan kata cocok terbanyak,
+        # dengan dua pointer terhadap posisi kata cocok
+        start, best, covered = 0, 0, 0
+        last = 0
+        for first, (match_start, _) in enumerate(matches):
+            while last < len(matches) and matches[last][1] <= match_start + self.max_length:
+                last += 1
+            if last - first > best:
+                best = last - first
+                start = match_start
+                covered = matches[last - 1][1] - match_start
+        if best > 0:
+            # sisa panjang jendela dibagi untuk konteks di kiri dan kanan
+            start = max(0, start - min(self.max_length // 4, (self.max_length - covered) // 2))
+
+        # jendela tidak memotong kata di awal maupun di akhir
+        while 0 < start < len(content) and content[start - 1].isalnum() and content[start].isalnum():
+            start += 1
+        end = min(len(content), start + self.max_length)
+        if end < len(content):
+            cut = end
+            while cut > start and content[cut - 1].isalnum() and content[cut].isalnum():
+                cut -= 1
+            end = cut if cut > start else end
+
+        snippet = ' '.join(content[start:end].split())
+        if start > 0 and snippet:
+            snippet = self.ELLIPSIS + ' ' + snippet
+        if end < len(content) and snippet:
+            snippet = snippet + ' ' + self.ELLIPSIS
+        return snippet, self.matches(snippet, terms)
+
+
+if __name__ == '__main__':
+
+    from analyzer import get_analyzer
+
+    generator = SnippetGenerator(get_analyzer(), max_length=40)
+    terms = generator.query_terms("sakit kepala")
+    content = "Pasien datang dengan keluhan demam tinggi. " * 3 + "Sakit kepala\nsejak kemarin, sakit di dahi. " + \
+        "Tidak ada batuk. " * 5
+    snippet, highlights = generator.generate(content, terms)
+    assert len(snippet) <= 40 + 2 * len(" ...") and snippet.startswith("...") and snippet.endswith("..."), snippet
+    assert [snippet[start:end] for start, end in highlights] == ["Sakit", "kepala", "sakit"], snippet
+    assert "\n" not in snippet, "whitespace harus diringkas"
+
+    snippet, highlights = generator.generate("tidak ada yang cocok di dokumen yang panjang ini sama sekali", terms)
+    assert snippet == "tidak ada yang cocok di dokumen yang ..." and highlights == [], snippet
+    assert generator.generate("", terms) == ("", []), "dokumen kosong"
+    assert generator.generate("sakit", terms) == ("sakit", [(0, 5)]), "dokumen pendek"
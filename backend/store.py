@@ -0,0 +1,264 @@
+# referensi: https://docs.python.org/3/library/mmap.html ,
+# https://cloud.google.com/python/docs/reference/storage/latest/google.cloud.storage.blob.Blob
+
+import collections
+import mmap
+import os
+import pickle
+import shutil
+import threading
+
+from google.cloud import storage
+
+
+class GCSStore:
+    """
+    Storage layer yang membaca dan menulis file ke sebuah bucket Google Cloud
+    Storage. Path yang dipakai adalah nama blob di dalam bucket.
+
+    Client dibuat ketika pertama kali dibutuhkan, sehingga membuat instance
+    GCSStore tidak memerlukan credentials.
+
+    Setiap read_at pada reader dari open_reader yang tidak ada di cache
+    readahead-nya (lihat BlobRangeReader) adalah satu HTTP request ke GCS,
+    sehingga query multi-term membayar kira-kira satu round trip per term
+    (ditambah skip table, impact, dan posisi yang letaknya berjauhan). Untuk
+    melayani query, file index sebaiknya disalin ke disk lokal dan dibaca
+    dengan LocalStore (lihat LocalStore.sync_from dan INDEX_LOCAL_DIR pada
+    main.py).
+
+    Attributes
+    ----------
+    bucket_name(str): Nama bucket
+    """
+
+    def __init__(self, bucket_name="diagnosee-collections"):
+        self.bucket_name = bucket_name
+        self._bucket = None
+
+    @property
+    def bucket(self):
+        if self._bucket is None:
+            self._bucket = storage.Client().bucket(self.bucket_name)
+        return self._bucket
+
+    def open(self, path, mode='rb'):
+        """Membuka blob sebagai file object (mode 'rb', 'wb', 'r', atau 'w')"""
+        return self.bucket.blob(path).open(mode)
+
+    def read_text(self, path):
+        """Membaca seluruh isi blob sebagai string (satu request)"""
+        return self.bucket.blob(path).download_as_text()
+
+    def open_reader(self, path):
+        """Membuka blob untuk dibaca secara acak dengan read_at(offset, length)"""
+        return BlobRangeReader(self.bucket.blob(path))
+
+    def exists(self, path):
+        return self.bucket.blob(path).exists()
+
+    def version(self, path):
+        """
+        Mengembalikan versi (generation) blob, atau None jika blob tidak ada.
+        Generation berubah setiap kali blob ditulis ulang.
+        """
+        blob = self.bucket.get_blob(path)
+        return blob.generation if blob is not None else None
+
+    def download(self, path, local_path):
+        """Menyalin blob ke file lokal local_path"""
+        self.bucket.blob(path).download_to_filename(local_path)
+
+    def delete(self, path):
+        """Menghapus blob jika ada"""
+        blob = self.bucket.get_blob(path)
+        if blob is not None:
+            blob.delete()
+
+
+class LocalStore:
+    """
+    Storage layer berbasis file system lokal. File index dibaca dengan mmap
+    sehingga postings di-decode langsung dari page cache tanpa menyalin bytes.
+
+    Attributes
+    ----------
+    root(str): Direktori yang menjadi akar dari semua path
+    """
+
+    # file berisi versi remote dari file-file yang disalin oleh sync_from
+    SYNC_STATE_FILE = '.sync_versions'
+
+    def __init__(self, root=''):
+        self.root = root
+
+    def local_path(self, path):
+        return os.path.join(self.root, path)
+
+    def open(self, path, mode='rb'):
+        """Membuka file; direktori dibuat terlebih dahulu jika mode tulis"""
+        local_path = self.local_path(path)
+        if 'w' in mode:
+            os.makedirs(os.path.dirname(local_path) or '.', exist_ok=True)
+        if 'b' in mode:
+            return open(local_path, mode)
+        return open(local_path, mode, encoding="utf-8")
+
+    def read_text(self, path):
+        """Membaca seluruh isi file sebagai string"""
+        with self.open(path, 'r') as f:
+            return f.read()
+
+    def open_reader(self, path):
+        """Membuka file untuk dibaca secara acak dengan read_at(offset, length) via mmap"""
+        return MmapRangeReader(self.local_path(path))
+
+    def exists(self, path):
+        return os.path.exists(self.local_path(path))
+
+    def version(self, path):
+        """Mengembalikan waktu modifikasi file (ns), atau None jika file tidak ada"""
+        try:
+            return os.stat(self.local_path(path)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def download(self, path, local_path):
+        """Menyalin file ke local_path (sama dengan GCSStore.download)"""
+        shutil.copyfile(self.local_path(path), local_path)
+
+    def delete(self, path):
+        """Menghapus file jika ada"""
+        try:
+            os.remove(self.local_path(path))
+        except FileNotFoundError:
+            pass
+
+    def sync_from(self, remote, paths):
+        """
+        Menyalin file-file pada paths dari remote store (misal GCSStore) ke
+        store lokal ini. File hanya diunduh ulang jika versinya di remote
+        berbeda dengan versi saat terakhir disalin.
+
+        File ditulis ke file sementara lalu di-rename, sehingga mmap yang
+        sedang terbuka tetap melihat isi file yang lama.
+
+        Parameters
+        ----------
+        remote: GCSStore
+            Store sumber
+        paths: List[str]
+            Path relatif file yang akan disalin
+
+        Returns
+        -------
+        bool
+            True jika ada file yang diunduh
+        """
+        state_path = self.local_path(self.SYNC_STATE_FILE)
+        synced = {}
+        if os.path.exists(state_path):
+            with open(state_path, 'rb') as f:
+                synced = pickle.load(f)
+
+        changed = False
+        for path in paths:
+            remote_version = remote.version(path)
+            if remote_version is None:
+                continue
+            if synced.get(path) == remote_version and self.exists(path):
+                continue
+            local_path = self.local_path(path)
+            os.makedirs(os.path.dirname(local_path) or '.', exist_ok=True)
+            remote.download(path, local_path + '.tmp')
+            os.replace(local_path + '.tmp', local_path)
+            synced[path] = remote_version
+            changed = True
+
+        if changed:
+            with open(state_path, 'wb') as f:
+                pickle.dump(synced, f)
+        return changed
+
+
+class BlobRangeReader:
+    """
+    Reader untuk blob di GCS. read_at yang kecil dibulatkan menjadi blok
+    READAHEAD bytes yang di-cache (LRU, maksimal CACHE_BLOCKS blok), sehingga
+    data yang berdekatan (misal postings, skip table, dan impact sebuah term,
+    atau term-term yang berurutan) cukup diambil dengan satu ranged request.
+    read_at yang lebih besar dari READAHEAD langsung menjadi satu ranged
+    request tanpa cache. Reader tidak menyimpan posisi dan aman dipakai
+    bersama oleh beberapa thread.
+    """
+
+    READAHEAD = 64 * 1024
+    CACHE_BLOCKS = 32
+
+    def __init__(self, blob):
+        self.blob = blob
+        self.blocks = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def read_at(self, offset, length):
+        if length == 0:
+            return b''
+        if length > self.READAHEAD:
+            return self.blob.download_as_bytes(start=offset, end=offset + length - 1)
+
+        first, last = offset // self.READAHEAD, (offset + length - 1) // self.READAHEAD
+        with self.lock:
+            blocks = [self.blocks.get(block) for block in range(first, last + 1)]
+            for block in range(first, last + 1):
+                if block in self.blocks:
+                    self.blocks.move_to_end(block)
+        if any(data is None for data in blocks):
+            # blok yang berurutan diambil dengan satu ranged request; blok
+            # terakhir blob bisa lebih pendek dari READAHEAD
+            data = self.blob.download_as_bytes(start=first * self.READAHEAD, end=(last + 1) * self.READAHEAD - 1)
+            blocks = [data[i:i + self.READAHEAD] for i in range(0, (last - first + 1) * self.READAHEAD, self.READAHEAD)]
+            with self.lock:
+                for block, block_data in zip(range(first, last + 1), blocks):
+                    self.blocks[block] = block_data
+                    self.blocks.move_to_end(block)
+                while len(self.blocks) > self.CACHE_BLOCKS:
+                    self.blocks.popitem(last=False)
+
+        start = offset - first * self.READAHEAD
+        return b"".join(blocks)[start:start + length]
+
+    def close(self):
+        pass
+
+
+class MmapRangeReader:
+    """
+    Reader untuk file lokal dengan mmap. read_at mengembalikan memoryview
+    (zero-copy) dari bagian file yang diminta.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                self.mm = None
+                self.view = memoryview(b'')
+            else:
+                self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self.view = memoryview(self.mm)
+
+    def read_at(self, offset, length):
+        return self.view[offset:offset + length]
+
+    def close(self):
+        try:
+            self.view.release()
+            if self.mm is not None:
+                self.mm.close()
+        except BufferError:
+            # masih ada memoryview yang dipegang pemanggil; mmap akan
+            # ditutup oleh garbage collector
+            pass
+
+
+# store default yang dipakai jika tidak ada store yang diberikan
+default_store = GCSStore()
@@ -0,0 +1,367 @@
+# referensi: Witten, Moffat & Bell (1999), Managing Gigabytes, bab 4 (front coding) ,
+# https://numpy.org/doc/stable/reference/generated/numpy.frombuffer.html
+
+import array
+import bisect
+from collections.abc import Mapping
+
+import numpy as np
+
+from compression import VBEPostings
+
+
+def read_vb_number(data, pos):
+    """
+    Membaca satu angka Variable-Byte Encoding (lihat VBEPostings) dari data
+    mulai byte ke-pos. Mengembalikan angka tersebut dan posisi setelahnya.
+    """
+    byte = data[pos]
+    if byte >= 128:
+        # kasus paling umum: angka < 128 (satu byte)
+        return byte - 128, pos + 1
+    number = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        if byte < 128:
+            number = 128 * number + byte
+        else:
+            return 128 * number + byte - 128, pos
+
+
+class TermDictionary(Mapping):
+    """
+    Term dictionary read-only yang memetakan term (str) ke term ID, disimpan
+    sebagai sorted array dengan front coding sehingga bisa dipakai langsung
+    dari mmap tanpa unpickling (berbeda dengan IdMap yang harus dimuat
+    seluruhnya ke dict dan list Python).
+
+    Term diurutkan berdasarkan bytes UTF-8-nya dan dibagi menjadi blok berisi
+    BLOCK_SIZE term. Term pertama setiap blok disimpan utuh, sedangkan term
+    berikutnya hanya menyimpan panjang prefix yang sama dengan term
+    sebelumnya dan sisa suffix-nya. Pencarian term adalah binary search
+    terhadap term pertama setiap blok, lalu scan satu blok. Hanya term
+    pertama setiap blok (sparse index) yang disimpan di memori, dan baru
+    dimuat ketika pencarian pertama.
+
+    Format file (semua angka header dan offsets uint64 little-endian):
+        header          : banyaknya term, banyaknya blok
+        offsets         : posisi awal setiap blok relatif terhadap awal data
+        data            : blok-blok; setiap term berupa
+                          VB(panjang prefix) VB(panjang suffix) suffix VB(term ID)
+                          (panjang prefix term pertama setiap blok selalu 0)
+    """
+
+    BLOCK_SIZE = 16
+    HEADER_SIZE = 16
+
+    def __init__(self, reader):
+        """
+        Parameters
+        ----------
+        reader: BlobRangeReader atau MmapRangeReader
+            Reader file term dictionary (lihat store.open_reader)
+        """
+        self.reader = reader
+        header = np.frombuffer(reader.read_at(0, self.HEADER_SIZE), dtype='<u8')
+        self.num_terms, num_blocks = int(header[0]), int(header[1])
+        self.offsets = np.frombuffer(reader.read_at(self.HEADER_SIZE, 8 * num_blocks), dtype='<u8').tolist()
+        self.first_terms = None
+        data_start = self.HEADER_SIZE + 8 * num_blocks
+        # panjang data = posisi akhir blok terakhir, disimpan sebagai offset tambahan
+        data_length = int(np.frombuffer(reader.read_at(data_start, 8), dtype='<u8')[0])
+        self.data = reader.read_at(data_start + 8, data_length)
+
+    @staticmethod
+    def write(f, terms):
+        """
+        Menulis term dictionary ke file object f.
+
+        Parameters
+        ----------
+        terms: Iterable[Tuple[str, int]]
+            (term, term ID), misalnya IdMap.str_to_id.items()
+        """
+        entries = sorted((term.encode('utf-8'), term_id) for term, term_id in terms)
+        blocks, offsets, position = [], [], 0
+        for start in range(0, len(entries), TermDictionary.BLOCK_SIZE):
+            block = []
+            previous = b""
+            for term, term_id in entries[start:start + TermDictionary.BLOCK_SIZE]:
+                prefix = 0
+                limit = min(len(previous), len(term))
+                while prefix < limit and previous[prefix] == term[prefix]:
+                    prefix += 1
+                block.append(VBEPostings.vb_encode([prefix, len(term) - prefix]) + term[prefix:] +
+                             VBEPostings.vb_encode_number(term_id))
+                previous = term
+            blocks.append(b"".join(block))
+            offsets.append(position)
+            position += len(blocks[-1])
+        f.write(np.array([len(entries), len(blocks)], dtype='<u8').tobytes())
+        f.write(np.array(offsets + [position], dtype='<u8').tobytes())
+        f.write(b"".join(blocks))
+
+    def read_block(self, block):
+        """Generator (term dalam bytes, term ID) untuk semua term di sebuah blok"""
+        pos = self.offsets[block]
+        end = self.offsets[block + 1] if block + 1 < len(self.offsets) else len(self.data)
+        term = b""
+        while pos < end:
+            prefix, pos = read_vb_number(self.data, pos)
+            suffix_length, pos = read_vb_number(self.data, pos)
+            term = term[:prefix] + bytes(self.data[pos:pos + suffix_length])
+            term_id, pos = read_vb_number(self.data, pos + suffix_length)
+            yield term, term_id
+
+    def first_term(self, block):
+        """Term pertama (bytes) sebuah blok, yang disimpan utuh"""
+        pos = self.offsets[block]
+        _, pos = read_vb_number(self.data, pos)
+        length, pos = read_vb_number(self.data, pos)
+        return bytes(self.data[pos:pos + length])
+
+    def __getitem__(self, term):
+        """Mengembalikan term ID dari term (str); KeyError jika tidak ada"""
+        if not isinstance(term, str) or self.num_terms == 0:
+            raise KeyError(term)
+        key = term.encode('utf-8')
+
+        # blok terakhir yang term pertamanya <= key
+        block = bisect.bisect_right(self.load_first_terms(), key) - 1
+        if block < 0:
+            raise KeyError(term)
+        for candidate, term_id in self.read_block(block):
+            if candidate == key:
+                return term_id
+            if candidate > key:
+                break
+        raise KeyError(term)
+
+    def load_first_terms(self):
+        """Sparse index: term pertama setiap blok, dimuat ketika pertama dibutuhkan"""
+        if self.first_terms is None:
+            self.first_terms = [self.first_term(block) for block in range(len(self.offsets))]
+        return self.first_terms
+
+    def get_many(self, terms, default=None):
+        """
+        Sama dengan [self.get(term, default) for term in terms], tetapi term
+        diurutkan terlebih dahulu sehingga setiap blok paling banyak
+        di-decode sekali.
+        """
+        first_terms = self.load_first_terms()
+        keys = sorted({term.encode('utf-8') for term in terms})
+        found = {}
+        i = 0
+        while i < len(keys):
+            block = bisect.bisect_right(first_terms, keys[i]) - 1
+            if block < 0:
+                i += 1
+                continue
+            next_first = first_terms[block + 1] if block + 1 < len(first_terms) else None
+            entries = dict(self.read_block(block))
+            while i < len(keys) and (next_first is None or keys[i] < next_first):
+                if keys[i] in entries:
+                    found[keys[i]] = entries[keys[i]]
+                i += 1
+        return [found.get(term.encode('utf-8'), default) for term in terms]
+
+    def __iter__(self):
+        for block in range(len(self.offsets)):
+            for term, _ in self.read_block(block):
+                yield term.decode('utf-8')
+
+    def __len__(self):
+        return self.num_terms
+
+    def close(self):
+        self.data = None
+        self.offsets = None
+        self.first_terms = None
+        self.reader.close()
+
+
+class PostingsTable(Mapping):
+    """
+    Pengganti postings_dict (lihat index.py) dalam bentuk tabel berukuran tetap
+    yang diindeks dengan term ID, sehingga bisa dipakai langsung dari mmap
+    sebagai numpy structured array tanpa unpickling.
+
+    Baris ke-t berisi (position, df, length_of_postings, length_of_tf, max_tf)
+    untuk term ID t. Term ID yang tidak ada di index mempunyai df 0.
+
+    Format file: banyaknya baris (uint64 little-endian), lalu semua baris.
+    """
+
+    dtype = np.dtype([('position', '<u8'), ('df', '<u4'), ('length_of_postings', '<u4'),
+                      ('length_of_tf', '<u4'), ('max_tf', '<u4')])
+
+    def __init__(self, reader):
+        self.reader = reader
+        num_rows = int(np.frombuffer(reader.read_at(0, 8), dtype='<u8')[0])
+        self.rows = np.frombuffer(reader.read_at(8, num_rows * self.dtype.itemsize), dtype=self.dtype)
+        self.max_tf = TableColumn(self, 'max_tf')
+
+    @staticmethod
+    def write(f, postings_dict, max_tf):
+        """Menulis postings_dict dan max_tf (dict dengan key term ID) ke file object f"""
+        rows = np.zeros(max(postings_dict, default=-1) + 1, dtype=PostingsTable.dtype)
+        if postings_dict:
+            term_ids = np.fromiter(postings_dict.keys(), dtype=np.int64, count=len(postings_dict))
+            rows[term_ids] = [postings_dict[term_id] + (max_tf[term_id],) for term_id in term_ids.tolist()]
+        f.write(np.array([len(rows)], dtype='<u8').tobytes())
+        f.write(rows.tobytes())
+
+    def __getitem__(self, term_id):
+        """(position, df, length_of_postings, length_of_tf) seperti postings_dict"""
+        if not 0 <= term_id < len(self.rows) or self.rows['df'][term_id] == 0:
+            raise KeyError(term_id)
+        position, df, length_of_postings, length_of_tf, _ = self.rows[term_id].tolist()
+        return (position, df, length_of_postings, length_of_tf)
+
+    def __contains__(self, term_id):
+        return isinstance(term_id, (int, np.integer)) and 0 <= term_id < len(self.rows) \
+            and self.rows['df'][term_id] > 0
+
+    def term_ids(self):
+        """Term ID (array('q')) yang ada di index, sesuai urutan postings-nya di file index"""
+        term_ids = np.flatnonzero(self.rows['df'] > 0)
+        term_ids = term_ids[np.argsort(self.rows['position'][term_ids], kind='stable')]
+        return array.array('q', term_ids.astype(np.int64).tobytes())
+
+    def __iter__(self):
+        return iter(self.term_ids())
+
+    def __len__(self):
+        return int(np.count_nonzero(self.rows['df']))
+
+    def close(self):
+        self.rows = None
+        self.reader.close()
+
+
+class TableColumn(Mapping):
+    """Mapping term ID -> satu kolom PostingsTable (misalnya max_tf)"""
+
+    def __init__(self, table, field):
+        self.table = table
+        self.field = field
+
+    def __getitem__(self, term_id):
+        if term_id not in self.table:
+            raise KeyError(term_id)
+        return int(self.table.rows[self.field][term_id])
+
+    def __iter__(self):
+        return iter(self.table)
+
+    def __len__(self):
+        return len(self.table)
+
+
+class DocLengths(Mapping):
+    """
+    Pengganti dict doc_length (doc ID -> panjang dokumen) dalam bentuk array
+    yang diindeks dengan doc ID, sehingga bisa dipakai langsung dari mmap.
+    Dokumen dengan panjang 0 dianggap tidak ada, sama seperti dict doc_length
+    yang hanya berisi dokumen dengan minimal satu token.
+
+    Format file: banyaknya dokumen (uint64 little-endian), lalu panjang
+    setiap dokumen (uint32 little-endian).
+
+    Attributes
+    ----------
+    array(numpy.ndarray): Panjang setiap doc ID (0 jika tidak ada)
+    """
+
+    def __init__(self, reader):
+        self.reader = reader
+        num_docs = int(np.frombuffer(reader.read_at(0, 8), dtype='<u8')[0])
+        self.array = np.frombuffer(reader.read_at(8, 4 * num_docs), dtype='<u4')
+        self.num_docs = int(np.count_nonzero(self.array))
+
+    @staticmethod
+    def write(f, doc_length):
+        """Menulis doc_length (dict doc ID -> panjang) ke file object f"""
+        array = np.zeros(max(doc_length, default=-1) + 1, dtype='<u4')
+        array[list(doc_length.keys())] = list(doc_length.values())
+        f.write(np.array([len(array)], dtype='<u8').tobytes())
+        f.write(array.tobytes())
+
+    def __getitem__(self, doc_id):
+        if not 0 <= doc_id < len(self.array) or self.array[doc_id] == 0:
+            raise KeyError(doc_id)
+        return int(self.array[doc_id])
+
+    def __iter__(self):
+        return iter(np.flatnonzero(self.array).tolist())
+
+    def __len__(self):
+        return self.num_docs
+
+    def close(self):
+        self.array = None
+        self.reader.close()
+
+
+def write_matrix(f, matrix):
+    """
+    Menulis matrix 2 dimensi ke file object f: banyaknya baris dan kolom
+    (uint64 little-endian), lalu isi matrix (float32 little-endian, row-major).
+    """
+    matrix = np.ascontiguousarray(matrix, dtype='<f4')
+    f.write(np.array(matrix.shape, dtype='<u8').tobytes())
+    f.write(matrix.tobytes())
+
+
+def read_matrix(reader):
+    """
+    Kebalikan dari write_matrix. Dengan MmapRangeReader (LocalStore) matrix
+    dibaca langsung dari mmap tanpa menyalin isinya.
+    """
+    rows, columns = np.frombuffer(reader.read_at(0, 16), dtype='<u8').tolist()
+    return np.frombuffer(reader.read_at(16, 4 * rows * columns), dtype='<f4').reshape(rows, columns)
+
+
+if __name__ == '__main__':
+
+    import io
+    from store import LocalStore
+    import tempfile
+
+    local_store = LocalStore(tempfile.mkdtemp())
+    terms = {"sakit": 0, "sakitnya": 7, "kepala": 2, "demam": 3, "batuk": 4, "b": 5, "rumah sakit": 6, "ütf": 1}
+    terms.update({f"w{i}": 100 + i for i in range(100)})
+    with local_store.open('terms.lex', 'wb') as f:
+        TermDictionary.write(f, terms.items())
+    term_dict = TermDictionary(local_store.open_reader('terms.lex'))
+    assert len(term_dict) == len(terms), "banyaknya term salah"
+    assert all(term_dict[term] == term_id for term, term_id in terms.items()), "term ID salah"
+    assert "sakitny" not in term_dict and "a" not in term_dict and "zzz" not in term_dict, "term tidak ada"
+    assert 3 not in term_dict, "key harus str"
+    assert term_dict.get_many(["w5", "a", "sakit", "w5", "zzz", "ütf"], -1) == [105, -1, 0, 105, -1, 1], "get_many salah"
+    assert list(term_dict) == sorted(terms, key=lambda term: term.encode('utf-8')), "urutan term salah"
+    term_dict.close()
+
+    postings_dict = {3: (0, 2, 4, 2), 0: (6, 1, 1, 1), 9: (8, 5, 10, 5)}
+    with local_store.open('index.ptab', 'wb') as f:
+        PostingsTable.write(f, postings_dict, {3: 2, 0: 1, 9: 70000})
+    table = PostingsTable(local_store.open_reader('index.ptab'))
+    assert dict(table) == postings_dict, "postings table salah"
+    assert list(table) == [3, 0, 9], "urutan term salah"
+    assert table.max_tf[9] == 70000 and 1 not in table and 10 not in table, "postings table salah"
+
+    with local_store.open('index.lengths', 'wb') as f:
+        DocLengths.write(f, {0: 5, 4: 1, 2: 70000})
+    doc_length = DocLengths(local_store.open_reader('index.lengths'))
+    assert dict(doc_length) == {0: 5, 2: 70000, 4: 1} and len(doc_length) == 3, "doc length salah"
+
+    with local_store.open('vectors.matrix', 'wb') as f:
+        write_matrix(f, np.arange(6).reshape(3, 2))
+    matrix = read_matrix(local_store.open_reader('vectors.matrix'))
+    assert matrix.dtype == np.float32 and matrix.tolist() == [[0, 1], [2, 3], [4, 5]], "matrix salah"
+
+    buffer = io.BytesIO()
+    TermDictionary.write(buffer, [])
+    assert len(TermDictionary(type('Reader', (), {'read_at': lambda self, offset, length: buffer.getvalue()[offset:offset + length]})())) == 0
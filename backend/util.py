@@ -1,3 +1,8 @@
+import bisect
+
+import numpy as np
+
+
 class IdMap:
     """
     Ingat kembali di kuliah, bahwa secara praktis, sebuah dokumen dan
@@ -28,6 +33,10 @@ class IdMap:
         # TODO
         return len(self.id_to_str)
 
+    def __contains__(self, s):
+        """Mengecek apakah string s sudah ada pada IdMap tanpa menambahkannya."""
+        return s in self.str_to_id
+
     def __get_id(self, s):
         """
         Mengembalikan integer id i yang berkorespondensi dengan sebuah string s.
@@ -94,30 +103,173 @@ def merge_and_sort_posts_and_tfs(posts_tfs1, posts_tfs2):
         Penggabungan yang sudah terurut
     """
     # TODO
-    
-    # menyimpan doc id dari list 1
-    doc_id = [item[0] for item in posts_tfs1]
-    
-    # inisialisasi list dari list 1
-    merged = posts_tfs1
-    
-    # akses setiap tuple di list 2
-    for item in posts_tfs2:
-        # jika doc id tidak ada di list 1
-        if item[0] not in doc_id:
-            merged.append(item)
-            
-        # jika ada, cari indexnya di list akhir dan akumulasi tf
+
+    # two-pointer merge: kedua list sudah terurut berdasarkan doc id,
+    # sehingga cukup satu kali scan (linear) tanpa sort ulang
+    merged = []
+    i, j = 0, 0
+    while i < len(posts_tfs1) and j < len(posts_tfs2):
+        doc_id1, tf1 = posts_tfs1[i]
+        doc_id2, tf2 = posts_tfs2[j]
+        if doc_id1 == doc_id2:
+            merged.append((doc_id1, tf1 + tf2))
+            i += 1
+            j += 1
+        elif doc_id1 < doc_id2:
+            merged.append((doc_id1, tf1))
+            i += 1
         else:
-            for i in range(len(doc_id)):
-                if doc_id[i] == item[0]:
-                    merged[i] = (item[0], merged[i][1] + item[1])
-    
-    # sort berdasarkan doc id
-    merged.sort(key=lambda x: x[0])
+            merged.append((doc_id2, tf2))
+            j += 1
+
+    # sisa salah satu list sudah pasti lebih besar dari semua elemen merged
+    merged.extend(posts_tfs1[i:])
+    merged.extend(posts_tfs2[j:])
     return merged
 
 
+def merge_postings_arrays(postings1, tf_list1, postings2, tf_list2):
+    """
+    Versi array dari merge_and_sort_posts_and_tfs: postings dan TF disimpan
+    pada dua array terpisah, bukan list of tuples.
+
+    contoh: merge_postings_arrays([1, 3, 4], [34, 2, 23], [1, 2, 4, 6], [11, 4, 3, 13])
+            return (array([1, 2, 3, 4, 6]), array([45, 4, 2, 26, 13]))
+
+    Parameters
+    ----------
+    postings1, postings2: array-like of int
+        Dua buah sorted postings list (doc IDs)
+    tf_list1, tf_list2: array-like of int
+        TF yang bersesuaian dengan postings1 dan postings2
+
+    Returns
+    -------
+    Tuple[numpy.ndarray, numpy.ndarray]
+        Postings hasil penggabungan yang terurut dan TF (int64) yang sudah
+        diakumulasikan
+    """
+    postings = np.concatenate((np.asarray(postings1, dtype=np.int64), np.asarray(postings2, dtype=np.int64)))
+    tf_list = np.concatenate((np.asarray(tf_list1, dtype=np.int64), np.asarray(tf_list2, dtype=np.int64)))
+    if len(postings) == 0:
+        return postings, tf_list
+
+    # merge dua sorted run (mergesort pada numpy stabil dan linear untuk run terurut)
+    order = np.argsort(postings, kind='stable')
+    postings = postings[order]
+    tf_list = tf_list[order]
+
+    # menjumlahkan TF untuk doc id yang sama
+    starts = np.flatnonzero(np.concatenate(([True], postings[1:] != postings[:-1])))
+    return postings[starts], np.add.reduceat(tf_list, starts)
+
+
+def merge_positions_lists(postings1, positions1, postings2, positions2):
+    """
+    Menggabung posisi term dari dua postings list, mengikuti urutan hasil
+    merge_and_sort_posts_and_tfs. Posisi pada doc id yang sama digabung dan
+    diurutkan.
+
+    contoh: merge_positions_lists([1, 4], [[0, 5], [2]], [2, 4], [[7], [1]])
+            return [[0, 5], [7], [1, 2]]
+
+    Parameters
+    ----------
+    postings1, postings2: List[int]
+        Dua buah sorted postings list
+    positions1, positions2: List[List[int]]
+        Posisi term di setiap dokumen pada postings1 dan postings2
+
+    Returns
+    -------
+    List[List[int]]
+        Posisi term di setiap dokumen pada gabungan postings list
+    """
+    by_doc_id = dict(zip(postings1, positions1))
+    for doc_id, positions in zip(postings2, positions2):
+        by_doc_id[doc_id] = sorted(list(by_doc_id[doc_id]) + list(positions)) if doc_id in by_doc_id else positions
+    return [by_doc_id[doc_id] for doc_id in sorted(by_doc_id)]
+
+
+def concat_ranges(starts, lengths):
+    """
+    Indeks starts[i], ..., starts[i] + lengths[i] - 1 untuk semua i yang
+    disambung, beserta i untuk setiap indeks.
+
+    contoh: concat_ranges([10, 3], [2, 3])
+            return (array([10, 11, 3, 4, 5]), array([0, 0, 1, 1, 1]))
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    owner = np.repeat(np.arange(len(starts)), lengths)
+    offsets = np.arange(len(owner)) - (np.cumsum(lengths) - lengths).take(owner)
+    return starts.take(owner) + offsets, owner
+
+
+def galloping_search(postings, target, low=0):
+    """
+    Mencari posisi pertama i >= low dimana postings[i] >= target dengan
+    galloping (exponential) search: posisi yang diperiksa adalah low, low + 1,
+    low + 3, low + 7, ... sampai ditemukan elemen >= target, lalu dilanjutkan
+    dengan binary search pada rentang terakhir. Biayanya O(log d), dengan d
+    adalah jarak dari low ke posisi yang dicari.
+
+    Parameters
+    ----------
+    postings: Sequence[int] (list atau numpy.ndarray)
+        Sorted postings list
+    target: int
+    low: int
+        Posisi awal pencarian
+
+    Returns
+    -------
+    int
+        Posisi yang dicari, atau len(postings) jika semua elemen < target
+    """
+    high = low
+    step = 1
+    while high < len(postings) and postings[high] < target:
+        low = high + 1
+        high += step
+        step *= 2
+    return bisect.bisect_left(postings, target, low, min(high, len(postings)))
+
+
+def intersect_postings_arrays(postings1, postings2):
+    """
+    Irisan dua sorted postings list. Setiap doc ID di postings1 (sebaiknya
+    list yang lebih pendek) dicari di postings2 dengan galloping_search,
+    dimulai dari posisi hasil pencarian sebelumnya, sehingga biayanya
+    O(m log(n / m)) untuk panjang list m dan n.
+
+    contoh: intersect_postings_arrays([2, 5, 9], [1, 2, 3, 9, 10])
+            return (array([0, 2]), array([1, 3]))
+
+    Parameters
+    ----------
+    postings1, postings2: array-like of int
+        Dua buah sorted postings list (doc IDs)
+
+    Returns
+    -------
+    Tuple[numpy.ndarray, numpy.ndarray]
+        Posisi doc ID yang sama pada postings1 dan postings2, sehingga
+        postings1[indices1] == postings2[indices2]
+    """
+    indices1, indices2 = [], []
+    j = 0
+    for i, doc_id in enumerate(np.asarray(postings1).tolist()):
+        j = galloping_search(postings2, doc_id, j)
+        if j == len(postings2):
+            break
+        if postings2[j] == doc_id:
+            indices1.append(i)
+            indices2.append(j)
+            j += 1
+    return np.array(indices1, dtype=np.int64), np.array(indices2, dtype=np.int64)
+
+
 if __name__ == '__main__':
 
     doc = ["halo", "semua", "selamat", "pagi", "semua"]
@@ -129,6 +281,8 @@ if __name__ == '__main__':
     assert term_id_map[0] == "halo", "term_id salah"
     assert term_id_map["selamat"] == 2, "term_id salah"
     assert term_id_map["pagi"] == 3, "term_id salah"
+    assert "pagi" in term_id_map and "malam" not in term_id_map, "term_id salah"
+    assert len(term_id_map) == 4, "term_id salah"
 
     docs = ["/collection/0/data0.txt",
             "/collection/0/data10.txt",
@@ -139,3 +293,25 @@ if __name__ == '__main__':
 
     assert merge_and_sort_posts_and_tfs([(1, 34), (3, 2), (4, 23)],
                                         [(1, 11), (2, 4), (4, 3), (6, 13)]) == [(1, 45), (2, 4), (3, 2), (4, 26), (6, 13)], "merge_and_sort_posts_and_tfs salah"
+    posts_tfs1 = [(1, 34), (3, 2)]
+    assert merge_and_sort_posts_and_tfs(posts_tfs1, [(1, 1)]) == [(1, 35), (3, 2)], "merge_and_sort_posts_and_tfs salah"
+    assert posts_tfs1 == [(1, 34), (3, 2)], "merge_and_sort_posts_and_tfs tidak boleh mengubah input"
+    assert merge_and_sort_posts_and_tfs([], [(2, 1)]) == [(2, 1)], "merge_and_sort_posts_and_tfs salah"
+
+    postings, tf_list = merge_postings_arrays([1, 3, 4], [34, 2, 23], [1, 2, 4, 6], [11, 4, 3, 13])
+    assert postings.tolist() == [1, 2, 3, 4, 6], "merge_postings_arrays salah"
+    assert tf_list.tolist() == [45, 4, 2, 26, 13], "merge_postings_arrays salah"
+    postings, tf_list = merge_postings_arrays([], [], [5], [3])
+    assert postings.tolist() == [5] and tf_list.tolist() == [3], "merge_postings_arrays salah"
+    assert tf_list.dtype == np.int64, "merge_postings_arrays salah"
+
+    postings = [1, 2, 3, 9, 10, 25]
+    assert [galloping_search(postings, x) for x in [0, 1, 4, 9, 25, 26]] == [0, 0, 3, 3, 5, 6], "galloping_search salah"
+    assert galloping_search(postings, 9, low=4) == 4, "galloping_search salah"
+    indices1, indices2 = intersect_postings_arrays([2, 5, 9], np.array([1, 2, 3, 9, 10]))
+    assert indices1.tolist() == [0, 2] and indices2.tolist() == [1, 3], "intersect_postings_arrays salah"
+    assert len(intersect_postings_arrays([], [1, 2])[0]) == 0, "intersect_postings_arrays salah"
+
+    assert merge_positions_lists([1, 4], [[0, 5], [2]], [2, 4], [[7], [1]]) == [[0, 5], [7], [1, 2]], "merge_positions_lists salah"
+    indices, owner = concat_ranges([10, 3], [2, 3])
+    assert indices.tolist() == [10, 11, 3, 4, 5] and owner.tolist() == [0, 0, 1, 1, 1], "concat_ranges salah"
@@ -1,9 +1,10 @@
 from django.urls import path
-from frontend.views import frontend, search
+from frontend.views import document, frontend, search
 
 app_name = 'frontend'
 
 urlpatterns = [
     path('', frontend, name='frontend'),
     path('search', search, name='search'),
-]
\ No newline at end of file
+    path('document', document, name='document'),
+]
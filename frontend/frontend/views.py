@@ -1,33 +1,72 @@
+import math
+
 import requests
 from django.http import JsonResponse
-from django.shortcuts import render
+from django.shortcuts import redirect, render
 from django.views.decorators.csrf import csrf_exempt
 from frontend.forms import Query
 
+API_URL = "https://asia-southeast2-jarkom-rahma.cloudfunctions.net/diagnosee-search"
+
+# banyaknya hasil per halaman
+PAGE_SIZE = 10
+
 @csrf_exempt 
 def frontend(request):
     return render(request, "index.html")
 
 @csrf_exempt 
 def search(request):
-    if request.method=="POST":
-        form = Query(request.POST)
-        if form.is_valid():
-            query = request.POST.get('query')
-            hasil = get_serp(query)
-            context={
-                'query': query,
-                'serp': hasil['serp'],
-                'waktu': hasil['duration'],
-                'length': hasil['length'],
-            }
-            return render(request, "result.html", context)
-    print("here")
-    
-def get_serp(query):
-        api_url = f"https://asia-southeast2-jarkom-rahma.cloudfunctions.net/diagnosee-search/search?query={query}"
-
-        response = requests.get(api_url)
+    # query dari form (POST) atau dari link pagination (GET)
+    form = Query(request.POST if request.method == "POST" else request.GET)
+    if not form.is_valid():
+        return redirect('frontend:frontend')
+
+    query = form.cleaned_data['query']
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        page = 1
+    hasil = get_serp(query, page)
+    if isinstance(hasil, JsonResponse):
+        return hasil
+
+    num_pages = math.ceil(hasil['length'] / PAGE_SIZE)
+    context={
+        'query': query,
+        'serp': [dict(item, fragments=highlight(item['snippet'], item['highlights'])) for item in hasil['serp']],
+        'waktu': hasil['duration'],
+        'length': hasil['length'],
+        'page': page,
+        'pages': range(1, num_pages + 1),
+        'previous_page': page - 1 if page > 1 else None,
+        'next_page': page + 1 if page < num_pages else None,
+    }
+    return render(request, "result.html", context)
+
+@csrf_exempt 
+def document(request):
+    # isi lengkap dokumen diambil ketika "Read more" diklik
+    response = requests.get(f"{API_URL}/document", params={'name': request.GET.get('name', '')})
+    if response.status_code == 200:
+        return JsonResponse(response.json())
+    return JsonResponse({'error': "Failed to fetch document from the API"}, status=response.status_code)
+
+def highlight(snippet, highlights):
+    # memecah snippet menjadi list of (teks, di-highlight) untuk template
+    fragments = []
+    position = 0
+    for start, end in highlights:
+        fragments.append((snippet[position:start], False))
+        fragments.append((snippet[start:end], True))
+        position = end
+    fragments.append((snippet[position:], False))
+    return [(text, matched) for (text, matched) in fragments if text]
+
+def get_serp(query, page):
+        params = {'query': query, 'page': page, 'size': PAGE_SIZE}
+
+        response = requests.get(f"{API_URL}/search", params=params)
 
         if response.status_code == 200:
             api_data = response.json()